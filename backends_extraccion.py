@@ -0,0 +1,225 @@
+"""Backends intercambiables de extracción de transacciones.
+
+Cada backend recibe una :class:`EntradaExtraccion` y devuelve un
+:class:`ResultadoExtraccion`.  Los backends locales (capa de texto y tablas)
+trabajan sobre el documento desbloqueado y nunca envían datos fuera del
+equipo; el backend de Gemini necesita las páginas rasterizadas.  La política
+de selección de :class:`ProcesadorGemini` los prueba en orden y se queda con
+el primero cuyo resultado supere las comprobaciones de confianza.
+"""
+
+from __future__ import annotations
+
+import io
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from pathlib import Path
+from typing import TYPE_CHECKING, Callable, Dict, List, Optional, Sequence, Type
+
+import fitz  # PyMuPDF
+import pandas as pd
+import pdfplumber
+
+from logging_utils import configurar_logger
+from paginas import BLOQUEO_FITZ
+from texto_nativo import es_fecha, extraer_texto_nativo, normalizar_texto, perfil_texto, validar_registros
+from valores_monetarios import FormatoNumerico, formato_banco
+
+try:  # pragma: no-cover - dependencias opcionales
+    import camelot  # type: ignore
+
+    CAMELOT_AVAILABLE = True
+except Exception:  # pragma: no-cover - camelot/opencv no disponibles
+    camelot = None
+    CAMELOT_AVAILABLE = False
+
+try:  # pragma: no-cover - dependencias opcionales
+    import tabula  # type: ignore
+
+    TABULA_AVAILABLE = True
+except Exception:  # pragma: no-cover - tabula/java no disponibles
+    tabula = None
+    TABULA_AVAILABLE = False
+
+if TYPE_CHECKING:  # pragma: no-cover - solo para anotaciones
+    from procesador_gemini import ProcesadorGemini
+
+
+logger, _ = configurar_logger("app.backends")
+
+
+Tabla = List[List[Optional[str]]]
+
+
+@dataclass
+class EntradaExtraccion:
+    """Todo lo que un backend puede necesitar de un documento."""
+
+    pdf_path: Path
+    banco: str
+    password: str
+    estrategia: str
+    documento: Optional[fitz.Document] = None
+    contenido: Optional[Callable[[], bytes]] = None
+    paginas: Optional[Sequence[object]] = None
+    formato: Optional[FormatoNumerico] = None
+
+    def formato_numerico(self) -> FormatoNumerico:
+        return self.formato or formato_banco(self.banco)
+
+
+@dataclass
+class ResultadoExtraccion:
+    df: Optional[pd.DataFrame] = None
+    motivo: str = ""
+
+    @property
+    def aceptado(self) -> bool:
+        return self.df is not None and not self.df.empty and not self.motivo
+
+
+class BackendExtraccion(ABC):
+    """Interfaz común de los backends de extracción."""
+
+    nombre: str = ""
+    #: ``True`` si solo necesita el documento abierto (se ejecuta en la etapa de CPU).
+    local: bool = True
+
+    @abstractmethod
+    def extraer(self, entrada: EntradaExtraccion) -> ResultadoExtraccion:
+        raise NotImplementedError
+
+
+class BackendTextoNativo(BackendExtraccion):
+    """Reconstruye filas desde las palabras posicionadas de PyMuPDF."""
+
+    nombre = "texto"
+
+    def extraer(self, entrada: EntradaExtraccion) -> ResultadoExtraccion:
+        if entrada.documento is None:
+            return ResultadoExtraccion(motivo="documento no disponible")
+        with BLOQUEO_FITZ:
+            resultado = extraer_texto_nativo(entrada.documento, entrada.banco, entrada.formato_numerico())
+        if not resultado.aceptado:
+            return ResultadoExtraccion(motivo=resultado.motivo)
+        return ResultadoExtraccion(pd.DataFrame(resultado.registros))
+
+
+class BackendTablas(BackendExtraccion):
+    """Detecta tablas con pdfplumber, camelot o tabula y mapea sus encabezados.
+
+    pdfplumber trabaja sobre el contenido descifrado en memoria.  camelot y
+    tabula solo aceptan rutas, así que reciben el archivo original junto con
+    la contraseña; camelot, sin embargo, lo descifra y escribe cada página
+    como un PDF temporal sin contraseña en el directorio temporal del sistema
+    mientras lee las tablas.  Con extractos cifrados y un directorio temporal
+    compartido conviene quedarse con pdfplumber (el motor por defecto).
+    Ninguno de los tres usa PyMuPDF, así que no se toma ``BLOQUEO_FITZ``.
+    """
+
+    nombre = "tablas"
+
+    def __init__(self, motor: str = "pdfplumber") -> None:
+        self.motor = motor
+
+    def _tablas_pdfplumber(self, entrada: EntradaExtraccion) -> List[Tabla]:
+        if entrada.contenido is None:
+            return []
+        with pdfplumber.open(io.BytesIO(entrada.contenido())) as pdf:
+            return [tabla for pagina in pdf.pages for tabla in pagina.extract_tables()]
+
+    def _tablas_camelot(self, entrada: EntradaExtraccion) -> List[Tabla]:
+        if not CAMELOT_AVAILABLE:
+            raise RuntimeError("camelot no está instalado")
+        tablas = camelot.read_pdf(str(entrada.pdf_path), pages="all", password=entrada.password or None)
+        return [tabla.df.values.tolist() for tabla in tablas]
+
+    def _tablas_tabula(self, entrada: EntradaExtraccion) -> List[Tabla]:
+        if not TABULA_AVAILABLE:
+            raise RuntimeError("tabula no está instalado")
+        tablas = tabula.read_pdf(
+            str(entrada.pdf_path),
+            pages="all",
+            password=entrada.password or None,
+            multiple_tables=True,
+            pandas_options={"header": None, "dtype": str},
+        )
+        return [tabla.fillna("").values.tolist() for tabla in tablas]
+
+    def extraer(self, entrada: EntradaExtraccion) -> ResultadoExtraccion:
+        perfil = perfil_texto(entrada.banco)
+        if perfil is None:
+            return ResultadoExtraccion(motivo=f"sin perfil de columnas para {entrada.banco}")
+
+        lector = {
+            "pdfplumber": self._tablas_pdfplumber,
+            "camelot": self._tablas_camelot,
+            "tabula": self._tablas_tabula,
+        }.get(self.motor)
+        if lector is None:
+            return ResultadoExtraccion(motivo=f"motor de tablas desconocido: {self.motor}")
+
+        claves = [clave for clave, _ in perfil.columnas]
+        alias = {variante: clave for clave, variantes in perfil.columnas for variante in variantes}
+        registros: List[Dict[str, str]] = []
+
+        for tabla in lector(entrada):
+            columnas: Dict[int, str] = {}
+            for fila in tabla:
+                celdas = [" ".join(str(celda or "").split()) for celda in fila]
+                encabezados = {i: alias[normalizar_texto(c)] for i, c in enumerate(celdas) if normalizar_texto(c) in alias}
+                if len(encabezados) >= perfil.minimo_encabezados:
+                    columnas = encabezados
+                    continue
+                if not columnas:
+                    continue
+
+                registro = {clave: "" for clave in claves}
+                for indice, clave in columnas.items():
+                    if indice < len(celdas):
+                        registro[clave] = celdas[indice]
+                if es_fecha(registro.get("fecha", "")):
+                    registros.append(registro)
+
+        motivo = validar_registros(registros, perfil, entrada.formato_numerico())
+        if motivo:
+            return ResultadoExtraccion(motivo=motivo)
+        return ResultadoExtraccion(pd.DataFrame(registros))
+
+
+class BackendGemini(BackendExtraccion):
+    """Modelo de visión: el camino de respaldo para cualquier documento."""
+
+    nombre = "gemini"
+    local = False
+
+    def __init__(self, procesador: "ProcesadorGemini") -> None:
+        self.procesador = procesador
+
+    def extraer(self, entrada: EntradaExtraccion) -> ResultadoExtraccion:
+        if entrada.paginas is None:
+            return ResultadoExtraccion(motivo="páginas no disponibles")
+        df = self.procesador.extraer_transacciones(entrada.paginas, entrada.pdf_path.stem)
+        if df is None or df.empty:
+            return ResultadoExtraccion(df, motivo="Gemini no devolvió transacciones")
+        return ResultadoExtraccion(df)
+
+
+BACKENDS: Dict[str, Type[BackendExtraccion]] = {
+    BackendTextoNativo.nombre: BackendTextoNativo,
+    BackendTablas.nombre: BackendTablas,
+    BackendGemini.nombre: BackendGemini,
+}
+
+
+__all__ = [
+    "BACKENDS",
+    "BackendExtraccion",
+    "BackendGemini",
+    "BackendTablas",
+    "BackendTextoNativo",
+    "CAMELOT_AVAILABLE",
+    "EntradaExtraccion",
+    "ResultadoExtraccion",
+    "TABULA_AVAILABLE",
+]
@@ -0,0 +1,412 @@
+"""Microbenchmarks de las etapas locales del procesamiento.
+
+Uso::
+
+    python benchmarks.py conversion [ruta.pdf] [--password CLAVE] [--repeticiones N]
+    python benchmarks.py montos [--filas 10000 100000 1000000] [--repeticiones N]
+    python benchmarks.py tabla [--filas 10000 100000 1000000] [--repeticiones N]
+    python benchmarks.py excel [--filas 100000] [--repeticiones N]
+    python benchmarks.py salidas [--filas 100000] [--repeticiones N]
+    python benchmarks.py incremental [--archivos 300] [--latencia 0.5]
+
+Sin PDF se genera un extracto sintético en memoria; ``montos`` usa una
+columna sintética con la mezcla de formatos de los extractos y ``tabla``,
+transacciones sintéticas de Bancolombia con un 2 % de filas repetidas, que
+``excel`` y ``salidas`` escriben ya tipadas.  ``incremental`` procesa una
+carpeta de extractos sintéticos con un modelo simulado (sin red).  Los tiempos se
+miden con ``time.perf_counter`` y la memoria con ``tracemalloc`` (pico de
+asignaciones de Python durante una ejecución adicional).
+"""
+
+from __future__ import annotations
+
+import argparse
+import random
+import statistics
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+import fitz  # PyMuPDF
+import numpy as np
+import pandas as pd
+
+from escritores import (
+    PYARROW_AVAILABLE,
+    XLSXWRITER_AVAILABLE,
+    EscritorCSV,
+    EscritorExcel,
+    EscritorExcelOpenpyxl,
+    EscritorParquet,
+    EscritorSalida,
+)
+from modelo_simulado import ModeloSimulado
+from paginas import ESCALA_RENDER, pixmap_a_imagen, pixmap_a_imagen_png
+from tabla_transacciones import tabla_desde_registros
+from valores_monetarios import (
+    FormatoNumerico,
+    MontoIlegible,
+    interpretar_monto,
+    interpretar_montos,
+    limpiar_valor_monetario,
+)
+
+
+def _documento_sintetico(paginas: int = 5, filas: int = 40) -> fitz.Document:
+    documento = fitz.open()
+    for numero in range(paginas):
+        pagina = documento.new_page()
+        y = 60
+        pagina.insert_text((40, y), f"EXTRACTO SINTÉTICO - PÁGINA {numero + 1}", fontsize=11)
+        for fila in range(filas):
+            y += 17
+            pagina.insert_text(
+                (40, y),
+                f"{fila % 28 + 1:02d}/01  COMPRA ESTABLECIMIENTO {numero}-{fila}   "
+                f"{1000 + fila * 37:,.2f}   {250000 - fila * 37:,.2f}",
+                fontsize=8,
+            )
+    return documento
+
+
+def _abrir(ruta: Optional[str], password: Optional[str]) -> fitz.Document:
+    if not ruta:
+        return _documento_sintetico()
+    documento = fitz.open(Path(ruta))
+    if documento.needs_pass and not documento.authenticate(password or ""):
+        raise SystemExit("No fue posible autenticar el PDF con la contraseña indicada")
+    return documento
+
+
+def _medir(funcion: Callable[[], object], repeticiones: int) -> Dict[str, float]:
+    tiempos: List[float] = []
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        funcion()
+        tiempos.append(time.perf_counter() - inicio)
+    # La memoria se mide en una ejecución aparte: ``tracemalloc`` encarece
+    # cada asignación y distorsionaría los tiempos del código Python.
+    tracemalloc.start()
+    funcion()
+    pico = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return {"ms": statistics.median(tiempos) * 1000, "kib": pico / 1024}
+
+
+def medir_conversion_paginas(documento: fitz.Document, repeticiones: int = 5) -> Dict[str, Dict[str, float]]:
+    """Compara por página la conversión Pixmap→PIL cruda contra la vía PNG."""
+
+    matriz = fitz.Matrix(ESCALA_RENDER, ESCALA_RENDER)
+    pixmaps = [pagina.get_pixmap(matrix=matriz, alpha=False) for pagina in documento]
+    resultados: Dict[str, Dict[str, float]] = {}
+    for nombre, convertir in (("png", pixmap_a_imagen_png), ("crudo", pixmap_a_imagen)):
+        medicion = _medir(lambda: [convertir(pix) for pix in pixmaps], repeticiones)
+        resultados[nombre] = {
+            "ms_por_pagina": medicion["ms"] / len(pixmaps),
+            "kib_pico": medicion["kib"],
+        }
+    return resultados
+
+
+def _montos_sinteticos(filas: int, semilla: int = 0) -> pd.Series:
+    """Columna con la mezcla de formatos que devuelven los extractos."""
+
+    azar = random.Random(semilla)
+    formatos = (
+        lambda n: f"${n:,.2f}".replace(",", "_").replace(".", ",").replace("_", "."),
+        lambda n: f"({n:,.2f})".replace(",", "_").replace(".", ",").replace("_", "."),
+        lambda n: f"COP {n:,.0f}".replace(",", "."),
+        lambda n: f"USD {n:,.2f}",
+        lambda n: f"-{n:.2f}".replace(".", ","),
+        lambda n: "",
+        lambda n: None,
+        lambda n: "N/A",
+    )
+    return pd.Series(
+        [azar.choice(formatos)(azar.uniform(0, 5_000_000)) for _ in range(filas)], dtype=object, name="valor"
+    )
+
+
+def medir_montos(filas: int, repeticiones: int = 3) -> Dict[str, Dict[str, float]]:
+    """``apply`` celda a celda contra la versión por columna.
+
+    ``apply`` es la limpieza histórica; ``perfil_celda`` y ``perfil`` el
+    intérprete con formato numérico por banco, celda a celda y por columna.
+    """
+
+    serie = _montos_sinteticos(filas)
+    tabla = pd.DataFrame({"Valor": serie})
+    formato = FormatoNumerico()
+
+    def perfil_celda(valor: object) -> float:
+        try:
+            return interpretar_monto(valor, formato)
+        except MontoIlegible:
+            return np.nan
+
+    celda_a_celda, por_columna = serie.apply(perfil_celda), interpretar_montos(tabla, formato)[0]["Valor"]
+    if not np.array_equal(celda_a_celda.to_numpy().view(np.int64), por_columna.to_numpy().view(np.int64)):
+        raise SystemExit("La versión vectorizada no coincide bit a bit con la celda a celda")
+
+    resultados: Dict[str, Dict[str, float]] = {}
+    for nombre, limpiar in (
+        ("apply", lambda: serie.apply(limpiar_valor_monetario)),
+        ("perfil_celda", lambda: serie.apply(perfil_celda)),
+        ("perfil", lambda: interpretar_montos(tabla, formato)),
+    ):
+        medicion = _medir(limpiar, repeticiones)
+        resultados[nombre] = {"ms": medicion["ms"], "ns_por_fila": medicion["ms"] * 1e6 / filas, "kib_pico": medicion["kib"]}
+    return resultados
+
+
+def _registros_sinteticos(filas: int, semilla: int = 0) -> List[Dict[str, str]]:
+    """Transacciones como las entrega el modelo: solo texto, con repetidas."""
+
+    azar = random.Random(semilla)
+    sucursales = ["", "BOGOTA", "MEDELLIN", "CALI", "BARRANQUILLA", "SUCURSAL VIRTUAL"]
+    comercios = [f"COMPRA EN COMERCIO {numero:04d}" for numero in range(2_000)]
+    saldo = 5_000_000.0
+    registros: List[Dict[str, str]] = []
+    for fila in range(filas):
+        if registros and azar.random() < 0.02:
+            registros.append(dict(azar.choice(registros)))
+            continue
+        valor = -azar.uniform(1_000, 900_000) if azar.random() < 0.8 else azar.uniform(100_000, 5_000_000)
+        saldo += valor
+        registros.append(
+            {
+                "fecha": f"{fila * 28 // filas + 1:02d}/{azar.randint(1, 12):02d}",
+                "descripcion": azar.choice(comercios),
+                "sucursal": azar.choice(sucursales),
+                "dcto": str(azar.randint(0, 99_999)) if azar.random() < 0.3 else "",
+                "valor": f"{valor:,.2f}".replace(",", "_").replace(".", ",").replace("_", "."),
+                "saldo": f"{saldo:,.2f}".replace(",", "_").replace(".", ",").replace("_", "."),
+            }
+        )
+    return registros
+
+
+def medir_tabla(filas: int, repeticiones: int = 3) -> Dict[str, Dict[str, float]]:
+    """``DataFrame`` de objetos con ``drop_duplicates`` contra la tabla tipada.
+
+    ``objeto`` reproduce la normalización anterior (``DataFrame`` de cadenas,
+    copia, ``drop_duplicates`` sobre el texto y conversión de montos);
+    ``tipada`` construye las columnas con tipo directamente desde los
+    registros.  Se mide también deduplicar y ordenar por fecha y valor la
+    tabla ya construida.
+    """
+
+    registros = _registros_sinteticos(filas)
+
+    def objeto() -> pd.DataFrame:
+        df = pd.DataFrame(registros).copy()
+        df = df.drop_duplicates().reset_index(drop=True)
+        return interpretar_montos(df, FormatoNumerico())[0]
+
+    def tipada() -> pd.DataFrame:
+        df = tabla_desde_registros(registros, "bancolombia", anio=2024)
+        return df.drop_duplicates().reset_index(drop=True)
+
+    def centavos() -> pd.DataFrame:
+        df = tabla_desde_registros(registros, "bancolombia", anio=2024, centavos=True)
+        return df.drop_duplicates().reset_index(drop=True)
+
+    resultados: Dict[str, Dict[str, float]] = {}
+    for nombre, construir, base in (
+        ("objeto", objeto, lambda: pd.DataFrame(registros)),
+        ("tipada", tipada, lambda: tabla_desde_registros(registros, "bancolombia", anio=2024)),
+        ("centavos", centavos, lambda: tabla_desde_registros(registros, "bancolombia", anio=2024, centavos=True)),
+    ):
+        tabla = construir()
+        sin_repetir = base()
+        medicion = _medir(construir, repeticiones)
+        resultados[nombre] = {
+            "ms": medicion["ms"],
+            "dedup_ms": _medir(sin_repetir.drop_duplicates, repeticiones)["ms"],
+            "orden_ms": _medir(lambda: tabla.sort_values(["fecha", "valor"]), repeticiones)["ms"],
+            "bytes_fila": tabla.memory_usage(deep=True).sum() / len(tabla),
+            "kib_pico": medicion["kib"],
+        }
+    return resultados
+
+
+def medir_excel(filas: int, repeticiones: int = 3) -> Dict[str, Dict[str, float]]:
+    """Escritura del libro con ``pd.ExcelWriter`` contra los motores fila a fila de :class:`EscritorExcel`."""
+
+    resultados: Dict[str, Dict[str, float]] = {}
+    tabla = tabla_desde_registros(_registros_sinteticos(filas), "bancolombia", anio=2024)
+    with tempfile.TemporaryDirectory() as carpeta:
+        escritores: Dict[str, EscritorSalida] = {
+            "pd.ExcelWriter": EscritorExcelOpenpyxl(),
+            "write_only": EscritorExcel(motor="openpyxl"),
+        }
+        if XLSXWRITER_AVAILABLE:
+            escritores["constant_memory"] = EscritorExcel(motor="xlsxwriter")
+        for nombre, escritor in escritores.items():
+            medicion = _medir(lambda: escritor.escribir({"bancolombia": tabla}, Path(carpeta)), repeticiones)
+            ruta = escritor.escribir({"bancolombia": tabla}, Path(carpeta))
+            resultados[nombre] = {
+                "ms": medicion["ms"],
+                "filas_s": filas / medicion["ms"] * 1000,
+                "kib_pico": medicion["kib"],
+                "kib_archivo": ruta.stat().st_size / 1024,
+            }
+    return resultados
+
+
+def medir_salidas(filas: int, repeticiones: int = 3) -> Dict[str, Dict[str, float]]:
+    """Escribir cada salida y volver a leer un mes, como lo hace el análisis posterior.
+
+    El Excel y el CSV se leen completos y se filtran; el Parquet (si pyarrow
+    está instalado) lee solo la partición del mes.
+    """
+
+    tabla = tabla_desde_registros(_registros_sinteticos(filas), "bancolombia", anio=2024)
+    tabla.attrs.update(banco="bancolombia", cuenta="bancolombia", origen="bancolombia_2024.pdf")
+    resultados_hojas = {"bancolombia_2024": tabla}
+    enero = (pd.Timestamp("2024-01-01"), pd.Timestamp("2024-02-01"))
+
+    def del_mes(df: pd.DataFrame) -> pd.DataFrame:
+        fechas = pd.to_datetime(df["fecha"])
+        return df[(fechas >= enero[0]) & (fechas < enero[1])]
+
+    escritores: Dict[str, EscritorSalida] = {"excel": EscritorExcel(), "csv": EscritorCSV()}
+    lectores: Dict[str, Callable[[Path], pd.DataFrame]] = {
+        "excel": lambda ruta: del_mes(pd.read_excel(ruta, engine="openpyxl")),
+        "csv": lambda ruta: del_mes(pd.read_csv(ruta)),
+    }
+    if PYARROW_AVAILABLE:
+        escritores["parquet"] = EscritorParquet()
+        lectores["parquet"] = lambda ruta: pd.read_parquet(ruta, filters=[("mes", "==", "2024-01")])
+
+    resultados: Dict[str, Dict[str, float]] = {}
+    with tempfile.TemporaryDirectory() as carpeta:
+        for nombre, escritor in escritores.items():
+            escritura = _medir(lambda: escritor.escribir(resultados_hojas, Path(carpeta)), repeticiones)
+            ruta = escritor.escribir(resultados_hojas, Path(carpeta))
+            lectura = _medir(lambda: lectores[nombre](ruta), repeticiones)
+            tamano = sum(f.stat().st_size for f in ruta.rglob("*")) if ruta.is_dir() else ruta.stat().st_size
+            resultados[nombre] = {
+                "escritura_ms": escritura["ms"],
+                "lectura_mes_ms": lectura["ms"],
+                "filas_mes": len(lectores[nombre](ruta)),
+                "kib_archivo": tamano / 1024,
+            }
+    return resultados
+
+
+def medir_incremental(archivos: int, latencia: float = 0.5) -> Dict[str, Dict[str, float]]:
+    """Carpeta de ``archivos`` PDFs: ejecución completa contra agregar un extracto en modo incremental.
+
+    ``latencia`` es la demora simulada de cada solicitud al modelo.
+    """
+
+    from procesador_gemini import ProcesadorGemini
+
+    resultados: Dict[str, Dict[str, float]] = {}
+    with tempfile.TemporaryDirectory() as carpeta, tempfile.TemporaryDirectory() as estado:
+
+        def agregar(numero: int) -> None:
+            documento = _documento_sintetico(paginas=2, filas=20)
+            # Cada archivo necesita contenido propio: el manifiesto reconoce copias por su hash.
+            documento[0].insert_text((40, 30), f"ARCHIVO {numero}", fontsize=8)
+            documento.save(Path(carpeta) / f"bancolombia_{numero:04d}.pdf")
+            documento.close()
+
+        def procesar(incremental: bool) -> Dict[str, float]:
+            modelo = ModeloSimulado(latencia=latencia)
+            procesador = ProcesadorGemini(
+                api_key="simulada",
+                password="",
+                carpeta=carpeta,
+                log_callback=lambda _: None,
+                cliente_modelo=modelo,
+                max_workers=4,
+                usar_procesos=False,
+                usar_cache=False,
+                directorio_huellas=str(Path(estado) / "huellas"),
+                incremental=incremental,
+                directorio_manifiesto=str(Path(estado) / "manifiestos"),
+            )
+            inicio = time.perf_counter()
+            if procesador.procesar() is None:
+                raise SystemExit("La ejecución del benchmark no generó salida")
+            return {"ms": (time.perf_counter() - inicio) * 1000, "solicitudes": modelo.solicitudes}
+
+        for numero in range(archivos):
+            agregar(numero)
+        # La primera ejecución extrae todo y deja el manifiesto.
+        resultados["inicial"] = procesar(incremental=True)
+        agregar(archivos)
+        resultados["completa"] = procesar(incremental=False)
+        agregar(archivos + 1)
+        resultados["incremental"] = procesar(incremental=True)
+    return resultados
+
+
+def _imprimir(titulo: str, resultados: Dict[str, Dict[str, float]]) -> None:
+    print(titulo)
+    for nombre, metricas in resultados.items():
+        detalle = "  ".join(f"{clave}={valor:,.2f}" for clave, valor in metricas.items())
+        print(f"  {nombre:<12} {detalle}")
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    subcomandos = parser.add_subparsers(dest="comando", required=True)
+
+    conversion = subcomandos.add_parser("conversion", help="Pixmap → PIL: muestras crudas vs. PNG")
+    conversion.add_argument("pdf", nargs="?")
+    conversion.add_argument("--password")
+    conversion.add_argument("--repeticiones", type=int, default=5)
+
+    montos = subcomandos.add_parser("montos", help="Limpieza de montos: apply celda a celda vs. vectorizada")
+    montos.add_argument("--filas", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    montos.add_argument("--repeticiones", type=int, default=3)
+
+    tabla = subcomandos.add_parser("tabla", help="Normalización: DataFrame de objetos vs. tabla tipada")
+    tabla.add_argument("--filas", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    tabla.add_argument("--repeticiones", type=int, default=3)
+
+    excel = subcomandos.add_parser("excel", help="Escritura del Excel: pd.ExcelWriter vs. openpyxl write_only vs. xlsxwriter")
+    excel.add_argument("--filas", type=int, nargs="+", default=[100_000])
+    excel.add_argument("--repeticiones", type=int, default=3)
+
+    salidas = subcomandos.add_parser("salidas", help="Escribir y releer un mes: Excel vs. CSV vs. Parquet")
+    salidas.add_argument("--filas", type=int, nargs="+", default=[100_000])
+    salidas.add_argument("--repeticiones", type=int, default=3)
+
+    incremental = subcomandos.add_parser("incremental", help="Agregar un extracto: ejecución completa vs. incremental")
+    incremental.add_argument("--archivos", type=int, default=300)
+    incremental.add_argument("--latencia", type=float, default=0.5)
+
+    args = parser.parse_args(argv)
+    if args.comando == "conversion":
+        documento = _abrir(args.pdf, args.password)
+        _imprimir(
+            f"Conversión de {documento.page_count} página(s) a escala {ESCALA_RENDER}",
+            medir_conversion_paginas(documento, args.repeticiones),
+        )
+    elif args.comando == "montos":
+        for filas in args.filas:
+            _imprimir(f"Limpieza de {filas:,} montos (resultados idénticos bit a bit)", medir_montos(filas, args.repeticiones))
+    elif args.comando == "tabla":
+        for filas in args.filas:
+            _imprimir(f"Normalización de {filas:,} transacciones", medir_tabla(filas, args.repeticiones))
+    elif args.comando == "excel":
+        for filas in args.filas:
+            _imprimir(f"Escritura de {filas:,} transacciones en Excel", medir_excel(filas, args.repeticiones))
+    elif args.comando == "salidas":
+        for filas in args.filas:
+            _imprimir(f"Salidas de {filas:,} transacciones (lectura de un mes)", medir_salidas(filas, args.repeticiones))
+    elif args.comando == "incremental":
+        _imprimir(
+            f"Carpeta de {args.archivos} extractos más uno nuevo (latencia simulada {args.latencia} s)",
+            medir_incremental(args.archivos, args.latencia),
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,215 @@
+"""Caché persistente de resultados de extracción.
+
+Las entradas se direccionan por contenido: la clave es un SHA-256 calculado a
+partir de todo lo que determina la respuesta de Gemini (bytes del PDF, banco,
+prompt y modelo).  Cada entrada es un archivo JSON independiente, de modo que
+varios procesos pueden leer y escribir la caché sin coordinarse.  Cuando el
+tamaño total supera el límite configurado se eliminan las entradas usadas
+menos recientemente (LRU según la fecha de modificación).
+
+El tamaño total se lleva en memoria: el directorio se recorre una vez, al
+primer guardado, y después solo cuando hay que desalojar.  Lo que escriban
+otros procesos entretanto se contabiliza en ese recorrido.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from pathlib import Path
+from typing import Any, Dict, Optional, Union
+
+from logging_utils import configurar_logger
+
+
+logger, _ = configurar_logger("app.cache")
+
+
+DIRECTORIO_CACHE = Path.home() / ".extractor_bancario" / "cache"
+MAX_BYTES_CACHE = 256 * 1024 * 1024  # 256 MiB
+# Se desaloja hasta este fragmento del límite para no recorrer el directorio
+# en cada guardado una vez llena la caché.
+FRACCION_TRAS_DESALOJO = 0.9
+
+
+def calcular_clave(*partes: Union[str, bytes]) -> str:
+    """Combina las partes indicadas en una clave SHA-256 hexadecimal."""
+
+    digest = hashlib.sha256()
+    for parte in partes:
+        datos = parte.encode("utf-8") if isinstance(parte, str) else parte
+        # Prefijar la longitud evita colisiones entre concatenaciones distintas.
+        digest.update(len(datos).to_bytes(8, "big"))
+        digest.update(datos)
+    return digest.hexdigest()
+
+
+def huella_bytes(datos: bytes) -> str:
+    """SHA-256 hexadecimal de un bloque de bytes."""
+
+    return hashlib.sha256(datos).hexdigest()
+
+
+class CacheResultados:
+    """Almacén clave → JSON en disco con desalojo LRU por tamaño."""
+
+    def __init__(self, directorio: Optional[Union[str, Path]] = None, max_bytes: int = MAX_BYTES_CACHE) -> None:
+        self.directorio = Path(directorio) if directorio else DIRECTORIO_CACHE
+        self.max_bytes = max_bytes
+        self.directorio.mkdir(mode=0o700, parents=True, exist_ok=True)
+        try:
+            # La caché contiene movimientos bancarios: solo el usuario actual.
+            self.directorio.chmod(0o700)
+        except PermissionError:
+            logger.warning("No fue posible establecer permisos 700 en %s", self.directorio)
+        self._tamanos: Optional[Dict[Path, int]] = None
+        self._total = 0
+        self._lock = threading.Lock()
+
+    def __getstate__(self) -> Dict[str, Any]:
+        # El candado no se puede enviar a otro proceso y los tamaños que lleva
+        # este proceso dejan de valer en cuanto el otro escribe.
+        estado = self.__dict__.copy()
+        estado.pop("_lock", None)
+        estado["_tamanos"] = None
+        estado["_total"] = 0
+        return estado
+
+    def __setstate__(self, estado: Dict[str, Any]) -> None:
+        self.__dict__.update(estado)
+        self._lock = threading.Lock()
+
+    # ------------------------------------------------------------------
+    # Rutas
+    # ------------------------------------------------------------------
+    def _ruta(self, clave: str) -> Path:
+        return self.directorio / clave[:2] / f"{clave}.json"
+
+    def _entradas(self):
+        return self.directorio.glob("??/*.json")
+
+    # ------------------------------------------------------------------
+    # API pública
+    # ------------------------------------------------------------------
+    def obtener(self, clave: str) -> Optional[Any]:
+        """Devuelve el valor almacenado o ``None`` si no existe."""
+
+        ruta = self._ruta(clave)
+        try:
+            contenido = ruta.read_text(encoding="utf-8")
+        except FileNotFoundError:
+            return None
+        except OSError as exc:
+            logger.warning("No fue posible leer la entrada de caché %s: %s", ruta.name, exc)
+            return None
+
+        try:
+            valor = json.loads(contenido)
+        except json.JSONDecodeError:
+            logger.warning("Entrada de caché corrupta descartada: %s", ruta.name)
+            self._borrar(ruta)
+            return None
+
+        try:
+            # Marcar la entrada como usada recientemente para el desalojo LRU.
+            os.utime(ruta)
+        except OSError:
+            pass
+        return valor
+
+    def guardar(self, clave: str, valor: Any) -> None:
+        """Guarda ``valor`` (serializable a JSON) de forma atómica."""
+
+        ruta = self._ruta(clave)
+        ruta.parent.mkdir(mode=0o700, exist_ok=True)
+        datos = json.dumps(valor, ensure_ascii=False, default=str).encode("utf-8")
+
+        descriptor, temporal = tempfile.mkstemp(dir=ruta.parent, suffix=".tmp")
+        try:
+            with os.fdopen(descriptor, "wb") as archivo:
+                archivo.write(datos)
+            os.chmod(temporal, 0o600)
+            os.replace(temporal, ruta)
+        except Exception:
+            Path(temporal).unlink(missing_ok=True)
+            raise
+
+        with self._lock:
+            self._cargar_tamanos()
+            self._contabilizar(ruta, len(datos))
+            excedido = self._total > self.max_bytes
+        if excedido:
+            self._desalojar()
+
+    def eliminar(self, clave: str) -> None:
+        self._borrar(self._ruta(clave))
+
+    def limpiar(self) -> None:
+        """Elimina todas las entradas de la caché."""
+
+        for ruta in list(self._entradas()):
+            ruta.unlink(missing_ok=True)
+        with self._lock:
+            self._tamanos, self._total = {}, 0
+
+    def tamano_total(self) -> int:
+        with self._lock:
+            self._cargar_tamanos()
+            return self._total
+
+    # ------------------------------------------------------------------
+    # Contabilidad y desalojo
+    # ------------------------------------------------------------------
+    def _cargar_tamanos(self) -> None:
+        """Recorre el directorio la primera vez; llamar con ``_lock`` tomado."""
+
+        if self._tamanos is not None:
+            return
+        self._tamanos = {}
+        for ruta in self._entradas():
+            try:
+                self._tamanos[ruta] = ruta.stat().st_size
+            except FileNotFoundError:
+                continue
+        self._total = sum(self._tamanos.values())
+
+    def _contabilizar(self, ruta: Path, tamano: int) -> None:
+        anterior = self._tamanos.pop(ruta, 0) if self._tamanos is not None else 0
+        if self._tamanos is not None and tamano:
+            self._tamanos[ruta] = tamano
+        self._total += tamano - anterior
+
+    def _borrar(self, ruta: Path) -> None:
+        ruta.unlink(missing_ok=True)
+        with self._lock:
+            self._contabilizar(ruta, 0)
+
+    def _desalojar(self) -> None:
+        # Solo aquí se vuelve a recorrer el directorio: hace falta la fecha de
+        # uso de cada entrada y así se cuentan las de otros procesos.
+        entradas = []
+        for ruta in self._entradas():
+            try:
+                estado = ruta.stat()
+            except FileNotFoundError:
+                continue
+            entradas.append((estado.st_mtime, estado.st_size, ruta))
+
+        with self._lock:
+            self._tamanos = {ruta: tamano for _, tamano, ruta in entradas}
+            self._total = sum(self._tamanos.values())
+            if self._total <= self.max_bytes:
+                return
+            objetivo = self.max_bytes * FRACCION_TRAS_DESALOJO
+            for _, _, ruta in sorted(entradas):
+                ruta.unlink(missing_ok=True)
+                self._contabilizar(ruta, 0)
+                logger.debug("Entrada de caché desalojada: %s", ruta.name)
+                if self._total <= objetivo:
+                    break
+
+
+__all__ = ["CacheResultados", "calcular_clave", "huella_bytes", "DIRECTORIO_CACHE", "MAX_BYTES_CACHE"]
@@ -0,0 +1,505 @@
+"""Escritores de la salida consolidada.
+
+:class:`EscritorExcel` genera el ``.xlsx`` fila a fila, de modo que la memoria
+no crece con el tamaño del libro: con xlsxwriter en modo ``constant_memory``
+si está instalado (bastante más rápido) y, si no, con el modo ``write_only``
+de openpyxl.  Las filas se convierten por bloques y por columnas: las fechas
+pasan al número de serie de Excel con NumPy y cada texto distinto se limpia
+una sola vez.  Las celdas llevan formato según el tipo de la columna (fechas
+``DD/MM/YYYY``, montos ``#,##0.00``, centavos ``#,##0``) y los textos nunca
+se interpretan como fórmulas.
+
+:class:`EscritorExcelOpenpyxl` conserva la escritura anterior con
+``pd.ExcelWriter`` y openpyxl.
+
+Para análisis, :class:`EscritorParquet` y :class:`EscritorCSV` escriben una
+sola tabla larga (:func:`tabla_unificada`) con todas las transacciones y el
+archivo de origen de cada una.  El Parquet se particiona al estilo Hive por
+banco y mes (``banco=nu/mes=2024-01/``), así un mes se lee con un filtro sin
+abrir el resto::
+
+    leer_parquet("Extractos_Consolidados.parquet", filtros=[("mes", "==", "2024-01")])
+
+:func:`leer_parquet` lee las claves de partición como texto: con la
+inferencia por defecto (diccionarios) pyarrow no puede convertir a pandas un
+dataset con filas sin fecha.
+
+Todos escriben en un temporal de la misma carpeta y lo renombran al terminar:
+un fallo a mitad de camino deja intacta la salida anterior.
+"""
+
+from __future__ import annotations
+
+import contextlib
+import os
+import re
+import shutil
+import tempfile
+from abc import ABC, abstractmethod
+from pathlib import Path
+from typing import Callable, Dict, Iterator, List, Mapping, Optional, Tuple, Type
+
+import numpy as np
+import pandas as pd
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Font
+from openpyxl.utils import get_column_letter
+
+try:  # pragma: no-cover - dependencia opcional
+    import pyarrow as pa  # type: ignore
+    import pyarrow.dataset as ds  # type: ignore
+    import pyarrow.parquet as pq  # type: ignore
+
+    PYARROW_AVAILABLE = True
+except Exception:  # pragma: no-cover - pyarrow no disponible
+    pa = None
+    ds = None
+    pq = None
+    PYARROW_AVAILABLE = False
+
+try:  # pragma: no-cover - dependencia opcional
+    import xlsxwriter  # type: ignore
+
+    XLSXWRITER_AVAILABLE = True
+except Exception:  # pragma: no-cover - xlsxwriter no disponible
+    xlsxwriter = None
+    XLSXWRITER_AVAILABLE = False
+
+
+NOMBRE_EXCEL = "Extractos_Consolidados.xlsx"
+NOMBRE_CSV = "Extractos_Consolidados.csv"
+NOMBRE_PARQUET = "Extractos_Consolidados.parquet"
+COLUMNAS_ORIGEN = ("archivo", "banco", "cuenta")
+COLUMNAS_PARTICION = ("banco", "mes")
+FORMATO_FECHA_EXCEL = "DD/MM/YYYY"
+
+_FILAS_POR_BLOQUE = 10_000
+_MAX_CARACTERES_CELDA = 32_767
+_SERIE_EPOCA = 25_569  # número de serie de Excel del 1970-01-01
+_NS_POR_DIA = 86_400 * 10**9
+_CARACTERES_INVALIDOS = re.compile("[\x00-\x08\x0b\x0c\x0e-\x1f\ud800-\udfff￾￿]")
+_CARACTERES_HOJA = re.compile(r"[\[\]:*?/\\]")
+_CARACTERES_PARTICION = re.compile(r"[^0-9A-Za-z_.-]")
+_PARTICION_VACIA = "__HIVE_DEFAULT_PARTITION__"
+
+_FORMATO_FECHA_HORA = f"{FORMATO_FECHA_EXCEL} HH:MM"
+_FORMATO_MONTO = "#,##0.00"
+_FORMATO_ENTERO = "#,##0"
+
+
+def escribir_atomico(destino: Path, escribir: Callable[[Path], None]) -> Path:
+    """Llama a ``escribir`` con un temporal junto a ``destino`` y lo renombra al terminar."""
+
+    descriptor, temporal = tempfile.mkstemp(dir=destino.parent, prefix=f".{destino.name}.", suffix=".tmp")
+    os.close(descriptor)
+    try:
+        escribir(Path(temporal))
+        # ``mkstemp`` crea el archivo con permisos 600: se conservan los del anterior.
+        os.chmod(temporal, destino.stat().st_mode & 0o777 if destino.exists() else 0o644)
+        os.replace(temporal, destino)
+    except BaseException:
+        Path(temporal).unlink(missing_ok=True)
+        raise
+    return destino
+
+
+def reemplazar_directorio(destino: Path, escribir: Callable[[Path], None]) -> Path:
+    """Como :func:`escribir_atomico` para una carpeta completa.
+
+    Un directorio no se puede reemplazar con un solo ``rename``: el anterior
+    se aparta, el nuevo ocupa su lugar y solo entonces se borra el anterior.
+    """
+
+    temporal = Path(tempfile.mkdtemp(dir=destino.parent, prefix=f".{destino.name}.", suffix=".tmp"))
+    apartado = temporal.with_suffix(".old")
+    try:
+        escribir(temporal)
+        temporal.chmod(destino.stat().st_mode & 0o777 if destino.exists() else 0o755)
+        if destino.exists():
+            destino.rename(apartado)
+        os.replace(temporal, destino)
+    except BaseException:
+        if apartado.exists() and not destino.exists():
+            apartado.rename(destino)
+        shutil.rmtree(temporal, ignore_errors=True)
+        raise
+    shutil.rmtree(apartado, ignore_errors=True)
+    return destino
+
+
+def tabla_unificada(resultados: Mapping[str, pd.DataFrame]) -> pd.DataFrame:
+    """Todas las hojas en una tabla larga con su archivo, banco y cuenta de origen.
+
+    Las columnas son la unión de las de cada banco, en orden de aparición; las
+    que un banco no tiene quedan vacías.  El origen va como ``category``: se
+    repite en cada fila de un mismo archivo.
+    """
+
+    partes = []
+    for nombre, df in resultados.items():
+        origen = {
+            "archivo": df.attrs.get("origen", nombre),
+            "banco": df.attrs.get("banco", ""),
+            "cuenta": df.attrs.get("cuenta", ""),
+        }
+        partes.append(df.assign(**origen)[[*COLUMNAS_ORIGEN, *df.columns.difference(COLUMNAS_ORIGEN, sort=False)]])
+    if not partes:
+        return pd.DataFrame(columns=list(COLUMNAS_ORIGEN))
+    tabla = pd.concat(partes, ignore_index=True, sort=False)
+    # Las categorías de cada hoja son distintas y ``concat`` las degrada a texto.
+    categoricas = {
+        columna
+        for df in resultados.values()
+        for columna in df.columns
+        if isinstance(df[columna].dtype, pd.CategoricalDtype)
+    }
+    for columna in [*COLUMNAS_ORIGEN, *sorted(categoricas)]:
+        tabla[columna] = tabla[columna].astype("category")
+    tabla.attrs = {}
+    return tabla
+
+
+def particiones(tabla: pd.DataFrame) -> List[Tuple[str, pd.DataFrame]]:
+    """Ruta relativa ``banco=…/mes=…`` y filas de cada partición de ``tabla``."""
+
+    fechas = tabla["fecha"] if "fecha" in tabla else pd.Series(pd.NaT, index=tabla.index)
+    meses = pd.to_datetime(fechas, errors="coerce").dt.strftime("%Y-%m").fillna(_PARTICION_VACIA)
+    bancos = tabla["banco"].astype(str).replace("", _PARTICION_VACIA).str.replace(_CARACTERES_PARTICION, "_", regex=True)
+    resultado: List[Tuple[str, pd.DataFrame]] = []
+    for (banco, mes), grupo in tabla.groupby([bancos.to_numpy(), meses.to_numpy()], sort=True):
+        resultado.append((f"banco={banco}/mes={mes}", grupo.drop(columns="banco")))
+    return resultado
+
+
+def nombres_hojas(nombres: List[str]) -> List[str]:
+    """Nombres válidos y únicos para Excel: sin ``[]:*?/\\`` y de hasta 31 caracteres."""
+
+    usados: Dict[str, int] = {}
+    resultado: List[str] = []
+    for nombre in nombres:
+        base = _CARACTERES_HOJA.sub("_", str(nombre)).strip("'")[:31] or "Hoja"
+        candidato, numero = base, 1
+        while candidato.lower() in usados:
+            numero += 1
+            sufijo = f"_{numero}"
+            candidato = base[: 31 - len(sufijo)] + sufijo
+        usados[candidato.lower()] = 1
+        resultado.append(candidato)
+    return resultado
+
+
+def _valor_texto(valor: object) -> object:
+    """Valor de una celda de una columna de objetos; ``None`` si queda vacía."""
+
+    if isinstance(valor, (bool, np.bool_)):
+        return bool(valor)
+    if isinstance(valor, (int, np.integer)):
+        return int(valor)
+    if isinstance(valor, (float, np.floating)):
+        return float(valor) if np.isfinite(valor) else None
+    texto = valor if isinstance(valor, str) else str(valor)
+    # openpyxl rechaza los caracteres de control que XML no admite.
+    return _CARACTERES_INVALIDOS.sub("", texto[:_MAX_CARACTERES_CELDA]) or None
+
+
+class _ColumnaXlsx:
+    """Convierte una columna a valores de celda con el formato de su tipo."""
+
+    def __init__(self, serie: pd.Series) -> None:
+        self.formato: Optional[str] = None
+        self.ancho: Optional[int] = None
+        if pd.api.types.is_bool_dtype(serie):
+            self.tipo = "bool"
+        elif pd.api.types.is_datetime64_any_dtype(serie):
+            ns = serie.to_numpy(dtype="datetime64[ns]").view(np.int64)
+            con_hora = bool((ns[serie.notna().to_numpy()] % _NS_POR_DIA).any())
+            self.tipo = "fecha"
+            self.formato = _FORMATO_FECHA_HORA if con_hora else FORMATO_FECHA_EXCEL
+            self.ancho = 17 if con_hora else 12
+        elif pd.api.types.is_integer_dtype(serie):
+            self.tipo, self.formato, self.ancho = "entero", _FORMATO_ENTERO, 16
+        elif pd.api.types.is_float_dtype(serie):
+            self.tipo, self.formato, self.ancho = "numero", _FORMATO_MONTO, 16
+        else:
+            self.tipo = "texto"
+
+    def valores(self, serie: pd.Series) -> List[object]:
+        if self.tipo == "texto":
+            codigos, unicos = pd.factorize(serie.to_numpy(dtype=object), use_na_sentinel=True)
+            limpios = [_valor_texto(valor) for valor in unicos] + [None]
+            return [limpios[codigo] for codigo in codigos.tolist()]
+
+        faltantes = serie.isna().to_numpy()
+        if self.tipo == "bool":
+            valores = [bool(valor) for valor in serie.fillna(False).tolist()]
+        elif self.tipo == "fecha":
+            # Número de serie de Excel: openpyxl no convierte cada ``datetime``.
+            ns = serie.to_numpy(dtype="datetime64[ns]").view(np.int64)
+            numeros = ns / _NS_POR_DIA + _SERIE_EPOCA
+            if self.formato == FORMATO_FECHA_EXCEL:
+                valores = np.floor(numeros).astype(np.int64).tolist()
+            else:
+                valores = numeros.tolist()
+        elif self.tipo == "entero":
+            valores = serie.to_numpy(dtype=np.int64, na_value=0).tolist()
+        else:
+            numeros = serie.to_numpy(dtype=np.float64, na_value=np.nan)
+            faltantes = ~np.isfinite(numeros)
+            valores = numeros.tolist()
+        return [None if faltante else valor for valor, faltante in zip(valores, faltantes.tolist())]
+
+
+class EscritorSalida(ABC):
+    """Interfaz común de los destinos del resultado consolidado."""
+
+    nombre: str = ""
+
+    @abstractmethod
+    def escribir(self, resultados: Mapping[str, pd.DataFrame], carpeta: Path) -> Path:
+        """Escribe todas las hojas y devuelve la ruta generada."""
+
+        raise NotImplementedError
+
+
+class EscritorExcel(EscritorSalida):
+    """``.xlsx`` escrito fila a fila con celdas tipadas.
+
+    ``motor`` es ``"xlsxwriter"`` (``constant_memory``) u ``"openpyxl"``
+    (``write_only``); por defecto, xlsxwriter si está instalado.
+    """
+
+    nombre = "excel"
+    motores = ("xlsxwriter", "openpyxl")
+
+    def __init__(
+        self, archivo: str = NOMBRE_EXCEL, filas_por_bloque: int = _FILAS_POR_BLOQUE, motor: Optional[str] = None
+    ) -> None:
+        motor = motor or ("xlsxwriter" if XLSXWRITER_AVAILABLE else "openpyxl")
+        if motor not in self.motores:
+            raise ValueError(f"Motor de Excel desconocido: {motor!r} (disponibles: {', '.join(self.motores)})")
+        if motor == "xlsxwriter" and not XLSXWRITER_AVAILABLE:
+            raise RuntimeError("xlsxwriter no está instalado; use motor='openpyxl'")
+        self.archivo = archivo
+        self.filas_por_bloque = filas_por_bloque
+        self.motor = motor
+
+    def escribir(self, resultados: Mapping[str, pd.DataFrame], carpeta: Path) -> Path:
+        escribir_libro = self._escribir_xlsxwriter if self.motor == "xlsxwriter" else self._escribir_openpyxl
+        return escribir_atomico(Path(carpeta) / self.archivo, lambda ruta: escribir_libro(resultados, ruta))
+
+    def _filas(self, df: pd.DataFrame, columnas: List[_ColumnaXlsx]) -> Iterator[Tuple[object, ...]]:
+        for inicio in range(0, len(df), self.filas_por_bloque):
+            bloque = df.iloc[inicio : inicio + self.filas_por_bloque]
+            yield from zip(*(columna.valores(bloque.iloc[:, indice]) for indice, columna in enumerate(columnas)))
+
+    def _escribir_xlsxwriter(self, resultados: Mapping[str, pd.DataFrame], ruta: Path) -> None:
+        opciones = {
+            "constant_memory": True,
+            # Una descripción que empieza por "=" o parece una URL sigue siendo texto.
+            "strings_to_formulas": False,
+            "strings_to_urls": False,
+            "strings_to_numbers": False,
+        }
+        libro = xlsxwriter.Workbook(str(ruta), opciones)
+        try:
+            negrita = libro.add_format({"bold": True})
+            formatos: Dict[str, object] = {}
+            for nombre, df in zip(nombres_hojas(list(resultados)), resultados.values()):
+                hoja = libro.add_worksheet(nombre)
+                columnas = [_ColumnaXlsx(df.iloc[:, indice]) for indice in range(df.shape[1])]
+                por_columna = []
+                for indice, columna in enumerate(columnas):
+                    formato = None
+                    if columna.formato:
+                        formato = formatos.setdefault(columna.formato, libro.add_format({"num_format": columna.formato}))
+                    por_columna.append(formato)
+                    if columna.ancho:
+                        hoja.set_column(indice, indice, columna.ancho)
+                for indice, nombre_columna in enumerate(df.columns):
+                    hoja.write_string(0, indice, str(_valor_texto(nombre_columna) or ""), negrita)
+                for numero, fila in enumerate(self._filas(df, columnas), start=1):
+                    for indice, valor in enumerate(fila):
+                        if valor is None:
+                            continue
+                        if isinstance(valor, bool):
+                            hoja.write_boolean(numero, indice, valor)
+                        elif isinstance(valor, str):
+                            hoja.write_string(numero, indice, valor)
+                        else:
+                            hoja.write_number(numero, indice, valor, por_columna[indice])
+        finally:
+            libro.close()
+
+    def _escribir_openpyxl(self, resultados: Mapping[str, pd.DataFrame], ruta: Path) -> None:
+        libro = Workbook(write_only=True)
+        try:
+            for nombre, df in zip(nombres_hojas(list(resultados)), resultados.values()):
+                hoja = libro.create_sheet(nombre)
+                columnas = [_ColumnaXlsx(df.iloc[:, indice]) for indice in range(df.shape[1])]
+                # Los anchos deben fijarse antes de la primera fila.
+                for indice, columna in enumerate(columnas, start=1):
+                    if columna.ancho:
+                        hoja.column_dimensions[get_column_letter(indice)].width = columna.ancho
+
+                negrita = Font(bold=True)
+                encabezado = []
+                for nombre_columna in df.columns:
+                    celda = WriteOnlyCell(hoja, value=_valor_texto(nombre_columna))
+                    celda.font = negrita
+                    encabezado.append(celda)
+                hoja.append(encabezado)
+
+                def celda(valor: object, formato: Optional[str]) -> object:
+                    if isinstance(valor, str) and valor.startswith("="):
+                        # openpyxl toma como fórmula todo texto que empieza por "=".
+                        texto = WriteOnlyCell(hoja, value=valor)
+                        texto.data_type = "s"
+                        return texto
+                    if valor is None or formato is None:
+                        return valor
+                    numero = WriteOnlyCell(hoja, value=valor)
+                    numero.number_format = formato
+                    return numero
+
+                formatos = [columna.formato for columna in columnas]
+                for fila in self._filas(df, columnas):
+                    hoja.append([celda(valor, formato) for valor, formato in zip(fila, formatos)])
+            libro.save(ruta)
+        finally:
+            _descartar_hojas(libro)
+
+
+def _descartar_hojas(libro: Workbook) -> None:
+    """Cierra las hojas *write-only* de ``libro`` y borra sus temporales.
+
+    openpyxl vuelca cada hoja a un archivo temporal que solo ``save`` cierra y
+    borra; si la escritura falla antes, esos archivos (con los movimientos en
+    claro) quedarían en disco hasta que termine el proceso.
+    """
+
+    for hoja in libro.worksheets:
+        escritor = getattr(hoja, "_writer", None)
+        if escritor is None or not os.path.exists(escritor.out):
+            continue
+        filas = getattr(hoja, "_rows", None)
+        with contextlib.suppress(Exception):
+            if filas is not None:
+                filas.close()
+        with contextlib.suppress(Exception):
+            escritor.close()
+        escritor.cleanup()
+
+
+class EscritorExcelOpenpyxl(EscritorSalida):
+    """La escritura anterior con ``pd.ExcelWriter``: arma el libro completo en memoria."""
+
+    nombre = "excel_openpyxl"
+
+    def __init__(self, archivo: str = NOMBRE_EXCEL) -> None:
+        self.archivo = archivo
+
+    def escribir(self, resultados: Mapping[str, pd.DataFrame], carpeta: Path) -> Path:
+        def escribir_libro(ruta: Path) -> None:
+            with pd.ExcelWriter(
+                ruta, engine="openpyxl", date_format=FORMATO_FECHA_EXCEL, datetime_format=FORMATO_FECHA_EXCEL
+            ) as writer:
+                for nombre, df in zip(nombres_hojas(list(resultados)), resultados.values()):
+                    df.to_excel(writer, sheet_name=nombre, index=False)
+
+        return escribir_atomico(Path(carpeta) / self.archivo, escribir_libro)
+
+
+class EscritorCSV(EscritorSalida):
+    """:func:`tabla_unificada` en un solo CSV UTF-8 con fechas ISO."""
+
+    nombre = "csv"
+
+    def __init__(self, archivo: str = NOMBRE_CSV) -> None:
+        self.archivo = archivo
+
+    def escribir(self, resultados: Mapping[str, pd.DataFrame], carpeta: Path) -> Path:
+        tabla = tabla_unificada(resultados)
+        return escribir_atomico(
+            Path(carpeta) / self.archivo,
+            lambda ruta: tabla.to_csv(ruta, index=False, encoding="utf-8", date_format="%Y-%m-%d"),
+        )
+
+
+class EscritorParquet(EscritorSalida):
+    """:func:`tabla_unificada` como dataset Parquet particionado por banco y mes.
+
+    Cada partición es ``banco=…/mes=…/part-0.parquet``; las filas sin fecha
+    van a ``mes=__HIVE_DEFAULT_PARTITION__``, que pyarrow lee como nulo.
+    Todas las particiones comparten el esquema de la tabla completa, así una
+    columna que en un mes viene vacía no cambia de tipo.  Requiere pyarrow.
+    """
+
+    nombre = "parquet"
+
+    def __init__(self, carpeta: str = NOMBRE_PARQUET, compresion: str = "zstd") -> None:
+        if not PYARROW_AVAILABLE:
+            raise RuntimeError("pyarrow no está instalado; se requiere para la salida Parquet")
+        self.carpeta = carpeta
+        self.compresion = compresion
+
+    def escribir(self, resultados: Mapping[str, pd.DataFrame], carpeta: Path) -> Path:
+        tabla = tabla_unificada(resultados)
+        esquema = pa.Schema.from_pandas(tabla.drop(columns="banco"), preserve_index=False)
+
+        def escribir_dataset(raiz: Path) -> None:
+            for ruta, grupo in particiones(tabla):
+                destino = raiz / ruta
+                destino.mkdir(parents=True, exist_ok=True)
+                pq.write_table(
+                    pa.Table.from_pandas(grupo, schema=esquema, preserve_index=False),
+                    destino / "part-0.parquet",
+                    compression=self.compresion,
+                )
+
+        return reemplazar_directorio(Path(carpeta) / self.carpeta, escribir_dataset)
+
+
+def leer_parquet(ruta: Path, filtros: Optional[List[Tuple[str, str, object]]] = None) -> pd.DataFrame:
+    """Lee el dataset de :class:`EscritorParquet`, opcionalmente filtrado por partición.
+
+    ``banco`` y ``mes`` se leen como texto; ``mes`` queda nulo en las filas
+    sin fecha.
+    """
+
+    if not PYARROW_AVAILABLE:
+        raise RuntimeError("pyarrow no está instalado; se requiere para leer la salida Parquet")
+    esquema = pa.schema([(columna, pa.string()) for columna in COLUMNAS_PARTICION])
+    return pd.read_parquet(ruta, partitioning=ds.partitioning(esquema, flavor="hive"), filters=filtros)
+
+
+ESCRITORES: Dict[str, Type[EscritorSalida]] = {
+    EscritorExcel.nombre: EscritorExcel,
+    EscritorExcelOpenpyxl.nombre: EscritorExcelOpenpyxl,
+    EscritorCSV.nombre: EscritorCSV,
+    EscritorParquet.nombre: EscritorParquet,
+}
+
+
+__all__ = [
+    "COLUMNAS_ORIGEN",
+    "COLUMNAS_PARTICION",
+    "ESCRITORES",
+    "EscritorCSV",
+    "EscritorExcel",
+    "EscritorExcelOpenpyxl",
+    "EscritorParquet",
+    "EscritorSalida",
+    "FORMATO_FECHA_EXCEL",
+    "NOMBRE_CSV",
+    "NOMBRE_EXCEL",
+    "NOMBRE_PARQUET",
+    "PYARROW_AVAILABLE",
+    "XLSXWRITER_AVAILABLE",
+    "escribir_atomico",
+    "leer_parquet",
+    "nombres_hojas",
+    "particiones",
+    "reemplazar_directorio",
+    "tabla_unificada",
+]
@@ -0,0 +1,105 @@
+"""Esquemas de salida estructurada por banco.
+
+Con ``response_mime_type="application/json"`` y un ``response_schema`` el
+modelo responde siempre con JSON válido que sigue el esquema: no hay cercas
+de código, texto adicional ni claves inventadas.  El análisis se reduce a un
+``json.loads`` seguido de :func:`validar_transacciones`, que comprueba los
+tipos y devuelve filas con exactamente las columnas del banco.
+
+Las columnas salen de los perfiles de :mod:`texto_nativo`, de modo que el
+modelo, la capa de texto y los extractores de tablas producen las mismas
+claves.
+"""
+
+from __future__ import annotations
+
+from typing import Any, Dict, List, Tuple
+
+from texto_nativo import perfil_texto
+
+
+CLAVE_TRANSACCIONES = "transacciones"
+
+
+class RespuestaInvalida(ValueError):
+    """La respuesta es JSON válido pero no cumple el esquema del banco."""
+
+
+def columnas_banco(banco: str) -> Tuple[str, ...]:
+    perfil = perfil_texto(banco) or perfil_texto("bancolombia")
+    return tuple(clave for clave, _ in perfil.columnas)
+
+
+def esquema_respuesta(banco: str) -> Dict[str, Any]:
+    """Esquema OpenAPI (subconjunto aceptado por Gemini) de la respuesta."""
+
+    columnas = columnas_banco(banco)
+    fila = {
+        "type": "object",
+        "properties": {columna: {"type": "string"} for columna in columnas},
+        "required": list(columnas),
+    }
+    return {
+        "type": "object",
+        "properties": {CLAVE_TRANSACCIONES: {"type": "array", "items": fila}},
+        "required": [CLAVE_TRANSACCIONES],
+    }
+
+
+def configuracion_generacion(banco: str) -> Dict[str, Any]:
+    return {
+        "temperature": 0.0,
+        "response_mime_type": "application/json",
+        "response_schema": esquema_respuesta(banco),
+    }
+
+
+def validar_transacciones(datos: Any, banco: str) -> List[Dict[str, str]]:
+    """Comprueba la forma de la respuesta y normaliza cada fila.
+
+    Las columnas ausentes o nulas quedan como cadena vacía, los números se
+    convierten a texto (el modo sin esquema a veces los devuelve así) y las
+    claves ajenas al banco se descartan.  Cualquier otro tipo es un error.
+    """
+
+    if isinstance(datos, list):
+        # Respuestas del modo sin esquema que omiten el envoltorio.
+        datos = {CLAVE_TRANSACCIONES: datos}
+    if not isinstance(datos, dict):
+        raise RespuestaInvalida(f"se esperaba un objeto JSON, llegó {type(datos).__name__}")
+
+    filas = datos.get(CLAVE_TRANSACCIONES, [])
+    if not isinstance(filas, list):
+        raise RespuestaInvalida(f"'{CLAVE_TRANSACCIONES}' debe ser una lista")
+
+    return [validar_fila(fila, banco, numero) for numero, fila in enumerate(filas, start=1)]
+
+
+def validar_fila(fila: Any, banco: str, numero: int = 1) -> Dict[str, str]:
+    """Valida una sola transacción (también usada al recibir en *streaming*)."""
+
+    if not isinstance(fila, dict):
+        raise RespuestaInvalida(f"la transacción {numero} no es un objeto")
+    registro: Dict[str, str] = {}
+    for columna in columnas_banco(banco):
+        valor = fila.get(columna)
+        if valor is None:
+            registro[columna] = ""
+        elif isinstance(valor, str):
+            registro[columna] = valor.strip()
+        elif isinstance(valor, (int, float)) and not isinstance(valor, bool):
+            registro[columna] = str(valor)
+        else:
+            raise RespuestaInvalida(f"la transacción {numero} tiene '{columna}' de tipo {type(valor).__name__}")
+    return registro
+
+
+__all__ = [
+    "CLAVE_TRANSACCIONES",
+    "RespuestaInvalida",
+    "columnas_banco",
+    "configuracion_generacion",
+    "esquema_respuesta",
+    "validar_fila",
+    "validar_transacciones",
+]
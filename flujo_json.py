@@ -0,0 +1,96 @@
+"""Análisis incremental de respuestas JSON recibidas por fragmentos.
+
+:class:`ParserTransacciones` recibe el texto tal como llega del modelo en
+modo *streaming* y devuelve cada transacción en cuanto se cierra su objeto,
+sin esperar al final de la respuesta.  Se reconocen tanto la forma
+``{"transacciones": [{...}, ...]}`` como una lista suelta ``[{...}, ...]``;
+el texto fuera del JSON (cercas de código, comentarios) se ignora.
+
+Si la respuesta se corta, las filas ya cerradas siguen siendo válidas: el
+llamador las conserva y :meth:`ParserTransacciones.terminar` informa que el
+documento quedó incompleto.
+"""
+
+from __future__ import annotations
+
+import json
+from typing import Any, Dict, Iterable, List, Optional
+
+from reintentos import RespuestaTruncada
+
+
+class ParserTransacciones:
+    """Extrae los objetos del arreglo de transacciones a medida que se cierran."""
+
+    def __init__(self) -> None:
+        self._pila: List[str] = []
+        self._en_cadena = False
+        self._escapado = False
+        # Profundidad de la pila dentro del arreglo de transacciones.
+        self._nivel_arreglo: Optional[int] = None
+        self._fila: Optional[List[str]] = None
+        self.iniciado = False
+        self.cerrado = False
+        self.filas = 0
+
+    def alimentar(self, fragmento: str) -> List[Dict[str, Any]]:
+        """Procesa ``fragmento`` y devuelve las transacciones completadas en él."""
+
+        completas: List[Dict[str, Any]] = []
+        inicio = 0 if self._fila is not None else None
+
+        for posicion, caracter in enumerate(fragmento):
+            if self._en_cadena:
+                if self._escapado:
+                    self._escapado = False
+                elif caracter == "\\":
+                    self._escapado = True
+                elif caracter == '"':
+                    self._en_cadena = False
+                continue
+            if self.cerrado:
+                break
+
+            if caracter == '"':
+                self._en_cadena = self.iniciado
+            elif caracter in "{[":
+                self.iniciado = True
+                self._pila.append(caracter)
+                if caracter == "[" and self._nivel_arreglo is None and len(self._pila) <= 2:
+                    self._nivel_arreglo = len(self._pila)
+                elif caracter == "{" and self._fila is None and len(self._pila) == (self._nivel_arreglo or -1) + 1:
+                    self._fila = []
+                    inicio = posicion
+            elif caracter in "}]" and self._pila:
+                self._pila.pop()
+                if self._fila is not None and caracter == "}" and len(self._pila) == self._nivel_arreglo:
+                    self._fila.append(fragmento[inicio : posicion + 1])
+                    completas.append(json.loads("".join(self._fila)))
+                    self._fila = None
+                    inicio = None
+                if not self._pila:
+                    self.cerrado = True
+
+        if self._fila is not None and inicio is not None:
+            self._fila.append(fragmento[inicio:])
+        self.filas += len(completas)
+        return completas
+
+    def terminar(self) -> None:
+        """Lanza :class:`RespuestaTruncada` si el JSON no llegó a cerrarse."""
+
+        if not self.cerrado:
+            raise RespuestaTruncada(f"la respuesta se cortó tras {self.filas} transacción(es) completas")
+
+
+def transacciones_completas(fragmentos: Iterable[str]) -> List[Dict[str, Any]]:
+    """Todas las transacciones cerradas de un texto, aunque esté truncado."""
+
+    parser = ParserTransacciones()
+    filas: List[Dict[str, Any]] = []
+    for fragmento in fragmentos:
+        filas.extend(parser.alimentar(fragmento))
+    return filas
+
+
+__all__ = ["ParserTransacciones", "transacciones_completas"]
@@ -0,0 +1,225 @@
+"""Huellas de transacciones para deduplicar entre páginas, archivos y ejecuciones.
+
+La huella de una transacción combina su fecha, el monto en centavos, la
+descripción normalizada (sin tildes, en mayúsculas y con los espacios
+colapsados) y la cuenta.  Se calcula por columnas con el hash vectorizado de
+pandas (SipHash con clave fija), de modo que la misma transacción produce la
+misma huella en cualquier ejecución y máquina aunque el modelo la haya escrito
+con otro formato numérico u otros espacios.
+
+* Dentro de un documento, :func:`quitar_repetidas` descarta las filas con la
+  misma huella y el mismo saldo: son la misma fila leída dos veces en páginas
+  que se solapan.  El saldo distingue dos compras idénticas del mismo día en
+  los bancos que lo reportan; en los demás, y en las filas sin saldo, se
+  comparan además el resto de columnas con valor (documento, sucursal,
+  cuotas, intereses, capital pendiente...).
+* Entre documentos, cada huella se numera con su ordinal dentro del documento
+  (:func:`huellas_documento`), así dos compras idénticas siguen siendo dos
+  transacciones distintas, y :class:`IndiceHuellas` recuerda por cuenta qué
+  huellas ya se exportaron y desde qué archivo (por su contenido, así que
+  renombrarlo no cambia el origen).  Una fila que ya salió desde
+  otro extracto (periodos solapados, en esta ejecución o en una anterior) se
+  detecta con una consulta a una tabla hash, sin releer nada.
+"""
+
+from __future__ import annotations
+
+import os
+from pathlib import Path
+from typing import Dict, Optional, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+from cache_resultados import calcular_clave
+from logging_utils import configurar_logger
+from texto_nativo import normalizar_texto, perfil_texto
+
+
+logger, _ = configurar_logger("app.huellas")
+
+
+DIRECTORIO_HUELLAS = Path.home() / ".extractor_bancario" / "huellas"
+
+_FALTANTE = np.iinfo(np.int64).min
+
+
+def normalizar_descripciones(valores: pd.Series) -> np.ndarray:
+    """Descripciones comparables: sin tildes, en mayúsculas y con espacios simples."""
+
+    codigos, unicos = pd.factorize(valores.to_numpy(dtype=object), use_na_sentinel=True)
+    normalizados = [" ".join(normalizar_texto(valor).split()) if isinstance(valor, str) else "" for valor in unicos]
+    # El código -1 (valor faltante) apunta a la cadena vacía agregada al final.
+    return np.array(normalizados + [""], dtype=object)[codigos]
+
+
+def _centavos(serie: pd.Series) -> np.ndarray:
+    if pd.api.types.is_integer_dtype(serie):
+        # Las tablas con ``centavos=True`` ya traen el monto en centavos.
+        return serie.to_numpy(dtype=np.int64, na_value=_FALTANTE)
+    numeros = serie.to_numpy(dtype=np.float64, na_value=np.nan)
+    centavos = np.round(numeros * 100)
+    return np.where(np.isnan(centavos), _FALTANTE, centavos).astype(np.int64)
+
+
+def _dias(serie: pd.Series) -> np.ndarray:
+    if pd.api.types.is_datetime64_any_dtype(serie):
+        return serie.to_numpy(dtype="datetime64[D]").view(np.int64)
+    return pd.util.hash_array(serie.to_numpy(dtype=object)).view(np.int64)
+
+
+def _hash_filas(columnas: Dict[str, np.ndarray]) -> np.ndarray:
+    return pd.util.hash_pandas_object(pd.DataFrame(columnas), index=False).to_numpy(dtype=np.uint64)
+
+
+def huellas_transacciones(df: pd.DataFrame, banco: str, cuenta: str) -> np.ndarray:
+    """Huella ``uint64`` de cada fila: fecha, monto, descripción y cuenta.
+
+    En los extractos con varias tarjetas (Rappi) la tarjeta forma parte de la
+    cuenta.
+    """
+
+    perfil = perfil_texto(banco) or perfil_texto("bancolombia")
+    vacia = np.zeros(len(df), dtype=np.int64)
+    columnas = {
+        "fecha": _dias(df["fecha"]) if "fecha" in df else vacia,
+        "monto": _centavos(df[perfil.columna_monto]) if perfil.columna_monto in df else vacia,
+        "descripcion": normalizar_descripciones(df["descripcion"]) if "descripcion" in df else vacia,
+        "cuenta": np.full(len(df), cuenta, dtype=object),
+    }
+    if "tarjeta" in df:
+        columnas["tarjeta"] = normalizar_descripciones(df["tarjeta"].astype(object))
+    return _hash_filas(columnas)
+
+
+def quitar_repetidas(df: pd.DataFrame, banco: str) -> pd.DataFrame:
+    """Descarta las filas repetidas por solapamiento de páginas."""
+
+    perfil = perfil_texto(banco) or perfil_texto("bancolombia")
+    claves = {"huella": huellas_transacciones(df, banco, "")}
+    con_saldo = bool(perfil.columna_saldo) and perfil.columna_saldo in df
+    # Sin saldo (Nu, Rappi, o una fila de Bancolombia sin él) dos compras
+    # iguales del mismo día solo se distinguen por el resto de columnas: el
+    # documento, la sucursal, las cuotas, los intereses o el capital pendiente.
+    incluidas = {"fecha", "descripcion", "tarjeta", perfil.columna_monto, perfil.columna_saldo}
+    resto = [columna for columna in df.columns if columna not in incluidas and df[columna].notna().any()]
+    hash_resto = pd.util.hash_pandas_object(df[resto], index=False).to_numpy(dtype=np.uint64) if resto else None
+    if con_saldo:
+        saldos = _centavos(df[perfil.columna_saldo])
+        claves["saldo"] = saldos
+        if hash_resto is not None:
+            claves["resto"] = np.where(saldos == _FALTANTE, hash_resto, np.uint64(0))
+    elif hash_resto is not None:
+        claves["resto"] = hash_resto
+    repetidas = pd.Series(_hash_filas(claves)).duplicated().to_numpy()
+    if not repetidas.any():
+        return df
+    return df[~repetidas].reset_index(drop=True)
+
+
+def huellas_documento(df: pd.DataFrame, banco: str, cuenta: str) -> np.ndarray:
+    """Huellas con ordinal: la k-ésima repetición de una transacción en el documento."""
+
+    huellas = huellas_transacciones(df, banco, cuenta)
+    ordinales = pd.Series(huellas).groupby(huellas, sort=False).cumcount().to_numpy(dtype=np.uint64)
+    return _hash_filas({"huella": huellas, "ordinal": ordinales})
+
+
+def origen_documento(huella_archivo: str) -> int:
+    """Origen ``uint64`` de un archivo a partir del SHA-256 de su contenido."""
+
+    return int(calcular_clave(huella_archivo)[:16], 16)
+
+
+class IndiceHuellas:
+    """Huellas exportadas por cuenta, con el archivo desde el que salieron.
+
+    Cada cuenta tiene un archivo binario de solo anexado con pares
+    ``(huella, origen)`` de ``uint64``; el nombre del archivo es un hash de la
+    cuenta.  Al consultarla por primera vez se carga en un ``pd.Index``, cuya
+    tabla hash responde cada consulta en O(1).  Las huellas marcadas quedan
+    pendientes hasta :meth:`confirmar`, que las escribe una vez exportadas.
+    Con ``persistente=False`` el índice solo vive en memoria.
+    """
+
+    def __init__(self, directorio: Optional[Union[str, Path]] = None, persistente: bool = True) -> None:
+        self.directorio = Path(directorio) if directorio else DIRECTORIO_HUELLAS
+        self.persistente = persistente
+        self._cargadas: Dict[str, Tuple[pd.Index, np.ndarray]] = {}
+        self._pendientes: Dict[str, Dict[int, int]] = {}
+        if persistente:
+            self.directorio.mkdir(mode=0o700, parents=True, exist_ok=True)
+            try:
+                # Las huellas no revelan montos, pero sí la actividad de cada cuenta.
+                self.directorio.chmod(0o700)
+            except PermissionError:
+                logger.warning("No fue posible establecer permisos 700 en %s", self.directorio)
+
+    def _ruta(self, cuenta: str) -> Path:
+        return self.directorio / f"{calcular_clave(cuenta)[:32]}.u64"
+
+    def _cargar(self, cuenta: str) -> Tuple[pd.Index, np.ndarray]:
+        if cuenta not in self._cargadas:
+            datos = np.empty(0, dtype="<u8")
+            if self.persistente:
+                try:
+                    datos = np.fromfile(self._ruta(cuenta), dtype="<u8")
+                except FileNotFoundError:
+                    pass
+            # Una escritura interrumpida puede dejar un par incompleto al final.
+            pares = datos[: len(datos) // 2 * 2].reshape(-1, 2)
+            # Si una huella aparece varias veces manda el primer archivo que la exportó.
+            _, primeras = np.unique(pares[:, 0], return_index=True)
+            pares = pares[np.sort(primeras)]
+            self._cargadas[cuenta] = (pd.Index(pares[:, 0].astype(np.uint64)), pares[:, 1].astype(np.uint64))
+        return self._cargadas[cuenta]
+
+    def marcar(self, cuenta: str, huellas: np.ndarray, origen: int) -> np.ndarray:
+        """Máscara de las huellas ya exportadas desde otro archivo; las demás quedan pendientes."""
+
+        indice, origenes = self._cargar(cuenta)
+        posiciones = indice.get_indexer(huellas)
+        conocidas = posiciones >= 0
+        # La posición -1 (huella desconocida) cae en el origen propio agregado al final.
+        repetidas = np.append(origenes, np.uint64(origen))[posiciones] != np.uint64(origen)
+
+        pendientes = self._pendientes.setdefault(cuenta, {})
+        for posicion, huella in enumerate(huellas.tolist()):
+            if conocidas[posicion]:
+                continue
+            previo = pendientes.setdefault(huella, origen)
+            repetidas[posicion] = previo != origen
+        return repetidas
+
+    def confirmar(self) -> None:
+        """Guarda las huellas pendientes (tras exportar con éxito)."""
+
+        for cuenta, pendientes in self._pendientes.items():
+            if not pendientes:
+                continue
+            pares = np.array(list(pendientes.items()), dtype="<u8").reshape(-1, 2)
+            if self.persistente:
+                ruta = self._ruta(cuenta)
+                descriptor = os.open(ruta, os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o600)
+                with os.fdopen(descriptor, "ab") as archivo:
+                    archivo.write(pares.tobytes())
+            indice, origenes = self._cargar(cuenta)
+            self._cargadas[cuenta] = (
+                indice.append(pd.Index(pares[:, 0].astype(np.uint64))),
+                np.concatenate([origenes, pares[:, 1].astype(np.uint64)]),
+            )
+        self._pendientes = {}
+
+    def descartar(self) -> None:
+        self._pendientes = {}
+
+
+__all__ = [
+    "DIRECTORIO_HUELLAS",
+    "IndiceHuellas",
+    "huellas_documento",
+    "huellas_transacciones",
+    "normalizar_descripciones",
+    "origen_documento",
+    "quitar_repetidas",
+]
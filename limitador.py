@@ -0,0 +1,224 @@
+"""Limitador de cuota del lado del cliente para las llamadas al modelo.
+
+:class:`LimitadorCuota` combina dos cubetas de fichas (*token buckets*): una
+de solicitudes por minuto y otra de tokens por minuto.  Cada llamada declara
+su costo estimado en tokens y una prioridad; las solicitudes esperan en una
+cola de prioridad y solo la primera de la cola puede consumir fichas, de modo
+que un documento pequeño no queda detrás de las cuarenta páginas de otro
+extracto.  El mismo limitador sirve a hilos (:meth:`adquirir`) y a
+corrutinas (:meth:`adquirir_async`) y lleva métricas de profundidad de cola y
+tiempo de espera.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import heapq
+import io
+import itertools
+import math
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from PIL import Image
+
+
+# Tarifa de Gemini para imágenes: 258 tokens por imagen de hasta 384 px por
+# lado; las mayores se dividen en mosaicos de 768×768 a 258 tokens cada uno.
+TOKENS_POR_MOSAICO = 258
+_LADO_MOSAICO = 768
+_LADO_SIN_MOSAICO = 384
+_CARACTERES_POR_TOKEN = 4
+
+
+def tokens_imagen(datos: bytes) -> int:
+    try:
+        # Image.open solo lee el encabezado: no decodifica los píxeles.
+        ancho, alto = Image.open(io.BytesIO(datos)).size
+    except Exception:
+        return TOKENS_POR_MOSAICO
+    return tokens_dimensiones(ancho, alto)
+
+
+def tokens_dimensiones(ancho: int, alto: int) -> int:
+    if max(ancho, alto) <= _LADO_SIN_MOSAICO:
+        return TOKENS_POR_MOSAICO
+    return TOKENS_POR_MOSAICO * math.ceil(ancho / _LADO_MOSAICO) * math.ceil(alto / _LADO_MOSAICO)
+
+
+def estimar_tokens(contenido: Iterable[object]) -> int:
+    """Tokens de entrada aproximados de una solicitud ``[prompt, *páginas]``."""
+
+    total = 0
+    for parte in contenido:
+        if isinstance(parte, str):
+            total += math.ceil(len(parte) / _CARACTERES_POR_TOKEN)
+        elif isinstance(parte, dict) and "data" in parte:
+            total += tokens_imagen(parte["data"])
+        else:
+            total += TOKENS_POR_MOSAICO
+    return total
+
+
+@dataclass
+class _Cubeta:
+    """Cubeta de fichas con capacidad de un minuto de cuota."""
+
+    por_minuto: float
+    disponibles: float = field(init=False)
+    actualizada: float = field(init=False, default=0.0)
+
+    def __post_init__(self) -> None:
+        self.disponibles = self.por_minuto
+
+    def reponer(self, ahora: float) -> None:
+        transcurrido = max(0.0, ahora - self.actualizada)
+        self.disponibles = min(self.por_minuto, self.disponibles + transcurrido * self.por_minuto / 60.0)
+        self.actualizada = ahora
+
+    def espera(self, costo: float) -> float:
+        faltante = costo - self.disponibles
+        return 0.0 if faltante <= 0 else faltante * 60.0 / self.por_minuto
+
+
+class LimitadorCuota:
+    """Cubetas de solicitudes y tokens por minuto con cola de prioridad.
+
+    Un valor menor de ``prioridad`` se atiende antes; a igual prioridad se
+    respeta el orden de llegada.  Un costo mayor que la capacidad de la
+    cubeta de tokens se recorta a la capacidad para que la solicitud pueda
+    salir alguna vez.
+    """
+
+    _INTERVALO_SONDEO = 0.05
+
+    def __init__(
+        self,
+        rpm: Optional[float] = None,
+        tpm: Optional[float] = None,
+        reloj: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self._reloj = reloj
+        ahora = reloj()
+        self._cubetas: List[Tuple[str, _Cubeta]] = []
+        for nombre, limite in (("solicitudes", rpm), ("tokens", tpm)):
+            if limite:
+                cubeta = _Cubeta(float(limite))
+                cubeta.actualizada = ahora
+                self._cubetas.append((nombre, cubeta))
+
+        self._condicion = threading.Condition()
+        self._cola: List[Tuple[int, int]] = []
+        self._turnos = itertools.count()
+
+        self.solicitudes = 0
+        self.tokens_consumidos = 0
+        self.profundidad_maxima = 0
+        self.espera_total = 0.0
+        self.espera_maxima = 0.0
+
+    # ------------------------------------------------------------------
+    # Núcleo (siempre bajo ``_condicion``)
+    # ------------------------------------------------------------------
+    def _encolar(self, prioridad: int) -> Tuple[int, int]:
+        ticket = (prioridad, next(self._turnos))
+        heapq.heappush(self._cola, ticket)
+        self.profundidad_maxima = max(self.profundidad_maxima, len(self._cola))
+        return ticket
+
+    def _intentar(self, ticket: Tuple[int, int], costo: int) -> float:
+        """Consume las fichas si es el turno de ``ticket``; si no, devuelve la espera."""
+
+        if self._cola[0] != ticket:
+            return self._INTERVALO_SONDEO
+        ahora = self._reloj()
+        esperas = []
+        for nombre, cubeta in self._cubetas:
+            cubeta.reponer(ahora)
+            esperas.append(cubeta.espera(self._costo(nombre, cubeta, costo)))
+        espera = max(esperas, default=0.0)
+        if espera > 0:
+            return espera
+
+        for nombre, cubeta in self._cubetas:
+            cubeta.disponibles -= self._costo(nombre, cubeta, costo)
+        heapq.heappop(self._cola)
+        self.solicitudes += 1
+        self.tokens_consumidos += costo
+        self._condicion.notify_all()
+        return 0.0
+
+    @staticmethod
+    def _costo(nombre: str, cubeta: _Cubeta, tokens: int) -> float:
+        return 1.0 if nombre == "solicitudes" else min(float(tokens), cubeta.por_minuto)
+
+    def _registrar_espera(self, inicio: float) -> float:
+        espera = max(0.0, self._reloj() - inicio)
+        self.espera_total += espera
+        self.espera_maxima = max(self.espera_maxima, espera)
+        return espera
+
+    def _abandonar(self, ticket: Tuple[int, int]) -> None:
+        if ticket in self._cola:
+            self._cola.remove(ticket)
+            heapq.heapify(self._cola)
+            self._condicion.notify_all()
+
+    # ------------------------------------------------------------------
+    # API pública
+    # ------------------------------------------------------------------
+    def adquirir(self, costo: int = 0, prioridad: int = 0) -> float:
+        """Bloquea el hilo hasta que haya cuota; devuelve los segundos esperados."""
+
+        with self._condicion:
+            inicio = self._reloj()
+            ticket = self._encolar(prioridad)
+            try:
+                while True:
+                    espera = self._intentar(ticket, costo)
+                    if espera <= 0:
+                        return self._registrar_espera(inicio)
+                    self._condicion.wait(timeout=espera)
+            except BaseException:
+                self._abandonar(ticket)
+                raise
+
+    async def adquirir_async(self, costo: int = 0, prioridad: int = 0) -> float:
+        """Como :meth:`adquirir`, pero cede el bucle de eventos mientras espera."""
+
+        with self._condicion:
+            inicio = self._reloj()
+            ticket = self._encolar(prioridad)
+        try:
+            while True:
+                with self._condicion:
+                    espera = self._intentar(ticket, costo)
+                    if espera <= 0:
+                        return self._registrar_espera(inicio)
+                await asyncio.sleep(espera)
+        except BaseException:
+            with self._condicion:
+                self._abandonar(ticket)
+            raise
+
+    @property
+    def en_cola(self) -> int:
+        with self._condicion:
+            return len(self._cola)
+
+    def metricas(self) -> Dict[str, float]:
+        with self._condicion:
+            return {
+                "solicitudes": self.solicitudes,
+                "tokens": self.tokens_consumidos,
+                "en_cola": len(self._cola),
+                "profundidad_maxima": self.profundidad_maxima,
+                "espera_total": self.espera_total,
+                "espera_media": self.espera_total / self.solicitudes if self.solicitudes else 0.0,
+                "espera_maxima": self.espera_maxima,
+            }
+
+
+__all__ = ["LimitadorCuota", "TOKENS_POR_MOSAICO", "estimar_tokens", "tokens_dimensiones", "tokens_imagen"]
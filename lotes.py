@@ -0,0 +1,105 @@
+"""Planificación de lotes de páginas por solicitud al modelo.
+
+En lugar de una regla fija (todo en una solicitud, o una página por
+solicitud) las páginas consecutivas se agrupan en lotes según dos costos
+estimados por página:
+
+* tokens de entrada de la imagen, a partir de su tamaño en píxeles;
+* tokens de salida esperados, según la densidad de movimientos del banco.
+
+Un lote se cierra cuando añadir la siguiente página superaría el objetivo de
+tokens de salida del banco (con margen frente al máximo del modelo), el tope
+de tokens de entrada o el máximo de páginas por solicitud.  Si aun así una
+respuesta sale truncada, :meth:`ProcesadorGemini._extraer_grupo` divide el
+lote en mitades.
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import List, Sequence
+
+from limitador import TOKENS_POR_MOSAICO, tokens_dimensiones, tokens_imagen
+from paginas import ContenidoPagina, FuentePaginas
+
+
+@dataclass(frozen=True)
+class PerfilLotes:
+    """Presupuesto por solicitud para un banco."""
+
+    tokens_salida_por_pagina: int = 1500
+    objetivo_tokens_salida: int = 6000
+    max_tokens_entrada: int = 100_000
+    max_paginas: int = 8
+
+    @property
+    def descripcion(self) -> str:
+        return (
+            f"~{self.tokens_salida_por_pagina} tok salida/pág, objetivo {self.objetivo_tokens_salida}, "
+            f"máx. {self.max_paginas} pág"
+        )
+
+
+# Una sola página por lote: el antiguo modo "página por página".
+PERFIL_POR_PAGINA = PerfilLotes(max_paginas=1)
+
+
+@dataclass(frozen=True)
+class Lote:
+    primera: int  # índice base 1
+    cantidad: int
+    tokens_entrada: int
+    tokens_salida: int
+
+    @property
+    def indices(self) -> range:
+        return range(self.primera - 1, self.primera - 1 + self.cantidad)
+
+
+def tokens_por_pagina(paginas: Sequence[ContenidoPagina]) -> List[int]:
+    """Tokens de entrada de cada página sin renderizar las perezosas."""
+
+    if isinstance(paginas, FuentePaginas):
+        return [tokens_dimensiones(*paginas.dimensiones(indice)) for indice in range(len(paginas))]
+    return [tokens_imagen(pagina["data"]) if isinstance(pagina, dict) else TOKENS_POR_MOSAICO for pagina in paginas]
+
+
+def planificar_lotes(tokens_entrada: Sequence[int], perfil: PerfilLotes) -> List[Lote]:
+    """Agrupa páginas consecutivas de forma voraz respetando el presupuesto."""
+
+    lotes: List[Lote] = []
+    primera, entrada, salida = 1, 0, 0
+    for numero, tokens in enumerate(tokens_entrada, start=1):
+        cantidad = numero - primera
+        excede = cantidad > 0 and (
+            cantidad >= perfil.max_paginas
+            or salida + perfil.tokens_salida_por_pagina > perfil.objetivo_tokens_salida
+            or entrada + tokens > perfil.max_tokens_entrada
+        )
+        if excede:
+            lotes.append(Lote(primera, cantidad, entrada, salida))
+            primera, entrada, salida = numero, 0, 0
+        entrada += tokens
+        salida += perfil.tokens_salida_por_pagina
+
+    if tokens_entrada:
+        lotes.append(Lote(primera, len(tokens_entrada) - primera + 1, entrada, salida))
+    return lotes
+
+
+def describir_plan(lotes: Sequence[Lote]) -> str:
+    tramos = []
+    for lote in lotes:
+        paginas = f"{lote.primera}" if lote.cantidad == 1 else f"{lote.primera}-{lote.primera + lote.cantidad - 1}"
+        tramos.append(f"[{paginas}]")
+    return " ".join(tramos)
+
+
+__all__ = [
+    "Lote",
+    "PERFIL_POR_PAGINA",
+    "PerfilLotes",
+    "describir_plan",
+    "planificar_lotes",
+    "tokens_por_pagina",
+]
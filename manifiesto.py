@@ -0,0 +1,227 @@
+"""Manifiesto de los PDFs ya procesados de una carpeta (modo incremental).
+
+Por cada archivo se guarda su tamaño, su ``mtime`` y el SHA-256 de su
+contenido, y aparte las transacciones que se extrajeron de él, direccionadas
+por ese mismo hash.  En la siguiente ejecución :meth:`ManifiestoProcesados.clasificar`
+separa los archivos sin cambios, cuyas transacciones se recuperan del disco,
+de los nuevos o modificados, que son los únicos que se vuelven a extraer:
+
+* si el tamaño y el ``mtime`` coinciden, el archivo no se vuelve a leer;
+* si no coinciden, se calcula el hash: un archivo copiado, tocado o
+  renombrado con el mismo contenido sigue sin extraerse de nuevo.
+
+Se guardan las transacciones tal como salieron de la extracción, antes de
+normalizarlas, junto con el encabezado del extracto (corte y cuenta), así que
+una hoja recuperada queda igual a la de una ejecución completa aunque cambien
+los formatos numéricos.  Como las entradas de la caché, los cambios solo se
+escriben con :meth:`confirmar`, una vez exportada la salida.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple, Union
+
+from cache_resultados import calcular_clave
+from logging_utils import configurar_logger
+from tabla_transacciones import EncabezadoExtracto, encabezado_a_json, encabezado_desde_json
+
+
+logger, _ = configurar_logger("app.manifiesto")
+
+
+DIRECTORIO_MANIFIESTOS = Path.home() / ".extractor_bancario" / "manifiestos"
+VERSION_MANIFIESTO = 3
+
+_TAMANO_BLOQUE = 1024 * 1024
+
+Registros = List[Dict[str, Any]]
+Extraccion = Tuple[Registros, EncabezadoExtracto]
+
+
+def huella_archivo(ruta: Path) -> str:
+    """SHA-256 hexadecimal del contenido de ``ruta``, leído por bloques."""
+
+    digest = hashlib.sha256()
+    with open(ruta, "rb") as archivo:
+        for bloque in iter(lambda: archivo.read(_TAMANO_BLOQUE), b""):
+            digest.update(bloque)
+    return digest.hexdigest()
+
+
+def _escribir_json(ruta: Path, valor: Any) -> None:
+    descriptor, temporal = tempfile.mkstemp(dir=ruta.parent, suffix=".tmp")
+    try:
+        with os.fdopen(descriptor, "w", encoding="utf-8") as archivo:
+            json.dump(valor, archivo, ensure_ascii=False, default=str)
+        os.chmod(temporal, 0o600)
+        os.replace(temporal, ruta)
+    except Exception:
+        Path(temporal).unlink(missing_ok=True)
+        raise
+
+
+@dataclass(frozen=True)
+class EntradaManifiesto:
+    tamano: int
+    mtime_ns: int
+    huella: str
+
+
+class ManifiestoProcesados:
+    """Archivos exportados de ``carpeta`` y las transacciones extraídas de cada uno."""
+
+    def __init__(self, carpeta: Union[str, Path], directorio: Optional[Union[str, Path]] = None) -> None:
+        self.carpeta = Path(carpeta).resolve()
+        base = Path(directorio) if directorio else DIRECTORIO_MANIFIESTOS
+        self.directorio = base / calcular_clave(str(self.carpeta))[:32]
+        (self.directorio / "registros").mkdir(mode=0o700, parents=True, exist_ok=True)
+        for ruta in (base, self.directorio, self.directorio / "registros"):
+            try:
+                # Las transacciones guardadas son movimientos bancarios: solo el usuario actual.
+                ruta.chmod(0o700)
+            except PermissionError:
+                logger.warning("No fue posible establecer permisos 700 en %s", ruta)
+        self._entradas = self._cargar()
+        self._presentes: Optional[List[str]] = None
+        self._calculadas: Dict[str, EntradaManifiesto] = {}
+        self._pendientes: Dict[str, Tuple[EntradaManifiesto, Optional[Extraccion]]] = {}
+        self._lock = threading.Lock()
+
+    # ------------------------------------------------------------------
+    # Rutas y lectura
+    # ------------------------------------------------------------------
+    @property
+    def _ruta_manifiesto(self) -> Path:
+        return self.directorio / "manifiesto.json"
+
+    def _ruta_registros(self, huella: str) -> Path:
+        return self.directorio / "registros" / f"{huella}.json"
+
+    def _cargar(self) -> Dict[str, EntradaManifiesto]:
+        try:
+            datos = json.loads(self._ruta_manifiesto.read_text(encoding="utf-8"))
+        except FileNotFoundError:
+            return {}
+        except (OSError, json.JSONDecodeError) as exc:
+            logger.warning("Manifiesto ilegible, se procesará todo de nuevo: %s", exc)
+            return {}
+        if datos.get("version") != VERSION_MANIFIESTO:
+            return {}
+        try:
+            return {nombre: EntradaManifiesto(**entrada) for nombre, entrada in datos.get("archivos", {}).items()}
+        except TypeError:
+            logger.warning("Manifiesto con entradas inválidas, se procesará todo de nuevo")
+            return {}
+
+    def _leer_extraccion(self, huella: str) -> Optional[Extraccion]:
+        try:
+            datos = json.loads(self._ruta_registros(huella).read_text(encoding="utf-8"))
+            registros = datos.get("registros")
+            encabezado = encabezado_desde_json(datos.get("encabezado") or {})
+        except FileNotFoundError:
+            return None
+        except (OSError, json.JSONDecodeError, AttributeError, TypeError, ValueError) as exc:
+            logger.warning("Transacciones guardadas ilegibles (%s): %s", huella[:12], exc)
+            return None
+        return (registros, encabezado) if isinstance(registros, list) and registros else None
+
+    # ------------------------------------------------------------------
+    # API pública
+    # ------------------------------------------------------------------
+    def clasificar(self, pdfs: Sequence[Path]) -> Tuple[List[Path], Dict[Path, Extraccion]]:
+        """Separa los PDFs a extraer de los que no cambiaron (con sus transacciones y encabezado).
+
+        ``pdfs`` es la lista completa de la carpeta: los archivos que ya no
+        están salen del manifiesto al confirmar.
+        """
+
+        self._presentes = [pdf.name for pdf in pdfs]
+        self._calculadas = {}
+        pendientes: List[Path] = []
+        vigentes: Dict[Path, Extraccion] = {}
+        for pdf in pdfs:
+            estado = pdf.stat()
+            entrada = self._entradas.get(pdf.name)
+            if entrada is None or (entrada.tamano, entrada.mtime_ns) != (estado.st_size, estado.st_mtime_ns):
+                actual = EntradaManifiesto(estado.st_size, estado.st_mtime_ns, huella_archivo(pdf))
+                self._calculadas[pdf.name] = actual
+            else:
+                actual = entrada
+            extraccion = self._leer_extraccion(actual.huella)
+            if extraccion is None:
+                pendientes.append(pdf)
+                continue
+            vigentes[pdf] = extraccion
+            if actual != entrada:
+                # Mismo contenido con otro nombre o ``mtime``: solo se actualiza la entrada.
+                self._pendientes[pdf.name] = (actual, None)
+        return pendientes, vigentes
+
+    def registrar(self, pdf: Path, registros: Registros, encabezado: EncabezadoExtracto = EncabezadoExtracto()) -> None:
+        """Anota las transacciones extraídas de ``pdf``; se guardan al confirmar."""
+
+        if not registros:
+            return
+        with self._lock:
+            entrada = self._calculadas.get(pdf.name)
+        if entrada is None:
+            estado = pdf.stat()
+            entrada = EntradaManifiesto(estado.st_size, estado.st_mtime_ns, huella_archivo(pdf))
+        with self._lock:
+            self._pendientes[pdf.name] = (entrada, (registros, encabezado))
+
+    def confirmar(self) -> None:
+        """Guarda lo registrado y olvida los archivos que ya no están en la carpeta."""
+
+        with self._lock:
+            pendientes, self._pendientes = self._pendientes, {}
+            presentes, self._presentes = self._presentes, None
+        for entrada, extraccion in pendientes.values():
+            if extraccion is not None:
+                registros, encabezado = extraccion
+                _escribir_json(
+                    self._ruta_registros(entrada.huella),
+                    {"encabezado": encabezado_a_json(encabezado), "registros": registros},
+                )
+        entradas = {**self._entradas, **{nombre: entrada for nombre, (entrada, _) in pendientes.items()}}
+        if presentes is not None:
+            entradas = {nombre: entradas[nombre] for nombre in presentes if nombre in entradas}
+        _escribir_json(
+            self._ruta_manifiesto,
+            {
+                "version": VERSION_MANIFIESTO,
+                "carpeta": str(self.carpeta),
+                "archivos": {nombre: asdict(entrada) for nombre, entrada in entradas.items()},
+            },
+        )
+        self._entradas = entradas
+
+        # Transacciones que ya no corresponden a ningún archivo del manifiesto.
+        vigentes = {entrada.huella for entrada in entradas.values()}
+        for ruta in (self.directorio / "registros").glob("*.json"):
+            if ruta.stem not in vigentes:
+                ruta.unlink(missing_ok=True)
+
+    def huella(self, pdf: Path) -> Optional[str]:
+        """SHA-256 de ``pdf`` si ya se conoce (calculado al clasificar o guardado)."""
+
+        entrada = self._calculadas.get(pdf.name) or self._entradas.get(pdf.name)
+        return entrada.huella if entrada else None
+
+    def descartar(self) -> None:
+        with self._lock:
+            self._pendientes = {}
+            self._presentes = None
+
+    def __len__(self) -> int:
+        return len(self._entradas)
+
+
+__all__ = ["DIRECTORIO_MANIFIESTOS", "EntradaManifiesto", "ManifiestoProcesados", "huella_archivo"]
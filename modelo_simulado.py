@@ -0,0 +1,269 @@
+"""Modelo de Gemini simulado para pruebas y benchmarks sin red.
+
+:class:`ModeloSimulado` expone la misma superficie que
+``genai.GenerativeModel`` usa el procesador (``generate_content`` y
+``generate_content_async`` devolviendo un objeto con ``.text``) y se inyecta
+con ``ProcesadorGemini(..., cliente_modelo=ModeloSimulado(...))``.  Permite
+fijar la latencia por solicitud, un límite de concurrencia del "servidor" y
+una tasa de fallos reproducible, y registra las solicitudes atendidas y la
+concurrencia máxima observada.  Con ``stream=True`` la respuesta se entrega
+en fragmentos de ``tamano_fragmento`` caracteres y ``corte_en_fragmento``
+simula una conexión que se interrumpe a mitad de la respuesta.
+
+Si ``respuesta`` es invocable puede devolver, en vez del texto, una
+:class:`RespuestaSimulada` con otro ``finish_reason`` (p. ej.
+``RespuestaSimulada("", SAFETY)``) para reproducir un bloqueo o un corte
+por ``MAX_TOKENS`` tal como los entrega el SDK.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import random
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import AsyncIterator, Callable, Iterator, List, Optional, Sequence, Union
+
+
+Respuesta = Union[str, Callable[[Sequence[object]], Union[str, "RespuestaSimulada"]]]
+
+# Valores de ``Candidate.FinishReason``: el SDK los muestra como enteros.
+STOP = 1
+MAX_TOKENS = 2
+SAFETY = 3
+
+RESPUESTA_POR_DEFECTO = json.dumps(
+    {
+        "transacciones": [
+            {
+                "fecha": "01/01",
+                "descripcion": "MOVIMIENTO SIMULADO",
+                "sucursal": "",
+                "dcto": "",
+                "valor": "1.000,00",
+                "saldo": "1.000,00",
+            }
+        ]
+    }
+)
+
+
+class ErrorSimulado(RuntimeError):
+    """Fallo inyectado por :class:`ModeloSimulado` (un 503 transitorio)."""
+
+    code = 503
+
+
+class RelojSimulado:
+    """Reloj manual para probar esperas sin dormir de verdad.
+
+    ``dormir`` y ``dormir_async`` solo avanzan el tiempo y registran cada
+    espera, de modo que se pueden inyectar en :class:`PoliticaReintentos` o
+    usar ``ahora`` como reloj de :class:`LimitadorCuota`.
+    """
+
+    def __init__(self, inicio: float = 0.0) -> None:
+        self.actual = inicio
+        self.esperas: List[float] = []
+
+    def ahora(self) -> float:
+        return self.actual
+
+    def dormir(self, segundos: float) -> None:
+        self.esperas.append(segundos)
+        self.actual += segundos
+
+    async def dormir_async(self, segundos: float) -> None:
+        self.dormir(segundos)
+
+
+@dataclass
+class CandidatoSimulado:
+    finish_reason: int = STOP
+
+
+@dataclass
+class RespuestaSimulada:
+    """Respuesta (o fragmento) con la forma de ``GenerateContentResponse``.
+
+    Sin texto y con un motivo distinto de STOP, ``.text`` lanza el mismo
+    ValueError que el SDK, que solo cita el motivo como entero.
+    """
+
+    texto: str
+    motivo: int = STOP
+
+    @property
+    def candidates(self) -> List[CandidatoSimulado]:
+        return [CandidatoSimulado(self.motivo)]
+
+    @property
+    def text(self) -> str:
+        if not self.texto and self.motivo != STOP:
+            raise ValueError(
+                "Invalid operation: The `response.text` quick accessor requires the response to contain a valid "
+                "`Part`, but none were returned. The candidate's "
+                f"[finish_reason](https://ai.google.dev/api/generate-content#finishreason) is {self.motivo}."
+            )
+        return self.texto
+
+
+@dataclass
+class ModeloSimulado:
+    """Sustituto en proceso de ``genai.GenerativeModel``."""
+
+    respuesta: Respuesta = RESPUESTA_POR_DEFECTO
+    latencia: float = 0.05
+    max_concurrencia: Optional[int] = None
+    tasa_fallos: float = 0.0
+    semilla: int = 0
+    tamano_fragmento: int = 64
+    latencia_fragmento: float = 0.0
+    corte_en_fragmento: Optional[int] = None
+
+    solicitudes: int = field(init=False, default=0)
+    fallos: int = field(init=False, default=0)
+    concurrencia_maxima: int = field(init=False, default=0)
+    _activas: int = field(init=False, default=0)
+    _azar: random.Random = field(init=False)
+    _lock: threading.Lock = field(init=False, default_factory=threading.Lock)
+    _cupo: Optional[threading.BoundedSemaphore] = field(init=False, default=None)
+
+    def __post_init__(self) -> None:
+        self._azar = random.Random(self.semilla)
+        if self.max_concurrencia:
+            self._cupo = threading.BoundedSemaphore(self.max_concurrencia)
+
+    # ------------------------------------------------------------------
+    # Contabilidad
+    # ------------------------------------------------------------------
+    def _entrar(self) -> bool:
+        with self._lock:
+            self.solicitudes += 1
+            self._activas += 1
+            self.concurrencia_maxima = max(self.concurrencia_maxima, self._activas)
+            fallar = self._azar.random() < self.tasa_fallos
+            if fallar:
+                self.fallos += 1
+            return fallar
+
+    def _salir(self) -> None:
+        with self._lock:
+            self._activas -= 1
+
+    def _respuesta(self, contenido: Sequence[object]) -> RespuestaSimulada:
+        respuesta = self.respuesta(contenido) if callable(self.respuesta) else self.respuesta
+        return respuesta if isinstance(respuesta, RespuestaSimulada) else RespuestaSimulada(respuesta)
+
+    def _fragmentos(self, contenido: Sequence[object]) -> List[RespuestaSimulada]:
+        """Trozos del texto; como en el SDK, el motivo de finalización va en el último."""
+
+        respuesta = self._respuesta(contenido)
+        texto = respuesta.texto
+        trozos = [texto[i : i + self.tamano_fragmento] for i in range(0, len(texto), self.tamano_fragmento)] or [""]
+        return [RespuestaSimulada(trozo) for trozo in trozos[:-1]] + [RespuestaSimulada(trozos[-1], respuesta.motivo)]
+
+    def _verificar_corte(self, numero: int) -> None:
+        if self.corte_en_fragmento is not None and numero >= self.corte_en_fragmento:
+            raise ErrorSimulado("503 conexión interrumpida a mitad de la respuesta (simulado)")
+
+    # ------------------------------------------------------------------
+    # API compatible con GenerativeModel
+    # ------------------------------------------------------------------
+    def generate_content(
+        self, contenido: List[object], stream: bool = False, **_: object
+    ) -> Union[RespuestaSimulada, Iterator[RespuestaSimulada]]:
+        if stream:
+            return self._transmitir(contenido)
+        if self._cupo is not None:
+            self._cupo.acquire()
+        try:
+            fallar = self._entrar()
+            try:
+                time.sleep(self.latencia)
+                if fallar:
+                    raise ErrorSimulado("503 Service Unavailable (simulado)")
+                return self._respuesta(contenido)
+            finally:
+                self._salir()
+        finally:
+            if self._cupo is not None:
+                self._cupo.release()
+
+    def _transmitir(self, contenido: List[object]) -> Iterator[RespuestaSimulada]:
+        if self._cupo is not None:
+            self._cupo.acquire()
+        try:
+            fallar = self._entrar()
+            try:
+                time.sleep(self.latencia)
+                if fallar:
+                    raise ErrorSimulado("503 Service Unavailable (simulado)")
+                for numero, fragmento in enumerate(self._fragmentos(contenido)):
+                    self._verificar_corte(numero)
+                    if numero:
+                        time.sleep(self.latencia_fragmento)
+                    yield fragmento
+            finally:
+                self._salir()
+        finally:
+            if self._cupo is not None:
+                self._cupo.release()
+
+    async def generate_content_async(
+        self, contenido: List[object], stream: bool = False, **_: object
+    ) -> Union[RespuestaSimulada, AsyncIterator[RespuestaSimulada]]:
+        if stream:
+            return self._transmitir_async(contenido)
+        if self._cupo is not None:
+            # El cupo es de hilos: se espera sin bloquear el bucle de eventos.
+            while not self._cupo.acquire(blocking=False):
+                await asyncio.sleep(0.001)
+        try:
+            fallar = self._entrar()
+            try:
+                await asyncio.sleep(self.latencia)
+                if fallar:
+                    raise ErrorSimulado("503 Service Unavailable (simulado)")
+                return self._respuesta(contenido)
+            finally:
+                self._salir()
+        finally:
+            if self._cupo is not None:
+                self._cupo.release()
+
+    async def _transmitir_async(self, contenido: List[object]) -> AsyncIterator[RespuestaSimulada]:
+        if self._cupo is not None:
+            while not self._cupo.acquire(blocking=False):
+                await asyncio.sleep(0.001)
+        try:
+            fallar = self._entrar()
+            try:
+                await asyncio.sleep(self.latencia)
+                if fallar:
+                    raise ErrorSimulado("503 Service Unavailable (simulado)")
+                for numero, fragmento in enumerate(self._fragmentos(contenido)):
+                    self._verificar_corte(numero)
+                    if numero:
+                        await asyncio.sleep(self.latencia_fragmento)
+                    yield fragmento
+            finally:
+                self._salir()
+        finally:
+            if self._cupo is not None:
+                self._cupo.release()
+
+
+__all__ = [
+    "CandidatoSimulado",
+    "ErrorSimulado",
+    "MAX_TOKENS",
+    "ModeloSimulado",
+    "RESPUESTA_POR_DEFECTO",
+    "RelojSimulado",
+    "RespuestaSimulada",
+    "SAFETY",
+    "STOP",
+]
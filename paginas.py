@@ -0,0 +1,236 @@
+"""Rasterización de páginas de PDF bajo demanda.
+
+PyMuPDF no es seguro entre hilos: todo acceso a un documento abierto pasa por
+``BLOQUEO_FITZ``.  :class:`FuentePaginas` renderiza cada página solo cuando se
+solicita, de modo que la memoria máxima depende de las páginas en vuelo y no
+de la longitud del extracto.
+
+Cada página se entrega al modelo como un blob ``{"mime_type", "data"}``
+codificado según un :class:`PerfilRender` (resolución, escala de grises y
+formato/calidad), lo que permite medir exactamente los bytes enviados.
+"""
+
+from __future__ import annotations
+
+import io
+import math
+import statistics
+import threading
+from dataclasses import dataclass
+from typing import Any, Dict, Iterator, Optional, Sequence, Tuple, overload
+
+import fitz  # PyMuPDF
+from PIL import Image
+
+
+BLOQUEO_FITZ = threading.RLock()
+ESCALA_RENDER = 2.0
+DPI_BASE = 72
+
+ContenidoPagina = Dict[str, Any]
+
+_MODOS_PIL = {(1, False): "L", (3, False): "RGB", (3, True): "RGBA"}
+# MuPDF guarda el alfa premultiplicado; PIL espera ``RGBA`` sin premultiplicar.
+_MODOS_RAW = {"L": "L", "RGB": "RGB", "RGBA": "RGBa"}
+_FORMATOS = {"png": ("PNG", "image/png"), "jpeg": ("JPEG", "image/jpeg"), "webp": ("WEBP", "image/webp")}
+
+
+@dataclass(frozen=True)
+class PerfilRender:
+    """Cómo se rasteriza y codifica una página antes de enviarla al modelo.
+
+    ``dpi=None`` activa el modo automático: se usa la menor resolución con la
+    que el texto pequeño de la página alcanza ``altura_texto_px`` píxeles,
+    acotada entre ``dpi_minimo`` y ``dpi_maximo``.  ``calidad=None`` codifica
+    sin pérdida (PNG o WebP lossless).
+    """
+
+    dpi: Optional[int] = int(DPI_BASE * ESCALA_RENDER)
+    escala_grises: bool = False
+    formato: str = "webp"
+    calidad: Optional[int] = None
+    altura_texto_px: float = 16.0
+    dpi_minimo: int = 72
+    dpi_maximo: int = 216
+
+    def __post_init__(self) -> None:
+        if self.formato not in _FORMATOS:
+            raise ValueError(f"Formato de imagen no soportado: {self.formato}")
+        if self.formato == "jpeg" and self.calidad is None:
+            raise ValueError("JPEG requiere una calidad explícita")
+
+    @property
+    def descripcion(self) -> str:
+        resolucion = f"{self.dpi}dpi" if self.dpi else f"auto{self.altura_texto_px:g}px"
+        color = "gris" if self.escala_grises else "color"
+        calidad = f"q{self.calidad}" if self.calidad is not None else "lossless"
+        return f"{resolucion}-{color}-{self.formato}-{calidad}"
+
+
+PERFIL_POR_DEFECTO = PerfilRender()
+
+
+def pixmap_a_imagen(pix: fitz.Pixmap) -> Image.Image:
+    """Construye la imagen PIL directamente desde las muestras del pixmap.
+
+    Evita comprimir a PNG y descomprimir de nuevo: las muestras crudas se
+    copian una sola vez, sin copia intermedia en Python, respetando el
+    ``stride`` de cada fila.
+    """
+
+    componentes = pix.colorspace.n if pix.colorspace else 0
+    modo = _MODOS_PIL.get((componentes, bool(pix.alpha)))
+    if modo is not None:
+        return Image.frombytes(modo, (pix.width, pix.height), pix.samples_mv, "raw", _MODOS_RAW[modo], pix.stride)
+
+    # Gris con alfa, CMYK u otros espacios (``pix.n`` solo no distingue CMYK
+    # de RGBA): MuPDF convierte a RGB y el alfa se descarta al final, después
+    # de deshacer la premultiplicación, igual que al decodificar el PNG.
+    pix = fitz.Pixmap(fitz.csRGB, pix)
+    if not pix.alpha:
+        return Image.frombytes("RGB", (pix.width, pix.height), pix.samples_mv, "raw", "RGB", pix.stride)
+    imagen = Image.frombytes("RGBA", (pix.width, pix.height), pix.samples_mv, "raw", "RGBa", pix.stride)
+    return imagen.convert("RGB")
+
+
+def pixmap_a_imagen_png(pix: fitz.Pixmap) -> Image.Image:
+    """Conversión histórica vía PNG; se conserva como referencia de benchmark."""
+
+    imagen = Image.open(io.BytesIO(pix.tobytes("png")))
+    imagen.load()
+    return imagen
+
+
+def elegir_dpi(pagina: fitz.Page, perfil: PerfilRender) -> int:
+    """Resolución de la página según el perfil (fija o automática)."""
+
+    if perfil.dpi:
+        return perfil.dpi
+
+    tamanos = [
+        span["size"]
+        for bloque in pagina.get_text("dict")["blocks"]
+        for linea in bloque.get("lines", [])
+        for span in linea["spans"]
+        if span["text"].strip() and span["size"] > 0
+    ]
+    if not tamanos:
+        # Página escaneada o sin capa de texto: no hay referencia, usar el máximo.
+        return perfil.dpi_maximo
+
+    # Percentil 10 del tamaño de fuente: el texto pequeño relevante, sin
+    # dejarse arrastrar por un único carácter diminuto.
+    tamano_pequeno = statistics.quantiles(tamanos, n=10)[0] if len(tamanos) > 1 else tamanos[0]
+    dpi = math.ceil(perfil.altura_texto_px * DPI_BASE / tamano_pequeno)
+    return max(perfil.dpi_minimo, min(perfil.dpi_maximo, dpi))
+
+
+def rasterizar_pagina(pagina: fitz.Page, perfil: PerfilRender = PERFIL_POR_DEFECTO) -> Image.Image:
+    escala = elegir_dpi(pagina, perfil) / DPI_BASE
+    espacio = fitz.csGRAY if perfil.escala_grises else fitz.csRGB
+    pix = pagina.get_pixmap(matrix=fitz.Matrix(escala, escala), colorspace=espacio, alpha=False)
+    return pixmap_a_imagen(pix)
+
+
+def codificar_imagen(imagen: Image.Image, perfil: PerfilRender = PERFIL_POR_DEFECTO) -> ContenidoPagina:
+    formato, mime_type = _FORMATOS[perfil.formato]
+    opciones: Dict[str, Any] = {}
+    if perfil.formato == "webp":
+        opciones = {"lossless": True} if perfil.calidad is None else {"quality": perfil.calidad}
+    elif perfil.formato == "jpeg":
+        opciones = {"quality": perfil.calidad, "optimize": True}
+
+    buffer = io.BytesIO()
+    imagen.save(buffer, format=formato, **opciones)
+    return {"mime_type": mime_type, "data": buffer.getvalue()}
+
+
+def renderizar_pagina(pagina: fitz.Page, perfil: PerfilRender = PERFIL_POR_DEFECTO) -> ContenidoPagina:
+    return codificar_imagen(rasterizar_pagina(pagina, perfil), perfil)
+
+
+def bytes_de_carga(paginas: Sequence[ContenidoPagina]) -> int:
+    """Bytes de imagen que se enviaron (o se enviarán) al modelo."""
+
+    if isinstance(paginas, FuentePaginas):
+        return paginas.bytes_generados
+    return sum(len(pagina["data"]) for pagina in paginas if isinstance(pagina, dict))
+
+
+class FuentePaginas(Sequence[ContenidoPagina]):
+    """Secuencia perezosa de las páginas de un documento ya desbloqueado.
+
+    Se comporta como una lista de solo lectura: ``len`` no renderiza nada y
+    cada acceso por índice o iteración genera la página en ese momento, sin
+    conservarla.  :attr:`bytes_generados` cuenta cada página una sola vez,
+    aunque se vuelva a renderizar al dividir una solicitud o al reintentarla.
+    """
+
+    def __init__(self, documento: fitz.Document, perfil: PerfilRender = PERFIL_POR_DEFECTO) -> None:
+        self._documento = documento
+        self.perfil = perfil
+        self._bytes_por_pagina: Dict[int, int] = {}
+        with BLOQUEO_FITZ:
+            self._total = documento.page_count
+
+    def __len__(self) -> int:
+        return self._total
+
+    @property
+    def bytes_generados(self) -> int:
+        """Bytes de las páginas renderizadas hasta ahora con :attr:`perfil`."""
+
+        with BLOQUEO_FITZ:
+            return sum(self._bytes_por_pagina.values())
+
+    @overload
+    def __getitem__(self, indice: int) -> ContenidoPagina: ...
+
+    @overload
+    def __getitem__(self, indice: slice) -> Sequence[ContenidoPagina]: ...
+
+    def __getitem__(self, indice):
+        if isinstance(indice, slice):
+            return [self[i] for i in range(*indice.indices(self._total))]
+        if indice < 0:
+            indice += self._total
+        if not 0 <= indice < self._total:
+            raise IndexError("Índice de página fuera de rango")
+        with BLOQUEO_FITZ:
+            imagen = rasterizar_pagina(self._documento[indice], self.perfil)
+        # La codificación es trabajo de PIL: no necesita retener el bloqueo.
+        contenido = codificar_imagen(imagen, self.perfil)
+        with BLOQUEO_FITZ:
+            # Varias páginas pueden codificarse a la vez desde hilos distintos.
+            self._bytes_por_pagina[indice] = len(contenido["data"])
+        return contenido
+
+    def dimensiones(self, indice: int) -> Tuple[int, int]:
+        """Tamaño en píxeles que tendrá la página, sin rasterizarla."""
+
+        with BLOQUEO_FITZ:
+            pagina = self._documento[indice]
+            escala = elegir_dpi(pagina, self.perfil) / DPI_BASE
+            return math.ceil(pagina.rect.width * escala), math.ceil(pagina.rect.height * escala)
+
+    def __iter__(self) -> Iterator[ContenidoPagina]:
+        for indice in range(self._total):
+            yield self[indice]
+
+
+__all__ = [
+    "BLOQUEO_FITZ",
+    "ContenidoPagina",
+    "DPI_BASE",
+    "ESCALA_RENDER",
+    "FuentePaginas",
+    "PERFIL_POR_DEFECTO",
+    "PerfilRender",
+    "bytes_de_carga",
+    "codificar_imagen",
+    "elegir_dpi",
+    "pixmap_a_imagen",
+    "pixmap_a_imagen_png",
+    "rasterizar_pagina",
+    "renderizar_pagina",
+]
@@ -0,0 +1,309 @@
+"""Variante asyncio de :class:`ProcesadorGemini`.
+
+Las llamadas al modelo usan ``generate_content_async`` sobre un único modelo
+configurado, compartido por todos los archivos y páginas (el SDK reutiliza
+el mismo cliente asíncrono y su conexión).  Los reintentos esperan con
+``asyncio.sleep``, de modo que ningún hilo queda bloqueado mientras tanto.
+
+El trabajo de CPU y de disco sigue ejecutándose fuera del bucle de eventos:
+el desbloqueo, los backends locales y la rasterización en un pool de procesos
+o hilos para la preparación, y con ``asyncio.to_thread`` las páginas
+perezosas, el inicio (incluido el hash de los archivos del manifiesto), las
+lecturas y escrituras de la caché, la normalización de cada documento y la
+escritura de las salidas.
+
+Uso desde un servicio asyncio::
+
+    procesador = ProcesadorGeminiAsync(api_key, password, carpeta, max_workers=4)
+    excel = await procesador.procesar_async()
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from concurrent.futures import Executor, ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, AsyncIterator, Dict, Iterable, List, Optional, Sequence
+
+import pandas as pd
+
+from limitador import estimar_tokens
+from lotes import PERFIL_POR_PAGINA, Lote, planificar_lotes
+from esquemas import validar_fila
+from flujo_json import ParserTransacciones
+from reintentos import ErrorDividir, adjuntar_parciales, comprobar_finalizacion
+from paginas import ContenidoPagina, FuentePaginas
+from procesador_gemini import (
+    DocumentoPreparado,
+    ProcesadorGemini,
+    _etiqueta_paginas,
+    _normalizar_banco,
+    _preparar_en_proceso,
+    _texto_fragmento,
+    logger,
+)
+
+
+class ProcesadorGeminiAsync(ProcesadorGemini):
+    """Mismo flujo que :class:`ProcesadorGemini` con E/S de red asíncrona."""
+
+    # ------------------------------------------------------------------
+    # Interacción con Gemini
+    # ------------------------------------------------------------------
+    async def _invocar_modelo_async(
+        self, contenido: Iterable[object], prioridad: int = 0, configuracion: Optional[Dict[str, Any]] = None
+    ) -> str:
+        if self._model is None:
+            raise RuntimeError("El modelo de Gemini no ha sido configurado")
+
+        contenido = list(contenido)
+        costo = estimar_tokens(contenido) if self.limitador else 0
+
+        async def llamar() -> str:
+            if self.limitador:
+                await self.limitador.adquirir_async(costo, prioridad)
+            opciones = {"generation_config": configuracion} if configuracion else {}
+            respuesta = await self._model.generate_content_async(contenido, **opciones)
+            comprobar_finalizacion(respuesta)
+            return respuesta.text
+
+        return await self.politica_reintentos.ejecutar_async(llamar, self._avisar_reintento)
+
+    async def iterar_transacciones_async(
+        self, banco: str, paginas: Sequence[ContenidoPagina], paginas_documento: Optional[int] = None
+    ) -> AsyncIterator[Dict[str, str]]:
+        """Equivalente asíncrono de :meth:`ProcesadorGemini.iterar_transacciones`."""
+
+        if self._model is None:
+            raise RuntimeError("El modelo de Gemini no ha sido configurado")
+
+        contenido = [self._prompt(banco), *paginas]
+        if self.limitador:
+            await self.limitador.adquirir_async(estimar_tokens(contenido), paginas_documento or len(paginas))
+        opciones: Dict[str, Any] = {"stream": True}
+        configuracion = self._configuracion_generacion(banco)
+        if configuracion:
+            opciones["generation_config"] = configuracion
+
+        parser = ParserTransacciones()
+        numero = 0
+        async for fragmento in await self._model.generate_content_async(contenido, **opciones):
+            for fila in parser.alimentar(_texto_fragmento(fragmento)):
+                numero += 1
+                yield validar_fila(fila, banco, numero)
+            comprobar_finalizacion(fragmento)
+        parser.terminar()
+
+    async def _extraer_en_streaming_async(
+        self, banco: str, paginas: Sequence[ContenidoPagina], paginas_documento: Optional[int] = None
+    ) -> List[Dict[str, str]]:
+        mejor: List[Dict[str, str]] = []
+
+        async def intento() -> List[Dict[str, str]]:
+            nonlocal mejor
+            filas: List[Dict[str, str]] = []
+            try:
+                async for fila in self.iterar_transacciones_async(banco, paginas, paginas_documento):
+                    filas.append(fila)
+            except Exception:
+                if len(filas) > len(mejor):
+                    mejor = filas
+                raise
+            return filas
+
+        try:
+            return await self.politica_reintentos.ejecutar_async(intento, self._avisar_reintento)
+        except Exception as exc:
+            adjuntar_parciales(exc, mejor)
+            raise
+
+    async def _obtener_paginas(self, imagenes: Sequence[ContenidoPagina], lote: Lote) -> List[ContenidoPagina]:
+        if isinstance(imagenes, FuentePaginas):
+            # Renderizar es trabajo de CPU: fuera del bucle de eventos.
+            return await asyncio.to_thread(lambda: [imagenes[indice] for indice in lote.indices])
+        return [imagenes[indice] for indice in lote.indices]
+
+    async def _extraer_lote_async(
+        self,
+        banco: str,
+        imagenes: Sequence[ContenidoPagina],
+        lote: Lote,
+        en_vuelo: asyncio.Semaphore,
+    ) -> Optional[List[Dict[str, str]]]:
+        etiqueta = _etiqueta_paginas(lote.primera, lote.cantidad)
+        async with en_vuelo:
+            try:
+                paginas = await self._obtener_paginas(imagenes, lote)
+            except Exception as exc:
+                self._emitir(f"        ✗ No se pudo renderizar {etiqueta}: {exc}", logging.WARNING)
+                return None
+
+            clave = await asyncio.to_thread(self._clave_lote, banco, paginas)
+            en_cache = await asyncio.to_thread(self._lote_en_cache, clave, etiqueta)
+            if en_cache is not None:
+                return en_cache
+
+            self._emitir(f"      • Procesando {etiqueta}")
+            transacciones = await self._extraer_grupo_async(
+                banco, paginas, lote.primera, paginas_documento=len(imagenes)
+            )
+            await asyncio.to_thread(self._guardar_lote, clave, etiqueta, transacciones)
+            return transacciones
+
+    async def _extraer_lotes_async(
+        self, imagenes: Sequence[ContenidoPagina], lotes: List[Lote], banco: str
+    ) -> Optional[pd.DataFrame]:
+        """Equivalente asíncrono de :meth:`ProcesadorGemini._extraer_lotes`."""
+
+        en_vuelo = asyncio.Semaphore(max(1, min(self.max_paginas_concurrentes, len(lotes))))
+
+        respuestas = await asyncio.gather(
+            *(self._extraer_lote_async(banco, imagenes, lote, en_vuelo) for lote in lotes), return_exceptions=True
+        )
+        por_lote: Dict[int, List[Dict[str, str]]] = {}
+        fallidas: List[int] = []
+        for lote, filas in zip(lotes, respuestas):
+            if isinstance(filas, BaseException):
+                self._registrar_lote_fallido(lote, filas, por_lote, fallidas)
+            elif filas is None:
+                fallidas.extend(indice + 1 for indice in lote.indices)
+            else:
+                por_lote[lote.primera] = filas
+        return self._ensamblar_paginas(por_lote, fallidas, len(imagenes))
+
+    async def extraer_por_pagina_async(self, imagenes: Sequence[ContenidoPagina], banco: str) -> Optional[pd.DataFrame]:
+        lotes = planificar_lotes([0] * len(imagenes), PERFIL_POR_PAGINA)
+        return await self._extraer_lotes_async(imagenes, lotes, banco)
+
+    async def extraer_transacciones_async(
+        self, imagenes: Sequence[ContenidoPagina], nombre_archivo: str
+    ) -> Optional[pd.DataFrame]:
+        banco = _normalizar_banco(nombre_archivo)
+
+        try:
+            self._emitir(f"    📤 Analizando {len(imagenes)} página(s) con modelo {self.modelo}")
+            lotes = await asyncio.to_thread(self.planificar_lotes, imagenes, banco)
+        except Exception as exc:
+            self._emitir(f"    ❌ Error analizando el PDF: {exc}", logging.ERROR)
+            return None
+        return await self._extraer_lotes_async(imagenes, lotes, banco)
+
+    async def _extraer_grupo_async(
+        self,
+        banco: str,
+        paginas: List[ContenidoPagina],
+        primera: int = 1,
+        profundidad: int = 0,
+        paginas_documento: Optional[int] = None,
+    ) -> List[Dict[str, str]]:
+        """Como :meth:`ProcesadorGemini._extraer_grupo`; las dos mitades se consultan a la vez."""
+
+        prioridad = paginas_documento or len(paginas)
+        try:
+            self._comprobar_carga(paginas)
+            if self.streaming:
+                transacciones = await self._extraer_en_streaming_async(banco, paginas, prioridad)
+            else:
+                respuesta = await self._invocar_modelo_async(
+                    [self._prompt(banco), *paginas], prioridad, self._configuracion_generacion(banco)
+                )
+                transacciones = self._interpretar_respuesta(respuesta, banco)
+        except ErrorDividir as exc:
+            mitad = self._dividir_grupo(primera, len(paginas), profundidad, exc)
+            mitades = await asyncio.gather(
+                self._extraer_grupo_async(banco, paginas[:mitad], primera, profundidad + 1, prioridad),
+                self._extraer_grupo_async(banco, paginas[mitad:], primera + mitad, profundidad + 1, prioridad),
+                return_exceptions=True,
+            )
+            return self._combinar_mitades(mitades)
+        self._registrar_grupo(primera, len(paginas), profundidad, transacciones)
+        return transacciones
+
+    # ------------------------------------------------------------------
+    # Flujo principal
+    # ------------------------------------------------------------------
+    async def _analizar_documento_async(self, pdf_path: Path, documento: DocumentoPreparado) -> Optional[pd.DataFrame]:
+        self._registrar_preparacion(pdf_path, documento)
+        if not documento.requiere_modelo:
+            return await asyncio.to_thread(
+                self._finalizar_documento,
+                pdf_path,
+                self._resultado_sin_modelo(pdf_path, documento),
+                documento.encabezado,
+            )
+
+        self._emitir(f"  🤖 Analizando con Gemini… ({pdf_path.name})")
+        inicio = time.perf_counter()
+        try:
+            df = await self.extraer_transacciones_async(documento.paginas, pdf_path.stem)
+        finally:
+            await asyncio.to_thread(documento.cerrar)
+        # Guarda en caché y normaliza (y en modo incremental calcula el hash del archivo).
+        await asyncio.to_thread(self._cerrar_analisis_modelo, pdf_path, documento, df, time.perf_counter() - inicio)
+        return await asyncio.to_thread(self._finalizar_documento, pdf_path, df, documento.encabezado)
+
+    def _crear_ejecutor_preparacion(self) -> Executor:
+        if self.usar_procesos and self.max_workers > 1:
+            return super()._crear_ejecutor_preparacion()
+        return ThreadPoolExecutor(max_workers=max(1, self.max_workers), thread_name_prefix="preparacion")
+
+    async def _procesar_archivo_async(
+        self, pdf_path: Path, preparacion: Executor, cupo: asyncio.Semaphore
+    ) -> Optional[pd.DataFrame]:
+        loop = asyncio.get_running_loop()
+        async with cupo:
+            try:
+                if isinstance(preparacion, ThreadPoolExecutor):
+                    # En hilos el documento puede quedar abierto: páginas perezosas.
+                    documento = await loop.run_in_executor(preparacion, self._preparar_documento, pdf_path)
+                else:
+                    documento = await loop.run_in_executor(preparacion, _preparar_en_proceso, self, pdf_path)
+            except Exception as exc:
+                self._emitir(f"  ❌ {pdf_path.name}: fallo preparando el PDF: {exc}", logging.ERROR)
+                return None
+            if documento is None:
+                self._emitir(f"  ❌ {pdf_path.name}: no se pudo preparar el archivo", logging.ERROR)
+                return None
+
+            try:
+                return await self._analizar_documento_async(pdf_path, documento)
+            except Exception as exc:
+                self._emitir(f"  ❌ {pdf_path.name}: fallo analizando el PDF: {exc}", logging.ERROR)
+                return None
+
+    async def _procesar_todos_async(self, pdfs: List[Path]) -> Dict[str, pd.DataFrame]:
+        """Procesa hasta ``max_workers`` archivos a la vez; las hojas conservan el orden de ``pdfs``."""
+
+        self._emitir(f"\n⚡ Modo asíncrono: {max(1, self.max_workers)} archivo(s) en paralelo")
+        cupo = asyncio.Semaphore(max(1, self.max_workers))
+        with self._crear_ejecutor_preparacion() as preparacion:
+            dfs = await asyncio.gather(*(self._procesar_archivo_async(pdf, preparacion, cupo) for pdf in pdfs))
+
+        resultados: Dict[str, pd.DataFrame] = {}
+        for pdf_path, df in zip(pdfs, dfs):
+            if df is not None:
+                self._emitir("\n" + "━" * 60)
+                self._emitir(f"📄 {pdf_path.name}")
+                self._registrar_resultado(resultados, pdf_path, df)
+        return resultados
+
+    async def procesar_async(self) -> Optional[Path]:
+        try:
+            # Configura el modelo, lista la carpeta y en modo incremental
+            # calcula el SHA-256 de los archivos modificados.
+            pdfs = await asyncio.to_thread(self._iniciar_procesamiento)
+            if pdfs is None:
+                return None
+
+            resultados = await self._procesar_todos_async(pdfs)
+            # Escribir el Excel es E/S de disco bloqueante.
+            return await asyncio.to_thread(self._finalizar_procesamiento, resultados)
+        except Exception as exc:
+            self._emitir(f"\n❌ Error general durante el procesamiento: {exc}", logging.ERROR)
+            logger.exception("Fallo inesperado en el procesamiento asíncrono de extractos")
+            return None
+
+
+__all__ = ["ProcesadorGeminiAsync"]
@@ -5,11 +5,22 @@ from __future__ import annotations
 import io
 import json
 import logging
-import re
+import threading
 import time
+from collections import deque
+from concurrent.futures import (
+    FIRST_COMPLETED,
+    Executor,
+    Future,
+    ProcessPoolExecutor,
+    ThreadPoolExecutor,
+    as_completed,
+    wait,
+)
 from dataclasses import dataclass, field
+from datetime import date
 from pathlib import Path
-from typing import Callable, Dict, Iterable, List, Optional
+from typing import Any, Callable, Collection, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple, Union
 
 import fitz  # PyMuPDF
 import google.generativeai as genai
@@ -17,7 +28,43 @@ import pandas as pd
 from PIL import Image
 from pikepdf import Pdf
 
+from cache_resultados import CacheResultados, calcular_clave, huella_bytes
+from escritores import ESCRITORES, EscritorSalida
+from limitador import LimitadorCuota, estimar_tokens
+from esquemas import configuracion_generacion, validar_fila, validar_transacciones
+from flujo_json import ParserTransacciones, transacciones_completas
+from huellas import IndiceHuellas, huellas_documento, origen_documento, quitar_repetidas
 from logging_utils import configurar_logger
+from lotes import PERFIL_POR_PAGINA, Lote, PerfilLotes, describir_plan, planificar_lotes, tokens_por_pagina
+from manifiesto import ManifiestoProcesados, huella_archivo
+from reintentos import (
+    ErrorDividir,
+    PoliticaReintentos,
+    RespuestaTruncada,
+    adjuntar_parciales,
+    comprobar_finalizacion,
+    parciales_de,
+)
+from backends_extraccion import BACKENDS, BackendExtraccion, BackendGemini, BackendTablas, EntradaExtraccion
+from paginas import (
+    BLOQUEO_FITZ,
+    ContenidoPagina,
+    FuentePaginas,
+    PerfilRender,
+    bytes_de_carga,
+    rasterizar_pagina,
+    renderizar_pagina,
+)
+from tabla_transacciones import (
+    EncabezadoExtracto,
+    construir_tabla,
+    corte_por_fechas,
+    corte_por_nombre,
+    encabezado_a_json,
+    encabezado_desde_json,
+    leer_encabezado,
+)
+from valores_monetarios import FormatoNumerico, MontoInvalido, formato_banco
 
 
 logger, _ = configurar_logger("app.procesador")
@@ -25,6 +72,14 @@ logger, _ = configurar_logger("app.procesador")
 
 PromptDict = Dict[str, str]
 LogCallback = Callable[[str], None]
+OrigenPDF = Union[Path, bytes, fitz.Document]
+
+# Política de selección: backends locales primero, el modelo de visión al final.
+BACKENDS_POR_DEFECTO: Tuple[str, ...] = ("texto", "tablas", "gemini")
+
+# Del método más barato al más costoso: abrir sin contraseña, autenticar con
+# PyMuPDF y, como último recurso, descifrar y reescribir con pikepdf.
+ESTRATEGIAS_DESBLOQUEO: Tuple[str, ...] = ("directo", "fitz", "pikepdf")
 
 
 _PROMPTS: PromptDict = {
@@ -45,19 +100,48 @@ Responde solo con el JSON.
 Extrae el detalle de movimientos de la tarjeta Nu. Entrega exclusivamente un
 JSON válido con todas las filas encontradas usando las claves: fecha,
 descripcion, valor, cuotas, valor_del_mes, interes_mes, total_pagar, restante.
+Si una columna no aparece déjala vacía.
+
+Formato esperado:
+{"transacciones": [{"fecha":"","descripcion":"","valor":"","cuotas":"","valor_del_mes":"","interes_mes":"","total_pagar":"","restante":""}]}
 
 No incluyas mensajes adicionales.
 """,
     "rappi": """
 Procesa el extracto de tarjeta Davivienda (Rappi) y responde únicamente con un
 JSON válido con las claves: tarjeta, fecha, descripcion, valor_transaccion,
-capital_facturado, cuotas, capital_pendiente, tasa_mv y tasa_ea.
+capital_facturado, cuotas, capital_pendiente, tasa_mv y tasa_ea. Si una
+columna no aparece déjala vacía.
+
+Formato esperado:
+{"transacciones": [{"tarjeta":"","fecha":"","descripcion":"","valor_transaccion":"","capital_facturado":"","cuotas":"","capital_pendiente":"","tasa_mv":"","tasa_ea":""}]}
 
 No agregues texto adicional ni comentarios.
 """,
 }
 
 
+# Presupuesto de cada solicitud por banco: cuántos tokens de salida produce en
+# promedio una página (densidad de movimientos y número de columnas) y cuánta
+# salida se pide como máximo por solicitud, con margen frente a los 8192 tokens
+# de salida del modelo.
+_PERFILES_LOTES: Dict[str, PerfilLotes] = {
+    "bancolombia": PerfilLotes(tokens_salida_por_pagina=1800, objetivo_tokens_salida=6000),
+    "nu": PerfilLotes(tokens_salida_por_pagina=1200, objetivo_tokens_salida=6000),
+    "rappi": PerfilLotes(tokens_salida_por_pagina=1100, objetivo_tokens_salida=6000),
+}
+
+
+# Perfil de rasterización por banco. Todos parten del comportamiento histórico
+# (144 dpi, color, sin pérdida); se ajustan con ``perfiles_render`` comparando
+# los bytes enviados y las transacciones obtenidas que reporta ``procesar``.
+_PERFILES_RENDER: Dict[str, PerfilRender] = {
+    "bancolombia": PerfilRender(),
+    "nu": PerfilRender(),
+    "rappi": PerfilRender(),
+}
+
+
 def _normalizar_banco(nombre_archivo: str) -> str:
     nombre = nombre_archivo.lower()
     if "nu" in nombre:
@@ -67,6 +151,13 @@ def _normalizar_banco(nombre_archivo: str) -> str:
     return "bancolombia"
 
 
+def _encabezado_documento(documento: fitz.Document) -> EncabezadoExtracto:
+    """Corte y cuenta impresos en las primeras páginas del extracto (si tiene capa de texto)."""
+
+    texto = "\n".join(documento[indice].get_text() for indice in range(min(2, documento.page_count)))
+    return leer_encabezado(texto)
+
+
 def _limpiar_salida_json(texto: str) -> Dict[str, List[Dict[str, str]]]:
     """Normaliza la respuesta de Gemini a un diccionario JSON."""
 
@@ -79,42 +170,138 @@ def _limpiar_salida_json(texto: str) -> Dict[str, List[Dict[str, str]]]:
                 contenido = contenido.lstrip()[4:]
             texto = contenido.strip()
 
-    # Gemini a veces omite el cierre del arreglo, intentamos corregirlo.
+    # Texto adicional tras el JSON: se descarta lo que sigue al último cierre.
     if not texto.endswith("}"):
         ultimo = texto.rfind("}")
         if ultimo > -1:
             texto = texto[: ultimo + 1]
 
-    return json.loads(texto)
+    try:
+        return json.loads(texto)
+    except json.JSONDecodeError as exc:
+        if _json_incompleto(texto):
+            # Salida cortada: recortarla perdería filas sin avisar.
+            raise RespuestaTruncada("la respuesta JSON quedó truncada") from exc
+        raise
+
+
+def _json_incompleto(texto: str) -> bool:
+    """``True`` si quedan objetos, arreglos o cadenas sin cerrar."""
+
+    profundidad = 0
+    en_cadena = escapado = False
+    for caracter in texto:
+        if en_cadena:
+            if escapado:
+                escapado = False
+            elif caracter == "\\":
+                escapado = True
+            elif caracter == '"':
+                en_cadena = False
+        elif caracter == '"':
+            en_cadena = True
+        elif caracter in "{[":
+            profundidad += 1
+        elif caracter in "}]":
+            profundidad -= 1
+    return en_cadena or profundidad > 0
+
+
+def _texto_fragmento(fragmento: Any) -> str:
+    try:
+        return fragmento.text
+    except ValueError:
+        # Fragmento sin texto: solo trae el motivo de finalización.
+        comprobar_finalizacion(fragmento)
+        if getattr(fragmento, "candidates", None):
+            return ""
+        raise
+
 
+def _etiqueta_paginas(primera: int, cantidad: int) -> str:
+    return f"p. {primera}" if cantidad == 1 else f"p. {primera}-{primera + cantidad - 1}"
 
-def _limpiar_valor_monetario(valor: object) -> float:
-    if valor is None or (isinstance(valor, float) and pd.isna(valor)):
-        return 0.0
 
-    texto = str(valor).strip()
-    if not texto:
-        return 0.0
+@dataclass
+class PDFDesbloqueado:
+    """Documento de PyMuPDF abierto y autenticado, junto con la estrategia usada."""
+
+    documento: fitz.Document
+    estrategia: str
+    origen: Path
+    contenido: Optional[bytes] = None
+    temporal: Optional[Path] = None
+
+    def contenido_descifrado(self) -> bytes:
+        if self.contenido is None:
+            if self.estrategia == "directo":
+                self.contenido = self.origen.read_bytes()
+            elif self.temporal is not None:
+                self.contenido = self.temporal.read_bytes()
+            else:
+                with BLOQUEO_FITZ:
+                    self.contenido = self.documento.tobytes(encryption=fitz.PDF_ENCRYPT_NONE)
+        return self.contenido
+
+    def huella(self, huella_origen: str) -> str:
+        """Identidad del contenido para la caché, dada la huella del archivo original.
+
+        Con ``directo`` el original ya es el contenido en claro.  Con ``fitz``
+        el documento se descifra en memoria y obtener sus bytes exigiría
+        reserializarlo entero solo para calcular la huella, así que se usa la
+        del archivo cifrado; el mismo extracto cifrado de otra forma no
+        comparte entradas de caché.  ``pikepdf`` ya tiene los bytes en claro.
+        """
+
+        if self.contenido is None and self.estrategia in ("directo", "fitz"):
+            return huella_origen
+        return huella_bytes(self.contenido_descifrado())
+
+    def cerrar(self) -> None:
+        with BLOQUEO_FITZ:
+            self.documento.close()
+        if self.temporal is not None:
+            self.temporal.unlink(missing_ok=True)
 
-    # Manejar valores negativos entre paréntesis: (123,45)
-    negativo = texto.startswith("(") and texto.endswith(")")
-    texto = texto.replace("(", "").replace(")", "")
 
-    texto = (
-        texto.replace("$", "")
-        .replace("€", "")
-        .replace("COP", "")
-        .replace("USD", "")
-        .replace(" ", "")
-    )
-    texto = texto.replace(".", "").replace(",", ".")
-    texto = re.sub(r"[^0-9\-.]", "", texto)
+@dataclass
+class DocumentoPreparado:
+    """Resultado de la etapa de CPU: páginas listas o transacciones en caché.
 
-    try:
-        numero = float(texto)
-        return -numero if negativo else numero
-    except (ValueError, TypeError):
-        return 0.0
+    ``paginas`` puede ser una lista ya renderizada o una :class:`FuentePaginas`
+    perezosa; en el segundo caso el documento sigue abierto hasta ``cerrar``.
+    """
+
+    paginas: Sequence[ContenidoPagina] = field(default_factory=list)
+    clave_cache: Optional[str] = None
+    registros: Optional[List[Dict[str, str]]] = None
+    origen: str = "cache"
+    estrategia: Optional[str] = None
+    segundos_desbloqueo: float = 0.0
+    tiempos_backends: List[Tuple[str, float, bool]] = field(default_factory=list)
+    perfil: Optional[PerfilRender] = None
+    desbloqueado: Optional[PDFDesbloqueado] = None
+    encabezado: EncabezadoExtracto = EncabezadoExtracto()
+
+    @property
+    def requiere_modelo(self) -> bool:
+        return self.registros is None and len(self.paginas) > 0
+
+    def cerrar(self) -> None:
+        if self.desbloqueado is not None:
+            self.desbloqueado.cerrar()
+            self.desbloqueado = None
+
+
+def _huella_pagina(contenido: ContenidoPagina) -> str:
+    return calcular_clave(contenido["mime_type"], contenido["data"])
+
+
+def _preparar_en_proceso(procesador: "ProcesadorGemini", pdf_path: Path) -> Optional[DocumentoPreparado]:
+    """Punto de entrada picklable para preparar un PDF en un proceso aparte."""
+
+    # Un documento abierto no cruza procesos: las páginas viajan ya renderizadas.
+    return procesador._preparar_documento(pdf_path, perezoso=False)
 
 
 @dataclass
@@ -124,16 +311,95 @@ class ProcesadorGemini:
     carpeta: str
     log_callback: Optional[LogCallback] = None
     modelo: str = "gemini-2.0-flash"
+    salida_estructurada: bool = True
+    streaming: bool = True
+    cliente_modelo: Optional[Any] = None
     max_reintentos: int = 3
     espera_inicial: float = 1.5
+    max_bytes_solicitud: int = 18 * 1024 * 1024
+    politica_reintentos: Optional[PoliticaReintentos] = None
+    limite_rpm: Optional[int] = None
+    limite_tpm: Optional[int] = None
+    limitador: Optional[LimitadorCuota] = None
+    max_workers: int = 1
+    usar_procesos: bool = True
+    max_paginas_concurrentes: int = 4
+    max_documentos_en_vuelo: Optional[int] = None
+    descifrado_en_memoria: bool = True
+    estrategias_desbloqueo: Tuple[str, ...] = ESTRATEGIAS_DESBLOQUEO
+    paginas_perezosas: bool = True
+    backends: Tuple[str, ...] = BACKENDS_POR_DEFECTO
+    motor_tablas: str = "pdfplumber"
+    perfiles_render: Optional[Dict[str, PerfilRender]] = None
+    perfiles_lotes: Optional[Dict[str, PerfilLotes]] = None
+    formatos_numericos: Optional[Dict[str, FormatoNumerico]] = None
+    montos_en_centavos: bool = False
+    usar_cache: bool = True
+    directorio_cache: Optional[str] = None
+    cache_max_bytes: int = 256 * 1024 * 1024
+    marcar_ya_exportadas: bool = False
+    usar_indice_huellas: bool = True
+    directorio_huellas: Optional[str] = None
+    omitir_ya_exportadas: bool = False
+    cuentas: Optional[Dict[str, str]] = None
+    salidas: Tuple[str, ...] = ("excel",)
+    incremental: bool = False
+    directorio_manifiesto: Optional[str] = None
 
     _model: Optional[genai.GenerativeModel] = field(init=False, default=None)
     _log: LogCallback = field(init=False)
+    _cache: Optional[CacheResultados] = field(init=False, default=None)
+    _indice_huellas: Optional[IndiceHuellas] = field(init=False, default=None)
+    _manifiesto: Optional[ManifiestoProcesados] = field(init=False, default=None)
+    _hojas_vigentes: Dict[str, pd.DataFrame] = field(init=False, default_factory=dict)
+    _orden_hojas: List[str] = field(init=False, default_factory=list)
+    _pdfs_ultima_ejecucion: List[str] = field(init=False, default_factory=list)
+    paginas_fallidas: Dict[str, List[int]] = field(init=False, default_factory=dict)
+    montos_invalidos: Dict[str, List[MontoInvalido]] = field(init=False, default_factory=dict)
+    estadisticas_desbloqueo: Dict[str, Dict[str, Dict[str, float]]] = field(init=False, default_factory=dict)
+    estadisticas_render: Dict[str, Dict[str, float]] = field(init=False, default_factory=dict)
+    estadisticas_backends: Dict[str, Dict[str, float]] = field(init=False, default_factory=dict)
+    _lock: threading.Lock = field(init=False, default_factory=threading.Lock)
 
     def __post_init__(self) -> None:
         self.carpeta = str(self.carpeta)
         self._carpeta_path = Path(self.carpeta)
         self._log = self.log_callback if self.log_callback else lambda mensaje: logger.info(mensaje)
+        if self.usar_cache:
+            self._cache = CacheResultados(self.directorio_cache, self.cache_max_bytes)
+        if self.marcar_ya_exportadas or self.omitir_ya_exportadas:
+            # Sin índice persistente se siguen detectando repetidas entre los archivos de una ejecución.
+            self._indice_huellas = IndiceHuellas(self.directorio_huellas, persistente=self.usar_indice_huellas)
+        if self.incremental:
+            self._manifiesto = ManifiestoProcesados(self._carpeta_path, self.directorio_manifiesto)
+        if self.politica_reintentos is None:
+            self.politica_reintentos = PoliticaReintentos(max_intentos=self.max_reintentos, espera_base=self.espera_inicial)
+        if self.limitador is None and (self.limite_rpm or self.limite_tpm):
+            # Un limitador inyectado puede compartirse entre varios procesadores.
+            self.limitador = LimitadorCuota(self.limite_rpm, self.limite_tpm)
+        # Una salida desconocida o sin su dependencia debe fallar antes de extraer nada.
+        self._escritores()
+
+    def __getstate__(self) -> Dict[str, Any]:
+        # El modelo y los callbacks de la UI no se pueden enviar a otro proceso.
+        estado = self.__dict__.copy()
+        estado["log_callback"] = None
+        estado["cliente_modelo"] = None
+        estado["limitador"] = None
+        estado["_model"] = None
+        # El índice de huellas solo se consulta en el proceso principal.
+        estado["_indice_huellas"] = None
+        estado["_manifiesto"] = None
+        estado["_hojas_vigentes"] = {}
+        estado.pop("_log", None)
+        estado.pop("_lock", None)
+        return estado
+
+    def __setstate__(self, estado: Dict[str, Any]) -> None:
+        self.__dict__.update(estado)
+        self._lock = threading.Lock()
+        # En el proceso hijo los mensajes solo van al archivo de log.
+        self._log = lambda mensaje: None
 
     # ------------------------------------------------------------------
     # Registro seguro
@@ -146,6 +412,12 @@ class ProcesadorGemini:
     # Interacción con Gemini
     # ------------------------------------------------------------------
     def configurar_gemini(self) -> None:
+        if self.cliente_modelo is not None:
+            # Cliente inyectado (p. ej. un modelo simulado para benchmarks offline).
+            self._model = self.cliente_modelo
+            self._emitir(f"✅ Cliente de modelo inyectado: {type(self.cliente_modelo).__name__}")
+            return
+
         genai.configure(api_key=self.api_key)
         self._model = genai.GenerativeModel(
             model_name=self.modelo,
@@ -154,20 +426,138 @@ class ProcesadorGemini:
         )
         self._emitir("✅ Gemini configurado correctamente")
 
-    def _invocar_modelo(self, contenido: Iterable[object]) -> str:
+    def _prompt(self, banco: str) -> str:
+        return _PROMPTS.get(banco, _PROMPTS["bancolombia"])
+
+    def _configuracion_generacion(self, banco: str) -> Optional[Dict[str, Any]]:
+        return configuracion_generacion(banco) if self.salida_estructurada else None
+
+    def _huella_solicitud(self, banco: str) -> str:
+        """Todo lo que, además de las páginas, determina la respuesta del modelo."""
+
+        configuracion = self._configuracion_generacion(banco)
+        if configuracion is None:
+            return self._prompt(banco)
+        return self._prompt(banco) + json.dumps(configuracion, sort_keys=True)
+
+    def _interpretar_respuesta(self, texto: str, banco: str) -> List[Dict[str, str]]:
+        """Convierte la respuesta en filas validadas con las columnas del banco.
+
+        Con salida estructurada basta un ``json.loads``; sin ella se limpia el
+        texto libre como antes.  Un JSON sin cerrar indica salida truncada.
+        """
+
+        try:
+            if not self.salida_estructurada:
+                return validar_transacciones(_limpiar_salida_json(texto), banco)
+            try:
+                datos = json.loads(texto)
+            except json.JSONDecodeError as exc:
+                if _json_incompleto(texto):
+                    raise RespuestaTruncada("la respuesta JSON quedó truncada") from exc
+                raise
+            return validar_transacciones(datos, banco)
+        except RespuestaTruncada as exc:
+            # Las filas que sí llegaron a cerrarse se conservan en la excepción.
+            adjuntar_parciales(exc, [validar_fila(fila, banco) for fila in transacciones_completas([texto])])
+            raise
+
+    def _invocar_modelo(
+        self, contenido: Iterable[object], prioridad: int = 0, configuracion: Optional[Dict[str, Any]] = None
+    ) -> str:
+        """Llama al modelo pasando por el limitador de cuota, si lo hay.
+
+        Los reintentos los decide ``politica_reintentos``: los errores fatales
+        se propagan como :class:`ErrorFatal` y las solicitudes demasiado
+        grandes como :class:`ErrorDividir`.  ``prioridad`` ordena la cola del
+        limitador (menor sale antes); se usa el número total de páginas del
+        documento, no el del lote, para que los extractos cortos no esperen
+        detrás de los largos.  ``configuracion`` se envía como ``generation_config`` de la
+        llamada (p. ej. el esquema de respuesta del banco).
+        """
+
         if self._model is None:
             raise RuntimeError("El modelo de Gemini no ha sido configurado")
 
-        for intento in range(1, self.max_reintentos + 1):
+        contenido = list(contenido)
+        costo = estimar_tokens(contenido) if self.limitador else 0
+
+        def llamar() -> str:
+            if self.limitador:
+                self.limitador.adquirir(costo, prioridad)
+            opciones = {"generation_config": configuracion} if configuracion else {}
+            respuesta = self._model.generate_content(contenido, **opciones)
+            comprobar_finalizacion(respuesta)
+            # ``.text`` forma parte del intento: lanza si la respuesta vino bloqueada.
+            return respuesta.text
+
+        return self.politica_reintentos.ejecutar(llamar, self._avisar_reintento)
+
+    def iterar_transacciones(
+        self, banco: str, paginas: Sequence[ContenidoPagina], paginas_documento: Optional[int] = None
+    ) -> Iterator[Dict[str, str]]:
+        """Un intento en *streaming*: produce cada transacción en cuanto se cierra.
+
+        Las filas se validan a medida que llegan, de modo que el consumidor
+        puede procesarlas antes de que termine la respuesta.  No reintenta:
+        si el flujo falla, el consumidor ya tiene las filas entregadas.
+        ``paginas_documento`` es la prioridad en el limitador (por defecto,
+        las páginas enviadas).
+        """
+
+        if self._model is None:
+            raise RuntimeError("El modelo de Gemini no ha sido configurado")
+
+        contenido = [self._prompt(banco), *paginas]
+        if self.limitador:
+            self.limitador.adquirir(estimar_tokens(contenido), paginas_documento or len(paginas))
+        opciones: Dict[str, Any] = {"stream": True}
+        configuracion = self._configuracion_generacion(banco)
+        if configuracion:
+            opciones["generation_config"] = configuracion
+
+        parser = ParserTransacciones()
+        numero = 0
+        for fragmento in self._model.generate_content(contenido, **opciones):
+            for fila in parser.alimentar(_texto_fragmento(fragmento)):
+                numero += 1
+                yield validar_fila(fila, banco, numero)
+            comprobar_finalizacion(fragmento)
+        parser.terminar()
+
+    def _extraer_en_streaming(
+        self, banco: str, paginas: Sequence[ContenidoPagina], paginas_documento: Optional[int] = None
+    ) -> List[Dict[str, str]]:
+        """Consume :meth:`iterar_transacciones` con la política de reintentos.
+
+        Si todos los intentos fallan, la excepción lleva las filas completas
+        del intento que más avanzó.
+        """
+
+        mejor: List[Dict[str, str]] = []
+
+        def intento() -> List[Dict[str, str]]:
+            nonlocal mejor
+            filas: List[Dict[str, str]] = []
             try:
-                respuesta = self._model.generate_content(list(contenido))
-                return respuesta.text
-            except Exception as exc:  # pragma: no-cover - depende de la API
-                espera = self.espera_inicial * intento
-                self._emitir(f"    ⚠️ Reintento {intento}/{self.max_reintentos}: {exc}")
-                time.sleep(min(espera, 10))
+                filas.extend(self.iterar_transacciones(banco, paginas, paginas_documento))
+            except Exception:
+                if len(filas) > len(mejor):
+                    mejor = filas
+                raise
+            return filas
 
-        raise RuntimeError("Se agotaron los intentos de comunicación con Gemini")
+        try:
+            return self.politica_reintentos.ejecutar(intento, self._avisar_reintento)
+        except Exception as exc:
+            adjuntar_parciales(exc, mejor)
+            raise
+
+    def _avisar_reintento(self, intento: int, exc: BaseException, espera: float) -> None:
+        self._emitir(
+            f"    ⚠️ Reintento {intento}/{self.politica_reintentos.max_intentos} en {espera:.1f}s: {exc}",
+            logging.WARNING,
+        )
 
     # ------------------------------------------------------------------
     # Procesamiento de PDFs
@@ -182,168 +572,1028 @@ class ProcesadorGemini:
             self._emitir(f"  ✗ Error desbloqueando: {exc}", logging.ERROR)
             return None
 
-    def pdf_a_imagenes(self, pdf_path: Path) -> Optional[List[Image.Image]]:
+    def desbloquear_pdf_en_memoria(self, pdf_path: Path) -> Optional[bytes]:
+        """Descifra el PDF sin escribir el contenido en claro a disco."""
+
         try:
-            documento = fitz.open(pdf_path)
-            imagenes = []
-            for pagina in documento:
-                pix = pagina.get_pixmap(matrix=fitz.Matrix(2, 2))
-                img = Image.open(io.BytesIO(pix.tobytes("png")))
-                imagenes.append(img)
-            documento.close()
-            return imagenes
+            buffer = io.BytesIO()
+            with Pdf.open(pdf_path, password=self.password) as pdf:
+                pdf.save(buffer)
+            return buffer.getvalue()
         except Exception as exc:
-            self._emitir(f"  ✗ Error convirtiendo PDF a imágenes: {exc}", logging.ERROR)
+            self._emitir(f"  ✗ Error desbloqueando: {exc}", logging.ERROR)
+            return None
+
+    def _desbloquear_con_pikepdf(self, pdf_path: Path) -> Optional[PDFDesbloqueado]:
+        if self.descifrado_en_memoria:
+            contenido = self.desbloquear_pdf_en_memoria(pdf_path)
+            if contenido is None:
+                return None
+            documento = fitz.open(stream=contenido, filetype="pdf")
+            return PDFDesbloqueado(documento, "pikepdf", pdf_path, contenido=contenido)
+
+        temporal = self.desbloquear_pdf(pdf_path)
+        if not temporal or not temporal.exists():
             return None
+        return PDFDesbloqueado(fitz.open(temporal), "pikepdf", pdf_path, temporal=temporal)
+
+    def desbloquear_documento(self, pdf_path: Path) -> Optional[PDFDesbloqueado]:
+        """Abre el PDF con la estrategia más barata que funcione.
 
-    def extraer_por_pagina(self, imagenes: List[Image.Image], banco: str) -> Optional[pd.DataFrame]:
-        prompt = _PROMPTS.get(banco, _PROMPTS["bancolombia"])
-        registros: List[Dict[str, str]] = []
+        Se prueban en orden las estrategias de ``estrategias_desbloqueo``:
+        ``directo`` (el PDF no pide contraseña), ``fitz`` (PyMuPDF autentica con
+        la contraseña sin reescribir el archivo) y ``pikepdf`` (descifrado
+        completo, en memoria o en un ``.temp.pdf`` según la configuración).
+        """
 
-        for indice, imagen in enumerate(imagenes, start=1):
+        documento: Optional[fitz.Document] = None
+        for estrategia in self.estrategias_desbloqueo:
             try:
-                self._emitir(f"      • Procesando página {indice}/{len(imagenes)}")
-                respuesta = self._invocar_modelo([prompt, imagen])
-                datos = _limpiar_salida_json(respuesta)
-                registros.extend(datos.get("transacciones", []))
-                self._emitir(f"        ✓ {len(datos.get('transacciones', []))} transacciones")
+                if estrategia == "pikepdf":
+                    if documento is not None:
+                        documento.close()
+                        documento = None
+                    return self._desbloquear_con_pikepdf(pdf_path)
+
+                if documento is None:
+                    documento = fitz.open(pdf_path)
+                if estrategia == "directo" and not documento.needs_pass:
+                    return PDFDesbloqueado(documento, estrategia, pdf_path)
+                if estrategia == "fitz" and documento.needs_pass and documento.authenticate(self.password):
+                    return PDFDesbloqueado(documento, estrategia, pdf_path)
             except Exception as exc:
-                self._emitir(f"        ✗ No se pudo procesar la página {indice}: {exc}", logging.WARNING)
+                logger.debug("Estrategia de desbloqueo %s falló para %s: %s", estrategia, pdf_path.name, exc)
+
+        if documento is not None:
+            documento.close()
+        self._emitir("  ✗ Error desbloqueando: ninguna estrategia abrió el documento", logging.ERROR)
+        return None
+
+    def _registrar_desbloqueo(self, banco: str, estrategia: str, segundos: float) -> None:
+        with self._lock:
+            por_estrategia = self.estadisticas_desbloqueo.setdefault(banco, {})
+            estadistica = por_estrategia.setdefault(estrategia, {"documentos": 0, "segundos": 0.0})
+            estadistica["documentos"] += 1
+            estadistica["segundos"] += segundos
+
+    def _resumir_desbloqueo(self) -> None:
+        if not self.estadisticas_desbloqueo:
+            return
+        self._emitir("\n🔓 Estrategias de desbloqueo:")
+        for banco, por_estrategia in sorted(self.estadisticas_desbloqueo.items()):
+            for estrategia, estadistica in por_estrategia.items():
+                documentos = int(estadistica["documentos"])
+                promedio_ms = estadistica["segundos"] * 1000 / documentos
+                self._emitir(f"   • {banco} / {estrategia}: {documentos} PDF(s), {promedio_ms:.1f} ms promedio")
+
+    def _backends_locales(self) -> List[BackendExtraccion]:
+        locales: List[BackendExtraccion] = []
+        for nombre in self.backends:
+            if nombre == BackendGemini.nombre:
+                continue
+            if nombre == BackendTablas.nombre:
+                locales.append(BackendTablas(self.motor_tablas))
+            elif nombre in BACKENDS:
+                locales.append(BACKENDS[nombre]())
+            else:
+                raise ValueError(f"Backend de extracción desconocido: {nombre}")
+        return locales
+
+    def _escritores(self) -> List[EscritorSalida]:
+        escritores: List[EscritorSalida] = []
+        for nombre in self.salidas:
+            if nombre not in ESCRITORES:
+                raise ValueError(f"Salida desconocida: {nombre}")
+            escritores.append(ESCRITORES[nombre]())
+        if not escritores:
+            raise ValueError("Se requiere al menos una salida")
+        return escritores
+
+    def _registrar_backend(self, nombre: str, segundos: float, aceptado: bool) -> None:
+        with self._lock:
+            estadistica = self.estadisticas_backends.setdefault(nombre, {"intentos": 0, "aceptados": 0, "segundos": 0.0})
+            estadistica["intentos"] += 1
+            estadistica["aceptados"] += int(aceptado)
+            estadistica["segundos"] += segundos
+
+    def _resumir_backends(self) -> None:
+        if not self.estadisticas_backends:
+            return
+        self._emitir("\n⚙️ Backends de extracción:")
+        for nombre in self.backends:
+            estadistica = self.estadisticas_backends.get(nombre)
+            if not estadistica:
+                continue
+            intentos = int(estadistica["intentos"])
+            self._emitir(
+                f"   • {nombre}: {int(estadistica['aceptados'])}/{intentos} documento(s) aceptados, "
+                f"{estadistica['segundos'] * 1000 / intentos:.0f} ms promedio"
+            )
+
+    def _resumir_limitador(self) -> None:
+        if self.limitador is None:
+            return
+        metricas = self.limitador.metricas()
+        self._emitir("\n🚦 Limitador de cuota:")
+        self._emitir(
+            f"   • {metricas['solicitudes']:.0f} solicitud(es), {metricas['tokens']:,.0f} tokens estimados; "
+            f"cola máx. {metricas['profundidad_maxima']:.0f}, espera media {metricas['espera_media']:.2f}s, "
+            f"máx. {metricas['espera_maxima']:.2f}s"
+        )
 
+    def _perfil_render(self, banco: str) -> PerfilRender:
+        perfiles = {**_PERFILES_RENDER, **(self.perfiles_render or {})}
+        return perfiles.get(banco, perfiles["bancolombia"])
+
+    def _registrar_render(self, perfil: PerfilRender, paginas: int, bytes_enviados: int, df: Optional[pd.DataFrame]) -> None:
+        fallidas = len(df.attrs.get("paginas_fallidas", [])) if df is not None else paginas
+        with self._lock:
+            estadistica = self.estadisticas_render.setdefault(
+                perfil.descripcion,
+                {"documentos": 0, "paginas": 0, "bytes": 0, "transacciones": 0, "paginas_fallidas": 0},
+            )
+            estadistica["documentos"] += 1
+            estadistica["paginas"] += paginas
+            estadistica["bytes"] += bytes_enviados
+            estadistica["transacciones"] += len(df) if df is not None else 0
+            estadistica["paginas_fallidas"] += fallidas
+
+    def _resumir_render(self) -> None:
+        if not self.estadisticas_render:
+            return
+        self._emitir("\n🖼️ Perfiles de render:")
+        for descripcion, estadistica in sorted(self.estadisticas_render.items()):
+            paginas = max(int(estadistica["paginas"]), 1)
+            self._emitir(
+                f"   • {descripcion}: {int(estadistica['paginas'])} página(s), "
+                f"{estadistica['bytes'] / paginas / 1024:.0f} KiB/página, "
+                f"{estadistica['transacciones'] / paginas:.1f} transacciones/página, "
+                f"{int(estadistica['paginas_fallidas'])} página(s) fallidas"
+            )
+
+    def _convertir_paginas(self, origen: OrigenPDF, convertir: Callable[[fitz.Page], Any]) -> Optional[List[Any]]:
+        try:
+            with BLOQUEO_FITZ:
+                if isinstance(origen, fitz.Document):
+                    documento = origen
+                elif isinstance(origen, bytes):
+                    documento = fitz.open(stream=origen, filetype="pdf")
+                else:
+                    documento = fitz.open(origen)
+                paginas = [convertir(pagina) for pagina in documento]
+                if documento is not origen:
+                    documento.close()
+            return paginas
+        except Exception as exc:
+            self._emitir(f"  ✗ Error convirtiendo PDF a imágenes: {exc}", logging.ERROR)
+            return None
+
+    def pdf_a_imagenes(self, origen: OrigenPDF, perfil: Optional[PerfilRender] = None) -> Optional[List[Image.Image]]:
+        """Rasteriza un PDF desbloqueado: ruta, contenido en memoria o documento abierto.
+
+        Devuelve una imagen PIL por página, con la resolución y el color de
+        ``perfil`` (por defecto el del banco Bancolombia, equivalente al render
+        histórico a 2x).  Para los blobs que se envían al modelo, véase
+        :meth:`pdf_a_contenidos`.
+        """
+
+        perfil = perfil or self._perfil_render("bancolombia")
+        return self._convertir_paginas(origen, lambda pagina: rasterizar_pagina(pagina, perfil))
+
+    def pdf_a_contenidos(
+        self, origen: OrigenPDF, perfil: Optional[PerfilRender] = None
+    ) -> Optional[List[ContenidoPagina]]:
+        """Como :meth:`pdf_a_imagenes`, con cada página ya codificada como ``{mime_type, data}``."""
+
+        perfil = perfil or self._perfil_render("bancolombia")
+        return self._convertir_paginas(origen, lambda pagina: renderizar_pagina(pagina, perfil))
+
+    def _clave_lote(self, banco: str, paginas: Sequence[ContenidoPagina]) -> Optional[str]:
+        if not self._cache:
+            return None
+        solicitud = self._huella_solicitud(banco)
+        if len(paginas) == 1:
+            return calcular_clave("pagina", _huella_pagina(paginas[0]), solicitud, self.modelo)
+        return calcular_clave("lote", *(_huella_pagina(pagina) for pagina in paginas), solicitud, self.modelo)
+
+    def _lote_en_cache(self, clave: Optional[str], etiqueta: str) -> Optional[List[Dict[str, str]]]:
+        if not (self._cache and clave):
+            return None
+        en_cache = self._cache.obtener(clave)
+        if en_cache is not None:
+            self._emitir(f"      • {etiqueta} recuperada(s) de caché ({len(en_cache)} transacciones)")
+        return en_cache
+
+    def _guardar_lote(self, clave: Optional[str], etiqueta: str, transacciones: List[Dict[str, str]]) -> None:
+        self._emitir(f"        ✓ {etiqueta}: {len(transacciones)} transacciones")
+        if self._cache and clave:
+            self._cache.guardar(clave, transacciones)
+
+    def _ensamblar_paginas(
+        self, por_lote: Dict[int, List[Dict[str, str]]], fallidas: List[int], total: int
+    ) -> Optional[pd.DataFrame]:
+        """Une las transacciones de cada lote (clave: primera página) en orden."""
+
+        if fallidas:
+            paginas = ", ".join(str(indice) for indice in sorted(fallidas))
+            self._emitir(f"      ⚠️ Páginas sin procesar ({len(fallidas)}/{total}): {paginas}", logging.WARNING)
+
+        registros = [fila for primera in sorted(por_lote) for fila in por_lote[primera]]
         if registros:
-            return pd.DataFrame(registros)
+            self._emitir(f"    ✅ {len(registros)} transacciones extraídas")
+            df = pd.DataFrame(registros)
+            df.attrs["paginas_fallidas"] = sorted(fallidas)
+            return df
         return None
 
-    def extraer_transacciones(self, imagenes: List[Image.Image], nombre_archivo: str) -> Optional[pd.DataFrame]:
-        banco = _normalizar_banco(nombre_archivo)
+    def _perfil_lotes(self, banco: str) -> PerfilLotes:
+        perfiles = {**_PERFILES_LOTES, **(self.perfiles_lotes or {})}
+        return perfiles.get(banco, PerfilLotes())
 
-        if len(imagenes) > 3 and banco == "bancolombia":
-            self._emitir("    📑 PDF extenso, procesamiento página por página")
-            return self.extraer_por_pagina(imagenes, banco)
+    def _formato_numerico(self, banco: str) -> FormatoNumerico:
+        return formato_banco(banco, self.formatos_numericos)
 
-        prompt = _PROMPTS.get(banco, _PROMPTS["bancolombia"])
+    def planificar_lotes(self, imagenes: Sequence[ContenidoPagina], banco: str) -> List[Lote]:
+        """Agrupa las páginas en solicitudes según el perfil de lotes del banco."""
+
+        perfil = self._perfil_lotes(banco)
+        lotes = planificar_lotes(tokens_por_pagina(imagenes), perfil)
+        self._emitir(
+            f"    🧮 Plan: {len(imagenes)} página(s) en {len(lotes)} solicitud(es) "
+            f"{describir_plan(lotes)} ({perfil.descripcion})"
+        )
+        return lotes
+
+    def _comprobar_carga(self, paginas: Sequence[ContenidoPagina]) -> None:
+        carga = bytes_de_carga(paginas)
+        if len(paginas) > 1 and carga > self.max_bytes_solicitud:
+            raise ErrorDividir(f"carga de {carga / 1024 / 1024:.1f} MiB supera el límite por solicitud")
+
+    def _dividir_grupo(self, primera: int, cantidad: int, profundidad: int, motivo: ErrorDividir) -> int:
+        """Registra un nodo del árbol de divisiones y devuelve el punto de corte."""
+
+        sangria = "        " + "  " * profundidad
+        etiqueta = _etiqueta_paginas(primera, cantidad)
+        if cantidad < 2:
+            self._emitir(f"{sangria}✗ {etiqueta}: {motivo}; no se puede dividir más", logging.WARNING)
+            raise motivo
+        mitad = cantidad // 2
+        self._emitir(
+            f"{sangria}✂️ {etiqueta}: {motivo} → "
+            f"{_etiqueta_paginas(primera, mitad)} + {_etiqueta_paginas(primera + mitad, cantidad - mitad)}"
+        )
+        return mitad
+
+    def _registrar_grupo(self, primera: int, cantidad: int, profundidad: int, transacciones: List[Dict[str, str]]) -> None:
+        if profundidad:
+            sangria = "        " + "  " * profundidad
+            self._emitir(f"{sangria}✓ {_etiqueta_paginas(primera, cantidad)}: {len(transacciones)} transacciones")
+
+    def _extraer_grupo(
+        self,
+        banco: str,
+        paginas: List[ContenidoPagina],
+        primera: int = 1,
+        profundidad: int = 0,
+        paginas_documento: Optional[int] = None,
+    ) -> List[Dict[str, str]]:
+        """Extrae un grupo de páginas en una sola solicitud.
+
+        Si la solicitud es demasiado grande o la respuesta sale truncada, el
+        grupo se parte en dos mitades que se extraen recursivamente y cuyas
+        transacciones se concatenan en orden.  Cada división queda en el log
+        como un nodo del árbol, sangrado según su profundidad.
+        ``paginas_documento`` (el total del PDF) es la prioridad de cada
+        solicitud en el limitador.
+        """
+
+        prioridad = paginas_documento or len(paginas)
+        try:
+            self._comprobar_carga(paginas)
+            if self.streaming:
+                transacciones = self._extraer_en_streaming(banco, paginas, prioridad)
+            else:
+                respuesta = self._invocar_modelo(
+                    [self._prompt(banco), *paginas], prioridad, self._configuracion_generacion(banco)
+                )
+                transacciones = self._interpretar_respuesta(respuesta, banco)
+        except ErrorDividir as exc:
+            mitad = self._dividir_grupo(primera, len(paginas), profundidad, exc)
+            return self._unir_mitades(
+                lambda: self._extraer_grupo(banco, paginas[:mitad], primera, profundidad + 1, prioridad),
+                lambda: self._extraer_grupo(banco, paginas[mitad:], primera + mitad, profundidad + 1, prioridad),
+            )
+        self._registrar_grupo(primera, len(paginas), profundidad, transacciones)
+        return transacciones
+
+    @staticmethod
+    def _combinar_mitades(resultados: Sequence[Union[List[Dict[str, str]], BaseException]]) -> List[Dict[str, str]]:
+        """Concatena las mitades; si alguna falló, relanza con todas las filas salvadas."""
+
+        filas: List[Dict[str, str]] = []
+        fallo: Optional[BaseException] = None
+        for resultado in resultados:
+            if isinstance(resultado, BaseException):
+                filas.extend(parciales_de(resultado))
+                fallo = fallo or resultado
+            else:
+                filas.extend(resultado)
+        if fallo is not None:
+            raise adjuntar_parciales(fallo, filas)
+        return filas
+
+    def _unir_mitades(self, *mitades: Callable[[], List[Dict[str, str]]]) -> List[Dict[str, str]]:
+        resultados: List[Union[List[Dict[str, str]], BaseException]] = []
+        for extraer in mitades:
+            try:
+                resultados.append(extraer())
+            except Exception as exc:
+                resultados.append(exc)
+        return self._combinar_mitades(resultados)
+
+    def _extraer_lote(
+        self, banco: str, paginas: List[ContenidoPagina], lote: Lote, paginas_documento: Optional[int] = None
+    ) -> List[Dict[str, str]]:
+        etiqueta = _etiqueta_paginas(lote.primera, lote.cantidad)
+        clave = self._clave_lote(banco, paginas)
+        en_cache = self._lote_en_cache(clave, etiqueta)
+        if en_cache is not None:
+            return en_cache
+
+        self._emitir(f"      • Procesando {etiqueta}")
+        transacciones = self._extraer_grupo(banco, paginas, lote.primera, paginas_documento=paginas_documento)
+        self._guardar_lote(clave, etiqueta, transacciones)
+        return transacciones
+
+    def _extraer_lotes(self, imagenes: Sequence[ContenidoPagina], lotes: List[Lote], banco: str) -> Optional[pd.DataFrame]:
+        """Envía cada lote en una solicitud independiente.
+
+        Hasta ``max_paginas_concurrentes`` lotes se consultan en paralelo; las
+        transacciones se reensamblan en el orden original de las páginas y un
+        fallo en un lote solo descarta sus páginas. Con la caché activa cada
+        respuesta se memoriza por huella de las imágenes, solicitud y modelo, de
+        modo que una nueva ejecución solo consulta los lotes pendientes.
+
+        ``imagenes`` puede ser una :class:`FuentePaginas`: las páginas de cada
+        lote se renderizan justo antes de enviarse y solo las de los lotes en
+        vuelo están en memoria.
+        """
+
+        total = len(imagenes)
+        por_lote: Dict[int, List[Dict[str, str]]] = {}
+        fallidas: List[int] = []
+
+        limite = max(1, min(self.max_paginas_concurrentes, len(lotes)))
+        en_vuelo = threading.BoundedSemaphore(limite)
+        with ThreadPoolExecutor(max_workers=limite, thread_name_prefix="lote") as ejecutor:
+            futuros: Dict[Future, Lote] = {}
+            for lote in lotes:
+                en_vuelo.acquire()
+                try:
+                    paginas = [imagenes[indice] for indice in lote.indices]
+                    futuro = ejecutor.submit(self._extraer_lote, banco, paginas, lote, total)
+                except Exception as exc:
+                    en_vuelo.release()
+                    fallidas.extend(indice + 1 for indice in lote.indices)
+                    etiqueta = _etiqueta_paginas(lote.primera, lote.cantidad)
+                    self._emitir(f"        ✗ No se pudo renderizar {etiqueta}: {exc}", logging.WARNING)
+                    continue
+                del paginas
+                futuro.add_done_callback(lambda _: en_vuelo.release())
+                futuros[futuro] = lote
+
+            for futuro in as_completed(futuros):
+                lote = futuros[futuro]
+                try:
+                    por_lote[lote.primera] = futuro.result()
+                except Exception as exc:
+                    self._registrar_lote_fallido(lote, exc, por_lote, fallidas)
+
+        return self._ensamblar_paginas(por_lote, fallidas, total)
+
+    def _registrar_lote_fallido(
+        self, lote: Lote, exc: BaseException, por_lote: Dict[int, List[Dict[str, str]]], fallidas: List[int]
+    ) -> None:
+        """Marca las páginas del lote como pendientes conservando las filas completas recibidas."""
+
+        fallidas.extend(indice + 1 for indice in lote.indices)
+        etiqueta = _etiqueta_paginas(lote.primera, lote.cantidad)
+        parciales = parciales_de(exc)
+        if parciales:
+            por_lote[lote.primera] = parciales
+            self._emitir(
+                f"        ✗ {etiqueta} incompleta: {exc} ({len(parciales)} transacciones completas conservadas)",
+                logging.WARNING,
+            )
+        else:
+            self._emitir(f"        ✗ No se pudo procesar {etiqueta}: {exc}", logging.WARNING)
+
+    def extraer_por_pagina(self, imagenes: Sequence[ContenidoPagina], banco: str) -> Optional[pd.DataFrame]:
+        """Envía cada página en una solicitud independiente."""
+
+        lotes = planificar_lotes([0] * len(imagenes), PERFIL_POR_PAGINA)
+        return self._extraer_lotes(imagenes, lotes, banco)
+
+    def extraer_transacciones(self, imagenes: Sequence[ContenidoPagina], nombre_archivo: str) -> Optional[pd.DataFrame]:
+        banco = _normalizar_banco(nombre_archivo)
 
         try:
             self._emitir(f"    📤 Analizando {len(imagenes)} página(s) con modelo {self.modelo}")
-            contenido = [prompt] + imagenes
-            respuesta = self._invocar_modelo(contenido)
-            datos = _limpiar_salida_json(respuesta)
-            transacciones = datos.get("transacciones", [])
-            if not transacciones:
-                return None
-            self._emitir(f"    ✅ {len(transacciones)} transacciones extraídas")
-            return pd.DataFrame(transacciones)
+            lotes = self.planificar_lotes(imagenes, banco)
         except Exception as exc:
             self._emitir(f"    ❌ Error analizando el PDF: {exc}", logging.ERROR)
             return None
+        return self._extraer_lotes(imagenes, lotes, banco)
+
+    def _normalizar_dataframe(
+        self,
+        df: pd.DataFrame,
+        banco: str = "bancolombia",
+        anio: Optional[int] = None,
+        corte: Optional[date] = None,
+    ) -> pd.DataFrame:
+        """Tabla tipada del banco (véase :mod:`tabla_transacciones`) sin filas repetidas."""
+
+        columnas = {str(columna).strip(): df[columna].tolist() for columna in df.columns}
+        tabla = construir_tabla(
+            columnas, banco, self._formato_numerico(banco), anio, self.montos_en_centavos, corte=corte
+        )
+        tabla.attrs = {**df.attrs, **tabla.attrs}
+        return quitar_repetidas(tabla, banco)
+
+    def _cuenta(self, pdf_path: Path, numero: Optional[str]) -> str:
+        """Cuenta del extracto: la indicada en ``cuentas`` o el banco y el número impreso.
+
+        Cadena vacía si no se conoce: dos cuentas del mismo banco no pueden
+        compartir el índice de huellas.
+        """
+
+        cuenta = (self.cuentas or {}).get(pdf_path.name)
+        if cuenta:
+            return cuenta
+        return f"{_normalizar_banco(pdf_path.stem)}-{numero}" if numero else ""
+
+    def _huella_origen(self, nombre_archivo: str) -> str:
+        """SHA-256 del archivo: un extracto renombrado sigue siendo el mismo origen."""
+
+        pdf_path = self._carpeta_path / nombre_archivo
+        huella = self._manifiesto.huella(pdf_path) if self._manifiesto is not None else None
+        return huella or huella_archivo(pdf_path)
+
+    def _marcar_ya_exportadas(self, resultados: Dict[str, pd.DataFrame]) -> Dict[str, pd.DataFrame]:
+        """Marca en ``ya_exportada`` las filas que otro extracto de la misma cuenta ya exportó.
+
+        Las hojas se recorren en orden, así que entre dos extractos solapados de
+        esta ejecución la fila queda sin marcar en el primero.  Solo con
+        ``marcar_ya_exportadas`` u ``omitir_ya_exportadas``; los extractos sin
+        cuenta conocida (ni en ``cuentas`` ni impresa) no se comparan.
+        """
+
+        if self._indice_huellas is None:
+            return resultados
+        marcadas: Dict[str, pd.DataFrame] = {}
+        total = 0
+        sin_cuenta: List[str] = []
+        for nombre_hoja, df in resultados.items():
+            banco, cuenta = df.attrs.get("banco", "bancolombia"), df.attrs.get("cuenta")
+            if not cuenta:
+                sin_cuenta.append(nombre_hoja)
+                marcadas[nombre_hoja] = df
+                continue
+            huellas = huellas_documento(df, banco, cuenta)
+            origen = origen_documento(self._huella_origen(df.attrs.get("origen", f"{nombre_hoja}.pdf")))
+            ya_exportada = self._indice_huellas.marcar(cuenta, huellas, origen)
+            total += int(ya_exportada.sum())
+            if self.omitir_ya_exportadas:
+                marcadas[nombre_hoja] = df[~ya_exportada].reset_index(drop=True)
+            else:
+                marcadas[nombre_hoja] = df.assign(ya_exportada=ya_exportada)
+        if total:
+            accion = "omitida(s)" if self.omitir_ya_exportadas else "marcada(s) en 'ya_exportada'"
+            self._emitir(f"\n♻️ {total} transacción(es) ya exportadas desde otro extracto {accion}")
+        if sin_cuenta:
+            self._emitir(
+                f"\n⚠️ Sin número de cuenta en {', '.join(sin_cuenta)}: indíquelo en 'cuentas' "
+                "para detectar transacciones ya exportadas",
+                logging.WARNING,
+            )
+        return marcadas
 
     # ------------------------------------------------------------------
-    # Normalización de resultados
+    # Pipeline por documento
     # ------------------------------------------------------------------
-    def limpiar_valores_monetarios(self, df: pd.DataFrame) -> pd.DataFrame:
-        columnas_monetarias = [
-            columna
-            for columna in df.columns
-            if any(palabra in columna.lower() for palabra in ["valor", "saldo", "pagar", "capital", "interes", "restante"])
-        ]
+    def _clave_documento(self, huella_descifrado: str, banco: str) -> str:
+        return calcular_clave("documento", huella_descifrado, banco, self._huella_solicitud(banco), self.modelo)
 
-        for columna in columnas_monetarias:
-            df[columna] = df[columna].apply(_limpiar_valor_monetario)
+    def _consultar_cache_documento(self, huella_descifrado: str, banco: str) -> DocumentoPreparado:
+        clave = self._clave_documento(huella_descifrado, banco)
+        registros = self._cache.obtener(clave) if self._cache else None
+        guardado = self._cache.obtener(calcular_clave("encabezado", huella_descifrado)) if self._cache else None
+        try:
+            encabezado = encabezado_desde_json(guardado or {})
+        except ValueError:
+            encabezado = EncabezadoExtracto()
+        return DocumentoPreparado(clave_cache=clave, registros=registros, encabezado=encabezado)
+
+    def _preparar_documento(self, pdf_path: Path, perezoso: Optional[bool] = None) -> Optional[DocumentoPreparado]:
+        """Desbloquea el PDF y prepara sus páginas (etapa de CPU).
+
+        Con la caché activa, un PDF ya procesado se resuelve sin desbloquearlo:
+        la huella del archivo original apunta a la huella de su contenido
+        (véase :meth:`PDFDesbloqueado.huella`), que junto con banco, prompt y
+        modelo forma la clave.
+
+        En modo perezoso el documento queda abierto y las páginas se
+        renderizan durante el análisis; quien reciba el resultado debe llamar
+        a :meth:`DocumentoPreparado.cerrar`.
+        """
+
+        if perezoso is None:
+            perezoso = self.paginas_perezosas
+
+        banco = _normalizar_banco(pdf_path.stem)
+        clave_alias: Optional[str] = None
+        huella_origen = ""
+        if self._cache:
+            huella_origen = huella_bytes(pdf_path.read_bytes())
+            clave_alias = calcular_clave("alias", huella_origen)
+            alias = self._cache.obtener(clave_alias)
+            if alias:
+                documento = self._consultar_cache_documento(alias["sha256"], banco)
+                if documento.registros is not None:
+                    return documento
+
+        self._emitir("  🔓 Desbloqueando PDF protegido…")
+        inicio = time.perf_counter()
+        with BLOQUEO_FITZ:
+            desbloqueado = self.desbloquear_documento(pdf_path)
+        if desbloqueado is None:
+            self._emitir("  ❌ No se pudo desbloquear el archivo", logging.ERROR)
+            return None
+        segundos = time.perf_counter() - inicio
+        self._emitir(f"  ✓ Desbloqueado con estrategia '{desbloqueado.estrategia}' ({segundos * 1000:.0f} ms)")
 
+        conservar_abierto = False
+        try:
+            with BLOQUEO_FITZ:
+                encabezado = _encabezado_documento(desbloqueado.documento)
+            documento = DocumentoPreparado()
+            if self._cache and clave_alias:
+                with BLOQUEO_FITZ:
+                    huella_descifrado = desbloqueado.huella(huella_origen)
+                self._cache.guardar(clave_alias, {"sha256": huella_descifrado})
+                # Un acierto de caché posterior no desbloquea el PDF: el encabezado se guarda aparte.
+                self._cache.guardar(calcular_clave("encabezado", huella_descifrado), encabezado_a_json(encabezado))
+                documento = self._consultar_cache_documento(huella_descifrado, banco)
+            documento.encabezado = encabezado
+            documento.estrategia = desbloqueado.estrategia
+            documento.segundos_desbloqueo = segundos
+            if documento.registros is not None:
+                return documento
+
+            entrada = EntradaExtraccion(
+                pdf_path=pdf_path,
+                banco=banco,
+                password=self.password,
+                estrategia=desbloqueado.estrategia,
+                documento=desbloqueado.documento,
+                contenido=desbloqueado.contenido_descifrado,
+                formato=self._formato_numerico(banco),
+            )
+            for backend in self._backends_locales():
+                inicio_backend = time.perf_counter()
+                try:
+                    # Cada backend toma BLOQUEO_FITZ solo si usa PyMuPDF.
+                    resultado = backend.extraer(entrada)
+                except Exception as exc:
+                    resultado = None
+                    motivo = f"error: {exc}"
+                else:
+                    motivo = resultado.motivo
+                segundos_backend = time.perf_counter() - inicio_backend
+                aceptado = resultado is not None and resultado.aceptado
+                documento.tiempos_backends.append((backend.nombre, segundos_backend, aceptado))
+                if aceptado:
+                    self._emitir(
+                        f"  📝 Backend '{backend.nombre}': {len(resultado.df)} transacciones "
+                        f"en {segundos_backend * 1000:.0f} ms"
+                    )
+                    documento.registros = resultado.df.to_dict(orient="records")
+                    documento.origen = backend.nombre
+                    return documento
+                self._emitir(f"  ℹ️ Backend '{backend.nombre}' descartado ({motivo})")
+
+            if BackendGemini.nombre not in self.backends:
+                self._emitir("  ❌ Ningún backend local aceptó el documento y Gemini está deshabilitado", logging.WARNING)
+                return documento
+
+            documento.perfil = self._perfil_render(banco)
+            if perezoso:
+                documento.paginas = FuentePaginas(desbloqueado.documento, documento.perfil)
+                documento.desbloqueado = desbloqueado
+                conservar_abierto = True
+                self._emitir(f"  ✓ {len(documento.paginas)} página(s) listas (renderizado bajo demanda)")
+                return documento
+
+            self._emitir("  🖼️ Convirtiendo páginas a imágenes")
+            imagenes = self.pdf_a_contenidos(desbloqueado.documento, documento.perfil)
+            if not imagenes:
+                self._emitir("  ❌ Error durante la conversión a imágenes", logging.ERROR)
+                return None
+            self._emitir(f"  ✓ {len(imagenes)} página(s) convertidas")
+            documento.paginas = imagenes
+            return documento
+        finally:
+            if not conservar_abierto:
+                desbloqueado.cerrar()
+
+    def _registrar_preparacion(self, pdf_path: Path, documento: DocumentoPreparado) -> None:
+        if documento.estrategia:
+            self._registrar_desbloqueo(_normalizar_banco(pdf_path.stem), documento.estrategia, documento.segundos_desbloqueo)
+        for nombre, segundos, aceptado in documento.tiempos_backends:
+            self._registrar_backend(nombre, segundos, aceptado)
+
+    def _resultado_sin_modelo(self, pdf_path: Path, documento: DocumentoPreparado) -> Optional[pd.DataFrame]:
+        if documento.registros is None:
+            return None
+        if documento.origen == "cache":
+            self._emitir(f"  ♻️ {pdf_path.name}: resultado recuperado de caché")
+        else:
+            self._emitir(f"  📝 {pdf_path.name}: extraído localmente ('{documento.origen}'), sin llamar a Gemini")
+        return pd.DataFrame(documento.registros)
+
+    def _cerrar_analisis_modelo(
+        self, pdf_path: Path, documento: DocumentoPreparado, df: Optional[pd.DataFrame], segundos: float
+    ) -> None:
+        """Estadísticas, registro de páginas fallidas y caché tras consultar el modelo."""
+
+        self._registrar_backend(BackendGemini.nombre, segundos, df is not None and not df.empty)
+        if documento.perfil is not None:
+            self._registrar_render(documento.perfil, len(documento.paginas), bytes_de_carga(documento.paginas), df)
+
+        fallidas = df.attrs.get("paginas_fallidas", []) if df is not None else []
+        completo = df is not None and not df.empty and not fallidas
+        if not completo:
+            # Lista vacía: falló el documento completo, no páginas concretas.
+            self.paginas_fallidas[pdf_path.name] = list(fallidas)
+        if completo and self._cache and documento.clave_cache:
+            # Solo se guardan extracciones completas; las parciales se reintentan.
+            self._cache.guardar(documento.clave_cache, df.to_dict(orient="records"))
+
+    def _finalizar_documento(
+        self, pdf_path: Path, df: Optional[pd.DataFrame], encabezado: EncabezadoExtracto = EncabezadoExtracto()
+    ) -> Optional[pd.DataFrame]:
+        if df is None or df.empty:
+            self._emitir(f"  ❌ No se extrajeron datos útiles de {pdf_path.name}", logging.WARNING)
+            return None
+        if self._manifiesto is not None and pdf_path.name not in self.paginas_fallidas:
+            # Se guardan las filas sin normalizar: al recuperarlas se normalizan como nuevas.
+            self._manifiesto.registrar(pdf_path, df.to_dict(orient="records"), encabezado)
+        return self._normalizar_documento(pdf_path, df, encabezado)
+
+    @staticmethod
+    def _fecha_corte(pdf_path: Path, df: pd.DataFrame, fecha_corte: Optional[date]) -> date:
+        """Corte del extracto para las fechas sin año.
+
+        En orden: el impreso en el extracto, la fecha con año más reciente de
+        las filas, el periodo del nombre del archivo y, como cota superior, la
+        fecha de modificación (un extracto se descarga después de su corte).
+        """
+
+        if fecha_corte:
+            return fecha_corte
+        corte = corte_por_fechas(df["fecha"].tolist()) if "fecha" in df else None
+        corte = corte or corte_por_nombre(pdf_path.stem)
+        if corte:
+            return corte
+        try:
+            return date.fromtimestamp(pdf_path.stat().st_mtime)
+        except OSError:
+            return date.today()
+
+    def _normalizar_documento(
+        self, pdf_path: Path, df: pd.DataFrame, encabezado: EncabezadoExtracto = EncabezadoExtracto()
+    ) -> pd.DataFrame:
+        banco = _normalizar_banco(pdf_path.stem)
+        corte = self._fecha_corte(pdf_path, df, encabezado.fecha_corte)
+        df = self._normalizar_dataframe(df, banco, corte=corte)
+        df.attrs.update(
+            banco=banco, cuenta=self._cuenta(pdf_path, encabezado.cuenta), origen=pdf_path.name, fecha_corte=corte
+        )
+        fechas_invalidas = df.attrs.get("fechas_invalidas", [])
+        if fechas_invalidas:
+            self._emitir(
+                f"  ⚠️ {len(fechas_invalidas)} fecha(s) ilegibles en {pdf_path.name} quedaron vacías "
+                f"(filas {', '.join(map(str, fechas_invalidas[:5]))}{', …' if len(fechas_invalidas) > 5 else ''})",
+                logging.WARNING,
+            )
+        invalidos = df.attrs.get("montos_invalidos", [])
+        if invalidos:
+            muestra = ", ".join(f"fila {m.fila} {m.columna}={m.valor!r}" for m in invalidos[:3])
+            self._emitir(
+                f"  ⚠️ {len(invalidos)} monto(s) ilegibles en {pdf_path.name} quedaron vacíos: {muestra}"
+                + (", …" if len(invalidos) > 3 else ""),
+                logging.WARNING,
+            )
+            with self._lock:
+                self.montos_invalidos[pdf_path.name] = list(invalidos)
         return df
 
-    def _normalizar_dataframe(self, df: pd.DataFrame) -> pd.DataFrame:
-        df = df.copy()
-        df.columns = [str(col).strip() for col in df.columns]
-        df = df.drop_duplicates().reset_index(drop=True)
-        return self.limpiar_valores_monetarios(df)
-
-    # ------------------------------------------------------------------
-    # Flujo principal
-    # ------------------------------------------------------------------
-    def procesar(self) -> Optional[Path]:
+    def _analizar_documento(self, pdf_path: Path, documento: DocumentoPreparado) -> Optional[pd.DataFrame]:
+        """Envía las páginas a Gemini y normaliza el resultado (etapa de red)."""
+
+        self._registrar_preparacion(pdf_path, documento)
+        if not documento.requiere_modelo:
+            return self._finalizar_documento(
+                pdf_path, self._resultado_sin_modelo(pdf_path, documento), documento.encabezado
+            )
+
+        self._emitir(f"  🤖 Analizando con Gemini… ({pdf_path.name})")
+        entrada = EntradaExtraccion(
+            pdf_path=pdf_path,
+            banco=_normalizar_banco(pdf_path.stem),
+            password=self.password,
+            estrategia=documento.estrategia or "",
+            paginas=documento.paginas,
+        )
+        inicio = time.perf_counter()
         try:
-            self._emitir("=" * 60)
-            self._emitir("🤖 INICIANDO PROCESAMIENTO CON GEMINI AI")
-            self._emitir("=" * 60)
+            df = BackendGemini(self).extraer(entrada).df
+        finally:
+            documento.cerrar()
+        self._cerrar_analisis_modelo(pdf_path, documento, df, time.perf_counter() - inicio)
+        return self._finalizar_documento(pdf_path, df, documento.encabezado)
+
+    def _registrar_resultado(self, resultados: Dict[str, pd.DataFrame], pdf_path: Path, df: pd.DataFrame) -> None:
+        # El escritor de Excel recorta y desambigua los nombres de hoja; el
+        # nombre completo evita que dos archivos con el mismo prefijo se pisen.
+        nombre_hoja = pdf_path.stem
+        resultados[nombre_hoja] = df
+
+        self._emitir("\n  ✅ EXTRACCIÓN COMPLETA")
+        self._emitir(f"     • Hoja: {nombre_hoja}")
+        self._emitir(f"     • Filas: {len(df)}")
+        self._emitir(f"     • Columnas: {len(df.columns)}")
+
+    def _procesar_secuencial(self, pdfs: List[Path]) -> Dict[str, pd.DataFrame]:
+        resultados: Dict[str, pd.DataFrame] = {}
+
+        for pdf_path in pdfs:
+            self._emitir("\n" + "━" * 60)
+            self._emitir(f"📄 {pdf_path.name}")
+            self._emitir("━" * 60)
+
+            documento = self._preparar_documento(pdf_path)
+            if documento is None:
+                continue
+
+            df = self._analizar_documento(pdf_path, documento)
+            if df is not None:
+                self._registrar_resultado(resultados, pdf_path, df)
+
+        return resultados
+
+    def _crear_ejecutor_preparacion(self) -> Executor:
+        if self.usar_procesos:
+            return ProcessPoolExecutor(max_workers=self.max_workers)
+        return ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="preparacion")
+
+    def _procesar_concurrente(self, pdfs: List[Path]) -> Dict[str, pd.DataFrame]:
+        """Procesa varios PDFs a la vez conservando el orden de las hojas.
+
+        El desbloqueo y la rasterización (CPU) se ejecutan en un pool de
+        procesos; las llamadas a Gemini (red) en un pool de hilos. Las hojas se
+        registran siempre en el orden de ``pdfs`` para que el Excel sea
+        idéntico al del modo secuencial.  Como mucho ``max_documentos_en_vuelo``
+        documentos (por defecto el doble de workers) están preparados o en
+        análisis a la vez: el siguiente PDF se prepara cuando uno termina.
+        """
+
+        self._emitir(f"\n⚡ Modo concurrente: {self.max_workers} worker(s)")
+        analisis_pendientes: Dict[Path, Future] = {}
+        # Un documento preparado guarda todas sus páginas rasterizadas hasta que
+        # termina su análisis: se limita cuántos hay entre ambas etapas.
+        limite = max(1, self.max_documentos_en_vuelo or 2 * self.max_workers)
+        por_preparar = deque(pdfs)
+        en_vuelo: Dict[Future, Tuple[str, Path]] = {}
+
+        with self._crear_ejecutor_preparacion() as preparacion, ThreadPoolExecutor(
+            max_workers=self.max_workers, thread_name_prefix="gemini"
+        ) as analisis:
+            while por_preparar or en_vuelo:
+                while por_preparar and len(en_vuelo) < limite:
+                    pdf_path = por_preparar.popleft()
+                    en_vuelo[preparacion.submit(_preparar_en_proceso, self, pdf_path)] = ("preparacion", pdf_path)
+
+                listos, _ = wait(en_vuelo, return_when=FIRST_COMPLETED)
+                for futuro in listos:
+                    etapa, pdf_path = en_vuelo.pop(futuro)
+                    if etapa != "preparacion":
+                        # El análisis terminó y libera su lugar; el resultado se lee al final.
+                        continue
+                    try:
+                        documento = futuro.result()
+                    except Exception as exc:
+                        self._emitir(f"  ❌ {pdf_path.name}: fallo preparando el PDF: {exc}", logging.ERROR)
+                        continue
+                    if documento is None:
+                        self._emitir(f"  ❌ {pdf_path.name}: no se pudo preparar el archivo", logging.ERROR)
+                        continue
+                    if documento.registros is None:
+                        self._emitir(f"  ✓ {pdf_path.name}: {len(documento.paginas)} página(s) listas")
+                    analisis_pendientes[pdf_path] = analisis.submit(self._analizar_documento, pdf_path, documento)
+                    en_vuelo[analisis_pendientes[pdf_path]] = ("analisis", pdf_path)
 
-            if not self._carpeta_path.exists():
-                raise FileNotFoundError(f"La carpeta {self._carpeta_path} no existe")
+            resultados: Dict[str, pd.DataFrame] = {}
+            for pdf_path in pdfs:
+                futuro = analisis_pendientes.get(pdf_path)
+                if futuro is None:
+                    continue
+                try:
+                    df = futuro.result()
+                except Exception as exc:
+                    self._emitir(f"  ❌ {pdf_path.name}: fallo analizando el PDF: {exc}", logging.ERROR)
+                    continue
+                if df is not None:
+                    self._emitir("\n" + "━" * 60)
+                    self._emitir(f"📄 {pdf_path.name}")
+                    self._registrar_resultado(resultados, pdf_path, df)
 
-            self.configurar_gemini()
+        return resultados
 
-            pdfs = sorted([p for p in self._carpeta_path.glob("*.pdf") if not p.name.endswith(".temp.pdf")])
-            if not pdfs:
-                self._emitir("❌ No se encontraron PDFs en la carpeta indicada", logging.WARNING)
-                return None
+    # ------------------------------------------------------------------
+    # Flujo principal
+    # ------------------------------------------------------------------
+    def _iniciar_procesamiento(self, solo: Optional[Collection[str]] = None) -> Optional[List[Path]]:
+        """Prepara una ejecución y lista los PDFs a procesar.
+
+        ``solo`` restringe la ejecución a esos nombres de archivo (el reintento
+        no toma los PDFs agregados después de la última ejecución).
+        """
+
+        self._emitir("=" * 60)
+        self._emitir("🤖 INICIANDO PROCESAMIENTO CON GEMINI AI")
+        self._emitir("=" * 60)
+
+        if not self._carpeta_path.exists():
+            raise FileNotFoundError(f"La carpeta {self._carpeta_path} no existe")
+
+        self.configurar_gemini()
+        self.paginas_fallidas = {}
+        self.montos_invalidos = {}
+        if self._indice_huellas is not None:
+            self._indice_huellas.descartar()
+        if self._manifiesto is not None:
+            self._manifiesto.descartar()
+        self._hojas_vigentes = {}
+        self.estadisticas_desbloqueo = {}
+        self.estadisticas_render = {}
+        self.estadisticas_backends = {}
+
+        pdfs = sorted([p for p in self._carpeta_path.glob("*.pdf") if not p.name.endswith(".temp.pdf")])
+        if solo is not None:
+            nuevos = [p.name for p in pdfs if p.name not in solo]
+            pdfs = [p for p in pdfs if p.name in solo]
+            if nuevos:
+                self._emitir(f"ℹ️ {len(nuevos)} PDF(s) nuevo(s) no se incluyen en el reintento: {', '.join(nuevos)}")
+        if not pdfs:
+            self._emitir("❌ No se encontraron PDFs en la carpeta indicada", logging.WARNING)
+            return None
 
-            self._emitir(f"\n📄 PDFs encontrados: {len(pdfs)}")
-            for pdf in pdfs:
-                self._emitir(f"   • {pdf.name}")
+        self._emitir(f"\n📄 PDFs encontrados: {len(pdfs)}")
+        for pdf in pdfs:
+            self._emitir(f"   • {pdf.name}")
+        self._orden_hojas = [pdf.stem for pdf in pdfs]
+        self._pdfs_ultima_ejecucion = [pdf.name for pdf in pdfs]
+        if self._manifiesto is not None:
+            pdfs = self._recuperar_sin_cambios(pdfs)
+        return pdfs
+
+    def _recuperar_sin_cambios(self, pdfs: List[Path]) -> List[Path]:
+        """Modo incremental: recupera las hojas de los PDFs sin cambios y devuelve el resto."""
+
+        pendientes, vigentes = self._manifiesto.clasificar(pdfs)
+        for pdf_path, (registros, encabezado) in vigentes.items():
+            self._hojas_vigentes[pdf_path.stem] = self._normalizar_documento(
+                pdf_path, pd.DataFrame(registros), encabezado
+            )
+        self._emitir(
+            f"\n♻️ Modo incremental: {len(vigentes)} PDF(s) sin cambios, "
+            f"{len(pendientes)} nuevo(s) o modificado(s) por extraer"
+        )
+        return pendientes
 
-            excel_path = self._carpeta_path / "Extractos_Consolidados.xlsx"
-            resultados: Dict[str, pd.DataFrame] = {}
+    def _combinar_hojas_vigentes(self, resultados: Dict[str, pd.DataFrame]) -> Dict[str, pd.DataFrame]:
+        """Intercala las hojas recuperadas con las recién extraídas en el orden de la carpeta."""
 
-            for pdf_path in pdfs:
-                self._emitir("\n" + "━" * 60)
-                self._emitir(f"📄 {pdf_path.name}")
-                self._emitir("━" * 60)
-
-                self._emitir("  🔓 Desbloqueando PDF protegido…")
-                temp_pdf = self.desbloquear_pdf(pdf_path)
-                if not temp_pdf or not temp_pdf.exists():
-                    self._emitir("  ❌ No se pudo desbloquear el archivo", logging.ERROR)
-                    continue
+        if not self._hojas_vigentes:
+            return resultados
+        hojas = {**self._hojas_vigentes, **resultados}
+        return {nombre: hojas[nombre] for nombre in self._orden_hojas if nombre in hojas}
 
-                self._emitir("  🖼️ Convirtiendo páginas a imágenes")
-                imagenes = self.pdf_a_imagenes(temp_pdf)
-                if not imagenes:
-                    self._emitir("  ❌ Error durante la conversión a imágenes", logging.ERROR)
-                    temp_pdf.unlink(missing_ok=True)
-                    continue
-                self._emitir(f"  ✓ {len(imagenes)} página(s) convertidas")
+    def _finalizar_procesamiento(self, resultados: Dict[str, pd.DataFrame]) -> Optional[Path]:
+        resultados = self._combinar_hojas_vigentes(resultados)
+        if not resultados:
+            self._emitir("\n❌ No se lograron extraer movimientos de los PDFs proporcionados", logging.WARNING)
+            return None
 
-                self._emitir("  🤖 Analizando con Gemini…")
-                df = self.extraer_transacciones(imagenes, pdf_path.stem)
-                if df is None or df.empty:
-                    self._emitir("  ❌ No se extrajeron datos útiles", logging.WARNING)
-                    temp_pdf.unlink(missing_ok=True)
-                    continue
+        resultados = self._marcar_ya_exportadas(resultados)
+        escritores = self._escritores()
 
-                df = self._normalizar_dataframe(df)
-                nombre_hoja = pdf_path.stem[:31]
-                resultados[nombre_hoja] = df
+        self._emitir("\n" + "=" * 60)
+        self._emitir("💾 GENERANDO ARCHIVOS DE SALIDA")
+        self._emitir("=" * 60)
 
-                self._emitir("\n  ✅ EXTRACCIÓN COMPLETA")
-                self._emitir(f"     • Hoja: {nombre_hoja}")
-                self._emitir(f"     • Filas: {len(df)}")
-                self._emitir(f"     • Columnas: {len(df.columns)}")
+        rutas: List[Path] = []
+        try:
+            # Cada salida se escribe en un temporal y reemplaza a la anterior
+            # solo si se completó.
+            for escritor in escritores:
+                rutas.append(escritor.escribir(resultados, self._carpeta_path))
+        except Exception:
+            # Lo que no llegó a la salida no cuenta como exportado.
+            if self._indice_huellas is not None:
+                self._indice_huellas.descartar()
+            if self._manifiesto is not None:
+                self._manifiesto.descartar()
+            raise
+        for nombre_hoja, df in resultados.items():
+            self._emitir(f"✓ Hoja '{nombre_hoja}' guardada ({len(df)} transacciones)")
+        if self._indice_huellas is not None:
+            self._indice_huellas.confirmar()
+        if self._manifiesto is not None:
+            self._manifiesto.confirmar()
+
+        self._resumir_desbloqueo()
+        self._resumir_render()
+        self._resumir_backends()
+        self._resumir_limitador()
+        if self.paginas_fallidas:
+            self._emitir(
+                f"\n⚠️ {len(self.paginas_fallidas)} archivo(s) con páginas pendientes; "
+                "use reintentar_fallidos() para completarlos",
+                logging.WARNING,
+            )
+        if self.montos_invalidos:
+            total = sum(len(invalidos) for invalidos in self.montos_invalidos.values())
+            self._emitir(
+                f"\n⚠️ {total} monto(s) ilegibles en {len(self.montos_invalidos)} archivo(s); "
+                "revise montos_invalidos",
+                logging.WARNING,
+            )
+
+        for ruta in rutas:
+            self._emitir(f"\n🎯 Archivo final: {ruta}")
+        return rutas[0]
 
-                temp_pdf.unlink(missing_ok=True)
+    def procesar(self) -> Optional[Path]:
+        return self._ejecutar()
 
-            if not resultados:
-                self._emitir("\n❌ No se lograron extraer movimientos de los PDFs proporcionados", logging.WARNING)
+    def _ejecutar(self, solo: Optional[Collection[str]] = None) -> Optional[Path]:
+        try:
+            pdfs = self._iniciar_procesamiento(solo)
+            if pdfs is None:
                 return None
 
-            if excel_path.exists():
-                respaldo = excel_path.with_suffix(".bak")
-                excel_path.replace(respaldo)
-                self._emitir(f"ℹ️ Copia de seguridad creada: {respaldo.name}")
-
-            self._emitir("\n" + "=" * 60)
-            self._emitir("💾 GENERANDO ARCHIVO EXCEL")
-            self._emitir("=" * 60)
-
-            with pd.ExcelWriter(excel_path, engine="openpyxl") as writer:
-                for nombre_hoja, df in resultados.items():
-                    df.to_excel(writer, sheet_name=nombre_hoja, index=False)
-                    self._emitir(f"✓ Hoja '{nombre_hoja}' guardada ({len(df)} transacciones)")
+            if self.max_workers > 1:
+                resultados = self._procesar_concurrente(pdfs)
+            else:
+                resultados = self._procesar_secuencial(pdfs)
 
-            self._emitir(f"\n🎯 Archivo final: {excel_path}")
-            return excel_path
+            return self._finalizar_procesamiento(resultados)
         except Exception as exc:
             self._emitir(f"\n❌ Error general durante el procesamiento: {exc}", logging.ERROR)
             logger.exception("Fallo inesperado en el procesamiento de extractos")
             return None
 
+    def reintentar_fallidos(self) -> Optional[Path]:
+        """Repite solo las páginas que fallaron en la última ejecución.
+
+        Los documentos completos se recuperan de la caché de documentos y las
+        páginas que sí respondieron, de la caché de páginas; Gemini solo recibe
+        las páginas registradas en ``paginas_fallidas``. El Excel se regenera
+        con las hojas de los mismos PDFs de la última ejecución; los agregados
+        después a la carpeta esperan a la próxima :meth:`procesar`.
+
+        Sin caché no hay de dónde recuperar las páginas que sí respondieron, así
+        que el reintento se rechaza en lugar de volver a enviar (y pagar) todo.
+        """
+
+        if not self.paginas_fallidas:
+            self._emitir("ℹ️ No hay páginas pendientes de reintento")
+            return None
+        if not self._cache:
+            self._emitir(
+                "⚠️ El reintento necesita la caché (usar_cache=True): sin ella se volverían a enviar "
+                "todas las páginas; use procesar() para repetir la extracción completa",
+                logging.WARNING,
+            )
+            return None
+
+        for nombre, paginas in self.paginas_fallidas.items():
+            detalle = ", ".join(str(indice) for indice in paginas) if paginas else "documento completo"
+            self._emitir(f"🔁 {nombre}: {detalle}")
+
+        return self._ejecutar(solo=set(self._pdfs_ultima_ejecucion))
+
 
@@ -0,0 +1,275 @@
+"""Política de reintentos de las llamadas al modelo.
+
+:class:`PoliticaReintentos` clasifica cada error en una de tres clases:
+
+* ``reintentable``: cuota agotada, sobrecarga o fallos transitorios de red;
+  se espera con retroceso exponencial y *full jitter* (o lo que indique el
+  servidor, si envía una sugerencia de espera) y se vuelve a intentar.
+* ``fatal``: clave inválida, permisos, contenido bloqueado o solicitud mal
+  formada; reintentar no cambia nada y se propaga de inmediato como
+  :class:`ErrorFatal`.
+* ``dividir``: la solicitud es demasiado grande o la respuesta salió
+  truncada; repetirla igual fallaría de nuevo, así que se propaga como
+  :class:`ErrorDividir` para que el llamador la parta en solicitudes menores.
+
+El reloj, la fuente de azar y las funciones de espera son inyectables para
+probar la política sin esperar de verdad (véase
+:class:`modelo_simulado.RelojSimulado`).
+"""
+
+from __future__ import annotations
+
+import asyncio
+import random
+import re
+import time
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, List, Optional, TypeVar
+
+try:  # pragma: no-cover - dependencias opcionales
+    from google.generativeai.types import BlockedPromptException, StopCandidateException
+
+    _BLOQUEOS: tuple = (BlockedPromptException, StopCandidateException)
+except Exception:  # pragma: no-cover - SDK no disponible
+    _BLOQUEOS = ()
+
+
+T = TypeVar("T")
+
+REINTENTABLE = "reintentable"
+FATAL = "fatal"
+DIVIDIR = "dividir"
+
+_CODIGOS_REINTENTABLES = {408, 429, 500, 502, 503, 504}
+_CODIGOS_FATALES = {400, 401, 403, 404}
+_CODIGOS_DIVIDIR = {413}
+_PATRON_TAMANO = re.compile(
+    r"(too large|exceeds the maximum|token count|request payload size|max_tokens|maximum number of tokens)", re.I
+)
+_PATRON_SUGERENCIA = re.compile(r"retry(?:_delay)?\s*(?:in|after|\{\s*seconds:)\s*([\d.]+)\s*s?", re.I)
+
+# ``Candidate.FinishReason`` por valor: el SDK a veces entrega el entero
+# (p. ej. en el mensaje de ``.text``) y a veces el miembro del enum.
+_MOTIVOS_FINALIZACION = {
+    2: "MAX_TOKENS",
+    3: "SAFETY",
+    4: "RECITATION",
+    6: "LANGUAGE",
+    7: "BLOCKLIST",
+    8: "PROHIBITED_CONTENT",
+    9: "SPII",
+    11: "IMAGE_SAFETY",
+}
+_MOTIVOS_BLOQUEO = frozenset(_MOTIVOS_FINALIZACION.values()) - {"MAX_TOKENS"}
+
+
+class ErrorModelo(RuntimeError):
+    """Error del modelo que no debe reintentarse tal cual."""
+
+    clase = FATAL
+
+
+class ErrorFatal(ErrorModelo):
+    clase = FATAL
+
+
+class ErrorDividir(ErrorModelo):
+    """La solicitud debe partirse en solicitudes más pequeñas."""
+
+    clase = DIVIDIR
+
+
+class RespuestaTruncada(ErrorDividir):
+    """La salida del modelo se cortó antes de cerrar el JSON."""
+
+
+def adjuntar_parciales(exc: BaseException, transacciones: List[Dict[str, str]]) -> BaseException:
+    """Anota en ``exc`` las transacciones completas recuperadas antes del fallo."""
+
+    if transacciones and len(transacciones) > len(parciales_de(exc)):
+        exc.transacciones = list(transacciones)  # type: ignore[attr-defined]
+    return exc
+
+
+def parciales_de(exc: BaseException) -> List[Dict[str, str]]:
+    return getattr(exc, "transacciones", None) or []
+
+
+def motivo_finalizacion(candidato: Any) -> Optional[str]:
+    """Nombre del ``finish_reason`` de ``candidato`` (``"SAFETY"``, ``"MAX_TOKENS"``...)."""
+
+    motivo = getattr(candidato, "finish_reason", None)
+    nombre = getattr(motivo, "name", None)
+    if nombre:
+        return nombre
+    if isinstance(motivo, int):
+        return _MOTIVOS_FINALIZACION.get(motivo, str(motivo))
+    return motivo
+
+
+def comprobar_finalizacion(respuesta: Any) -> None:
+    """Clasifica ``respuesta`` por su motivo de finalización, no por el texto.
+
+    Un candidato cortado por MAX_TOKENS lanza :class:`RespuestaTruncada`; uno
+    detenido por los filtros (SAFETY, RECITATION, BLOCKLIST...) o una
+    solicitud bloqueada lanzan :class:`ErrorFatal`, porque repetirla daría el
+    mismo bloqueo.
+    """
+
+    bloqueo = getattr(getattr(respuesta, "prompt_feedback", None), "block_reason", None)
+    if bloqueo:
+        raise ErrorFatal(f"la solicitud fue bloqueada ({getattr(bloqueo, 'name', bloqueo)})")
+    for candidato in getattr(respuesta, "candidates", None) or []:
+        motivo = motivo_finalizacion(candidato)
+        if motivo == "MAX_TOKENS":
+            raise RespuestaTruncada("la respuesta alcanzó el máximo de tokens de salida (MAX_TOKENS)")
+        if motivo in _MOTIVOS_BLOQUEO:
+            raise ErrorFatal(f"el modelo detuvo la respuesta por {motivo}")
+
+
+def _codigo(exc: BaseException) -> Optional[int]:
+    codigo = getattr(exc, "code", None)
+    if isinstance(codigo, int):
+        return codigo
+    respuesta = getattr(exc, "response", None)
+    estado = getattr(respuesta, "status_code", None)
+    return estado if isinstance(estado, int) else None
+
+
+def clasificar_error(exc: BaseException) -> str:
+    """Clase de ``exc``: :data:`REINTENTABLE`, :data:`FATAL` o :data:`DIVIDIR`."""
+
+    if isinstance(exc, ErrorModelo):
+        return exc.clase
+    mensaje = str(exc)
+    if _BLOQUEOS and isinstance(exc, _BLOQUEOS):
+        # ``StopCandidateException`` lleva el candidato como primer argumento.
+        candidato = exc.args[0] if exc.args else None
+        return DIVIDIR if motivo_finalizacion(candidato) == "MAX_TOKENS" else FATAL
+
+    codigo = _codigo(exc)
+    if codigo in _CODIGOS_DIVIDIR or (codigo == 400 and _PATRON_TAMANO.search(mensaje)):
+        return DIVIDIR
+    if codigo in _CODIGOS_REINTENTABLES:
+        return REINTENTABLE
+    if codigo in _CODIGOS_FATALES:
+        return FATAL
+
+    # Los bloqueos y truncados los detecta :func:`comprobar_finalizacion` en
+    # la respuesta antes de leer ``.text``; el ValueError de ``.text`` solo
+    # trae el motivo como entero y no se interpreta aquí.
+
+    # Errores de red y desconocidos: se conserva el comportamiento histórico.
+    return REINTENTABLE
+
+
+def sugerencia_espera(exc: BaseException) -> Optional[float]:
+    """Segundos de espera indicados por el servidor, si los hay.
+
+    Se consultan, en orden, ``RetryInfo`` en los detalles gRPC, la cabecera
+    ``Retry-After`` de la respuesta HTTP y el texto del mensaje.
+    """
+
+    for detalle in getattr(exc, "details", None) or []:
+        retraso = getattr(detalle, "retry_delay", None)
+        if retraso is not None and hasattr(retraso, "ToTimedelta"):
+            return retraso.ToTimedelta().total_seconds()
+
+    cabeceras = getattr(getattr(exc, "response", None), "headers", None)
+    if cabeceras:
+        valor = cabeceras.get("Retry-After") or cabeceras.get("retry-after")
+        try:
+            return float(valor) if valor is not None else None
+        except ValueError:
+            pass
+
+    coincidencia = _PATRON_SUGERENCIA.search(str(exc))
+    return float(coincidencia.group(1)) if coincidencia else None
+
+
+@dataclass
+class PoliticaReintentos:
+    """Retroceso exponencial con *full jitter* y clasificación de errores.
+
+    La espera del intento ``n`` es uniforme en ``[0, min(espera_maxima,
+    espera_base * 2**(n-1))]``.  Si el servidor sugiere una espera se usa la
+    mayor de ambas, acotada por ``espera_maxima_sugerida``.
+    """
+
+    max_intentos: int = 3
+    espera_base: float = 1.5
+    espera_maxima: float = 30.0
+    espera_maxima_sugerida: float = 120.0
+    azar: random.Random = field(default_factory=random.Random)
+    dormir: Callable[[float], None] = time.sleep
+    dormir_async: Callable[[float], Awaitable[Any]] = asyncio.sleep
+
+    clasificar = staticmethod(clasificar_error)
+
+    def espera(self, intento: int, exc: Optional[BaseException] = None) -> float:
+        tope = min(self.espera_maxima, self.espera_base * 2 ** (intento - 1))
+        espera = self.azar.uniform(0, tope)
+        sugerida = sugerencia_espera(exc) if exc is not None else None
+        if sugerida is not None:
+            espera = max(espera, min(sugerida, self.espera_maxima_sugerida))
+        return espera
+
+    def decidir(self, intento: int, exc: BaseException) -> float:
+        """Devuelve la espera antes del siguiente intento o lanza el error definitivo."""
+
+        clase = self.clasificar(exc)
+        if isinstance(exc, ErrorModelo):
+            raise exc
+        if clase == FATAL:
+            raise ErrorFatal(str(exc)) from exc
+        if clase == DIVIDIR:
+            raise ErrorDividir(str(exc)) from exc
+        if intento >= self.max_intentos:
+            raise RuntimeError(f"Se agotaron los {self.max_intentos} intentos: {exc}") from exc
+        return self.espera(intento, exc)
+
+    def ejecutar(
+        self, funcion: Callable[[], T], al_reintentar: Optional[Callable[[int, BaseException, float], None]] = None
+    ) -> T:
+        for intento in range(1, self.max_intentos + 1):
+            try:
+                return funcion()
+            except Exception as exc:
+                espera = self.decidir(intento, exc)
+                if al_reintentar:
+                    al_reintentar(intento, exc, espera)
+                self.dormir(espera)
+        raise RuntimeError("Política de reintentos sin intentos")
+
+    async def ejecutar_async(
+        self,
+        funcion: Callable[[], Awaitable[T]],
+        al_reintentar: Optional[Callable[[int, BaseException, float], None]] = None,
+    ) -> T:
+        for intento in range(1, self.max_intentos + 1):
+            try:
+                return await funcion()
+            except Exception as exc:
+                espera = self.decidir(intento, exc)
+                if al_reintentar:
+                    al_reintentar(intento, exc, espera)
+                await self.dormir_async(espera)
+        raise RuntimeError("Política de reintentos sin intentos")
+
+
+__all__ = [
+    "DIVIDIR",
+    "ErrorDividir",
+    "ErrorFatal",
+    "ErrorModelo",
+    "FATAL",
+    "PoliticaReintentos",
+    "REINTENTABLE",
+    "RespuestaTruncada",
+    "adjuntar_parciales",
+    "clasificar_error",
+    "comprobar_finalizacion",
+    "motivo_finalizacion",
+    "parciales_de",
+    "sugerencia_espera",
+]
@@ -0,0 +1,383 @@
+"""Tabla tipada de transacciones por banco.
+
+Las filas llegan como diccionarios de texto (del modelo, de la capa de texto,
+de los extractores de tablas o de la caché).  :func:`construir_tabla` las
+convierte en un ``DataFrame`` con tipos explícitos según el esquema del
+banco, sin pasar por un ``DataFrame`` intermedio de objetos:
+
+* ``fecha``: ``datetime64[ns]``.  Las fechas sin año ("05/01", "05 ENE")
+  toman el año de la fecha de corte del extracto; los meses posteriores al
+  del corte son del año anterior (las filas de diciembre de un extracto de
+  enero).
+* ``monto``: ``float64``, o centavos en ``Int64`` con ``centavos=True``.
+  Se interpretan con el :class:`~valores_monetarios.FormatoNumerico` del
+  banco y en un solo lote para todas las columnas.
+* ``categoria``: ``category`` para columnas con pocos valores distintos
+  (sucursal, tarjeta).
+* ``texto``: el resto, tal cual.
+
+Las fechas y montos que no se pudieron interpretar quedan vacíos y se listan
+en ``df.attrs["fechas_invalidas"]`` y ``df.attrs["montos_invalidos"]``; el
+texto de las fechas ilegibles se conserva en la columna ``<columna>_original``.
+"""
+
+from __future__ import annotations
+
+import calendar
+import datetime as dt
+import re
+from dataclasses import dataclass
+from operator import itemgetter
+from typing import Dict, List, Mapping, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from texto_nativo import normalizar_texto
+from valores_monetarios import PALABRAS_MONETARIAS, FormatoNumerico, interpretar_columnas
+
+
+FECHA = "fecha"
+MONTO = "monto"
+CATEGORIA = "categoria"
+TEXTO = "texto"
+
+ESQUEMAS_BANCO: Dict[str, Dict[str, str]] = {
+    "bancolombia": {
+        "fecha": FECHA,
+        "descripcion": TEXTO,
+        "sucursal": CATEGORIA,
+        "dcto": TEXTO,
+        "valor": MONTO,
+        "saldo": MONTO,
+    },
+    "nu": {
+        "fecha": FECHA,
+        "descripcion": TEXTO,
+        "valor": MONTO,
+        "cuotas": TEXTO,
+        "valor_del_mes": MONTO,
+        "interes_mes": MONTO,
+        "total_pagar": MONTO,
+        "restante": MONTO,
+    },
+    "rappi": {
+        "tarjeta": CATEGORIA,
+        "fecha": FECHA,
+        "descripcion": TEXTO,
+        "valor_transaccion": MONTO,
+        "capital_facturado": MONTO,
+        "cuotas": TEXTO,
+        "capital_pendiente": MONTO,
+        # Porcentajes ("2,5%"): se conservan como texto.
+        "tasa_mv": TEXTO,
+        "tasa_ea": TEXTO,
+    },
+}
+
+_CATEGORICAS = ("sucursal", "tarjeta")
+
+_MESES = {
+    "ENE": 1, "FEB": 2, "MAR": 3, "ABR": 4, "MAY": 5, "JUN": 6,
+    "JUL": 7, "AGO": 8, "SEP": 9, "SET": 9, "OCT": 10, "NOV": 11, "DIC": 12,
+}
+_PATRON_FECHA = re.compile(r"(\d{1,2})([/\-. ])(\d{1,2}|[A-Z]{3})(?:\2(\d{4}|\d{2}))?")
+_PATRON_FECHA_ISO = re.compile(r"(\d{4})-(\d{1,2})-(\d{1,2})")
+_PATRON_FECHA_COMPLETA = re.compile(
+    r"(\d{4})[/\-.](\d{1,2})[/\-.](\d{1,2})"
+    r"|(\d{1,2})[/\-.](\d{1,2})[/\-.](\d{4}|\d{2})(?!\d)"
+    r"|(\d{1,2})\s+(?:DE\s+)?([A-Z]{3,10})\.?\s+(?:DE\s+|DEL\s+)?(\d{4})"
+)
+# Etiqueta de la fecha de corte y cuántas fechas completas la siguen (se toma la última).
+_ETIQUETAS_CORTE = (
+    (re.compile(r"FECHA\s+(?:DE\s+)?CORTE|CORTE\s+(?:AL|A)\b"), 1),
+    (re.compile(r"\bHASTA\b"), 1),
+    (re.compile(r"PERIODO(?:\s+FACTURADO)?"), 2),
+)
+_VENTANA_CORTE = 80
+_PATRON_CUENTA = re.compile(
+    r"(?:(?:NUMERO|NRO|NO)\.?\s+DE\s+(?:LA\s+)?(?:CUENTA|TARJETA)"
+    r"|(?:CUENTA|TARJETA)(?:\s+(?:DE\s+AHORROS|DE\s+CREDITO|CORRIENTE|CREDITO))?"
+    r"(?:\s+(?:NUMERO|NRO\.?|NO\.?|#))?(?P<terminada>\s+TERMINADA\s+EN)?)"
+    r"\s*:?\s*(?P<numero>[*X\d][\d*X \-]*\d)\b"
+)
+
+
+def tipo_columna(banco: str, columna: str) -> str:
+    """Tipo de ``columna`` en el esquema del banco; las ajenas se deducen del nombre."""
+
+    tipo = ESQUEMAS_BANCO.get(banco, ESQUEMAS_BANCO["bancolombia"]).get(columna)
+    if tipo is not None:
+        return tipo
+    nombre = columna.lower()
+    if nombre.startswith("fecha"):
+        return FECHA
+    if nombre in _CATEGORICAS:
+        return CATEGORIA
+    if any(palabra in nombre for palabra in PALABRAS_MONETARIAS):
+        return MONTO
+    return TEXTO
+
+
+def _partes_fecha(valor: object) -> Optional[Tuple[Optional[int], int, int]]:
+    """``(año o None, mes, día)`` de una celda de fecha, sin validar el día."""
+
+    if not isinstance(valor, str):
+        return None
+    texto = normalizar_texto(valor)
+    iso = _PATRON_FECHA_ISO.fullmatch(texto)
+    if iso:
+        anio_texto, mes_texto, dia_texto = iso.groups()
+    else:
+        coincidencia = _PATRON_FECHA.fullmatch(texto)
+        if not coincidencia:
+            return None
+        dia_texto, _, mes_texto, anio_texto = coincidencia.groups()
+    mes = _MESES.get(mes_texto) if mes_texto.isalpha() else int(mes_texto)
+    if mes is None:
+        return None
+    if anio_texto is None:
+        return None, mes, int(dia_texto)
+    return int(anio_texto) + (2000 if len(anio_texto) == 2 else 0), mes, int(dia_texto)
+
+
+def interpretar_fecha(valor: object, anio: int, mes_corte: Optional[int] = None) -> Optional[dt.date]:
+    """Fecha de una celda o ``None``.
+
+    ``anio`` completa las fechas que no lo traen; con ``mes_corte`` los meses
+    posteriores al del corte toman el año anterior.
+    """
+
+    partes = _partes_fecha(valor)
+    if partes is None:
+        return None
+    anio_fecha, mes, dia = partes
+    if anio_fecha is None:
+        anio_fecha = anio - 1 if mes_corte is not None and mes > mes_corte else anio
+    try:
+        return dt.date(anio_fecha, mes, dia)
+    except ValueError:
+        return None
+
+
+def interpretar_fechas(
+    valores: Sequence[object], anio: int, mes_corte: Optional[int] = None
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Columna ``datetime64[ns]`` y máscara de celdas no vacías que no son fechas.
+
+    Un extracto repite pocas fechas distintas, así que cada texto distinto se
+    interpreta una sola vez.
+    """
+
+    codigos, unicos = pd.factorize(np.asarray(valores, dtype=object), use_na_sentinel=True)
+    fechas = [interpretar_fecha(valor, anio, mes_corte) for valor in unicos]
+    invalidas = [fecha is None and isinstance(valor, str) and bool(valor.strip()) for valor, fecha in zip(unicos, fechas)]
+    # El código -1 (valor faltante) apunta al NaT agregado al final.
+    tabla = np.array(fechas + [None], dtype="datetime64[ns]")
+    return tabla[codigos], np.array(invalidas + [False], dtype=bool)[codigos]
+
+
+def corte_por_fechas(valores: Sequence[object]) -> Optional[dt.date]:
+    """La fecha más reciente entre las que traen año, o ``None`` si ninguna lo trae."""
+
+    fechas = []
+    for valor in pd.unique(np.asarray(valores, dtype=object)):
+        partes = _partes_fecha(valor)
+        if partes is not None and partes[0] is not None:
+            try:
+                fechas.append(dt.date(*partes))
+            except ValueError:
+                continue
+    return max(fechas) if fechas else None
+
+
+def _fecha_completa(coincidencia: "re.Match[str]") -> Optional[dt.date]:
+    grupos = coincidencia.groups()
+    try:
+        if grupos[0]:
+            return dt.date(int(grupos[0]), int(grupos[1]), int(grupos[2]))
+        if grupos[3]:
+            anio = int(grupos[5]) + (2000 if len(grupos[5]) == 2 else 0)
+            return dt.date(anio, int(grupos[4]), int(grupos[3]))
+        mes = _MESES.get(grupos[7][:3])
+        return dt.date(int(grupos[8]), mes, int(grupos[6])) if mes else None
+    except ValueError:
+        return None
+
+
+def buscar_fecha_corte(texto: str) -> Optional[dt.date]:
+    """Fecha de corte en el texto del extracto ("Fecha de corte", "hasta", "Periodo … al …")."""
+
+    normalizado = normalizar_texto(texto)
+    for etiqueta, maximo in _ETIQUETAS_CORTE:
+        for encontrada in etiqueta.finditer(normalizado):
+            ventana = normalizado[encontrada.end() : encontrada.end() + _VENTANA_CORTE]
+            fechas = [fecha for fecha in map(_fecha_completa, _PATRON_FECHA_COMPLETA.finditer(ventana)) if fecha]
+            if fechas:
+                return fechas[: maximo][-1]
+    return None
+
+
+def buscar_numero_cuenta(texto: str) -> Optional[str]:
+    """Últimos cuatro dígitos de la cuenta o tarjeta impresa en el extracto.
+
+    Solo se toman los últimos dígitos porque unos extractos imprimen el número
+    completo y otros enmascarado ("**** 1234").  Un número corto sin máscara
+    ni "terminada en" no cuenta ("Estado de cuenta 2024").
+    """
+
+    for encontrada in _PATRON_CUENTA.finditer(normalizar_texto(texto)):
+        numero = encontrada.group("numero")
+        digitos = re.sub(r"\D", "", numero)
+        enmascarado = encontrada.group("terminada") or "*" in numero or "X" in numero
+        if len(digitos) >= 6 or (len(digitos) >= 4 and enmascarado):
+            return digitos[-4:]
+    return None
+
+
+@dataclass(frozen=True)
+class EncabezadoExtracto:
+    """Lo que se lee del encabezado del extracto, además de sus movimientos."""
+
+    fecha_corte: Optional[dt.date] = None
+    cuenta: Optional[str] = None
+
+
+def leer_encabezado(texto: str) -> EncabezadoExtracto:
+    return EncabezadoExtracto(buscar_fecha_corte(texto), buscar_numero_cuenta(texto))
+
+
+def encabezado_a_json(encabezado: EncabezadoExtracto) -> Dict[str, Optional[str]]:
+    fecha = encabezado.fecha_corte
+    return {"fecha_corte": fecha.isoformat() if fecha else None, "cuenta": encabezado.cuenta}
+
+
+def encabezado_desde_json(datos: Mapping[str, Optional[str]]) -> EncabezadoExtracto:
+    """Inversa de :func:`encabezado_a_json`; lanza ``ValueError`` si la fecha no es válida."""
+
+    fecha = datos.get("fecha_corte")
+    return EncabezadoExtracto(dt.date.fromisoformat(fecha) if fecha else None, datos.get("cuenta"))
+
+
+def fin_de_mes(anio: int, mes: int) -> dt.date:
+    return dt.date(anio, mes, calendar.monthrange(anio, mes)[1])
+
+
+def corte_por_nombre(nombre: str) -> Optional[dt.date]:
+    """Último día del periodo que indica un nombre de archivo ("nu_2024_01", "rappi marzo 2024").
+
+    Sin mes se toma el 31 de diciembre del año; sin año no hay corte.
+    """
+
+    partes = [parte for parte in re.split(r"[^0-9A-Z]+", normalizar_texto(nombre)) if parte]
+    anios = [posicion for posicion, parte in enumerate(partes) if re.fullmatch(r"20\d{2}", parte)]
+    if not anios:
+        return None
+    posicion = anios[0]
+    anio = int(partes[posicion])
+    for vecina in (posicion + 1, posicion - 1):
+        if 0 <= vecina < len(partes) and partes[vecina].isdigit() and 1 <= int(partes[vecina]) <= 12:
+            return fin_de_mes(anio, int(partes[vecina]))
+    for parte in partes:
+        if parte.isalpha() and len(parte) >= 3 and parte[:3] in _MESES:
+            return fin_de_mes(anio, _MESES[parte[:3]])
+    return dt.date(anio, 12, 31)
+
+
+def _categorias(valores: Sequence[object]) -> pd.Categorical:
+    codigos, unicos = pd.factorize(np.asarray(valores, dtype=object), use_na_sentinel=True)
+    vacios = [posicion for posicion, valor in enumerate(unicos) if valor == ""]
+    if vacios:
+        codigos = np.where(codigos == vacios[0], -1, codigos)
+        codigos = codigos - (codigos > vacios[0])
+        unicos = np.delete(unicos, vacios[0])
+    return pd.Categorical.from_codes(codigos, categories=pd.Index(unicos, dtype=object))
+
+
+def construir_tabla(
+    columnas: Mapping[str, Sequence[object]],
+    banco: str,
+    formato: Optional[FormatoNumerico] = None,
+    anio: Optional[int] = None,
+    centavos: bool = False,
+    corte: Optional[dt.date] = None,
+) -> pd.DataFrame:
+    """``DataFrame`` tipado a partir de columnas de texto de igual longitud.
+
+    ``corte`` (la fecha de corte del extracto) fija el año de las fechas que no
+    lo traen y devuelve al año anterior los meses posteriores al del corte;
+    sin ella se usa ``anio`` sin correcciones.
+    """
+
+    formato = formato or FormatoNumerico()
+    anio = corte.year if corte else anio or dt.date.today().year
+    mes_corte = corte.month if corte else None
+    tipos = {columna: tipo_columna(banco, columna) for columna in columnas}
+
+    montos, montos_invalidos = interpretar_columnas(
+        {columna: valores for columna, valores in columnas.items() if tipos[columna] == MONTO}, formato
+    )
+    datos: Dict[str, object] = {}
+    orden: List[str] = []
+    fechas_invalidas: List[int] = []
+    for columna, valores in columnas.items():
+        tipo = tipos[columna]
+        orden.append(columna)
+        if tipo == MONTO:
+            numeros = montos[columna]
+            datos[columna] = pd.array(np.round(numeros * 100), dtype="Int64") if centavos else numeros
+        elif tipo == FECHA:
+            fechas, invalidas = interpretar_fechas(valores, anio, mes_corte)
+            datos[columna] = fechas
+            if invalidas.any():
+                fechas_invalidas.extend((np.flatnonzero(invalidas) + 1).tolist())
+                # El texto ilegible queda a la vista junto a la fecha vacía.
+                original = np.where(invalidas, np.asarray(valores, dtype=object), None)
+                datos[f"{columna}_original"] = original
+                orden.append(f"{columna}_original")
+        elif tipo == CATEGORIA:
+            datos[columna] = _categorias(valores)
+        else:
+            datos[columna] = valores
+
+    df = pd.DataFrame(datos, columns=orden)
+    df.attrs["montos_invalidos"] = montos_invalidos
+    df.attrs["fechas_invalidas"] = sorted(set(fechas_invalidas))
+    return df
+
+
+def tabla_desde_registros(registros: Sequence[Mapping[str, object]], banco: str, **opciones: object) -> pd.DataFrame:
+    """Atajo de :func:`construir_tabla` para una lista de transacciones."""
+
+    # Casi siempre todas las filas traen las mismas claves: se recorren las
+    # formas distintas y no cada fila.
+    formas = dict.fromkeys(map(tuple, registros))
+    claves = list(dict.fromkeys(clave for forma in formas for clave in forma))
+    if len(formas) == 1:
+        columnas = {clave: list(map(itemgetter(clave), registros)) for clave in claves}
+    else:
+        columnas = {clave: [registro.get(clave, "") for registro in registros] for clave in claves}
+    return construir_tabla(columnas, banco, **opciones)  # type: ignore[arg-type]
+
+
+__all__ = [
+    "CATEGORIA",
+    "ESQUEMAS_BANCO",
+    "EncabezadoExtracto",
+    "FECHA",
+    "MONTO",
+    "TEXTO",
+    "buscar_fecha_corte",
+    "buscar_numero_cuenta",
+    "construir_tabla",
+    "corte_por_fechas",
+    "corte_por_nombre",
+    "encabezado_a_json",
+    "encabezado_desde_json",
+    "fin_de_mes",
+    "interpretar_fecha",
+    "interpretar_fechas",
+    "leer_encabezado",
+    "tabla_desde_registros",
+    "tipo_columna",
+]
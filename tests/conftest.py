@@ -0,0 +1,64 @@
+"""Configuración común de las pruebas: los módulos viven en la raíz del repositorio."""
+
+import hashlib
+import json
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import fitz  # noqa: E402  PyMuPDF
+
+from modelo_simulado import ModeloSimulado  # noqa: E402
+
+
+def respuesta_por_contenido(contenido):
+    """Respuesta del modelo simulado que depende de las páginas enviadas.
+
+    Así cada documento (y cada página) produce filas distintas y se puede
+    comprobar que las hojas no se mezclan entre documentos.
+    """
+
+    paginas = [parte for parte in contenido if isinstance(parte, dict)]
+    filas = []
+    for pagina in paginas:
+        codigo = hashlib.sha1(bytes(pagina["data"])).hexdigest()[:10]
+        filas.append(
+            {
+                "fecha": "15/01",
+                "descripcion": f"COMPRA {codigo}",
+                "sucursal": "",
+                "dcto": "",
+                "valor": "-1.000,00",
+                "saldo": "5.000,00",
+            }
+        )
+    return json.dumps({"transacciones": filas})
+
+
+@pytest.fixture
+def modelo():
+    return ModeloSimulado(respuesta=respuesta_por_contenido, latencia=0.0)
+
+
+def crear_extracto(ruta, paginas=2, marca=""):
+    """PDF sin capa de tabla reconocible: la extracción pasa por el modelo."""
+
+    documento = fitz.open()
+    for numero in range(paginas):
+        pagina = documento.new_page()
+        pagina.insert_text((40, 60), f"EXTRACTO {marca} PAGINA {numero + 1}", fontsize=11)
+    documento.save(ruta)
+    documento.close()
+    return ruta
+
+
+@pytest.fixture
+def carpeta_extractos(tmp_path):
+    carpeta = tmp_path / "extractos"
+    carpeta.mkdir()
+    for numero, paginas in enumerate((2, 1, 3, 2)):
+        crear_extracto(carpeta / f"bancolombia_{numero}.pdf", paginas, marca=str(numero))
+    return carpeta
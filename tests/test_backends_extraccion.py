@@ -0,0 +1,109 @@
+from pathlib import Path
+
+import fitz
+import pytest
+
+import backends_extraccion
+from backends_extraccion import BackendGemini, BackendTablas, BackendTextoNativo, EntradaExtraccion
+from valores_monetarios import FormatoNumerico
+
+
+ENCABEZADO = ["FECHA", "DESCRIPCION", "SUCURSAL", "VALOR", "SALDO"]
+FILAS = [
+    ["01/02", "SALDO ANTERIOR", "", "0,00", "100.000,00"],
+    ["02/02", "COMPRA EXITO", "MEDELLIN", "-25.500,50", "74.499,50"],
+    ["03/02", "ABONO NOMINA", "", "1.000.000,00", "1.074.499,50"],
+]
+ANCHOS = [60, 140, 90, 100, 100]
+
+
+def tabla_dibujada(filas, encabezado=ENCABEZADO):
+    """PDF con una tabla de celdas con borde, como la de los extractos."""
+
+    documento = fitz.open()
+    pagina = documento.new_page()
+    y = 60
+    for fila in [encabezado, *filas]:
+        x = 30
+        for ancho, celda in zip(ANCHOS, fila):
+            pagina.draw_rect(fitz.Rect(x, y, x + ancho, y + 18), color=(0, 0, 0), width=0.5)
+            pagina.insert_text((x + 3, y + 13), celda, fontsize=8)
+            x += ancho
+        y += 18
+    return documento.tobytes()
+
+
+def entrada(contenido=None, banco="bancolombia", **opciones):
+    return EntradaExtraccion(
+        pdf_path=Path("extracto.pdf"),
+        banco=banco,
+        password="",
+        estrategia="directo",
+        contenido=(lambda: contenido) if contenido is not None else None,
+        **opciones,
+    )
+
+
+def test_tablas_pdfplumber_mapea_los_encabezados():
+    resultado = BackendTablas().extraer(entrada(tabla_dibujada(FILAS)))
+
+    assert resultado.aceptado, resultado.motivo
+    assert list(resultado.df["descripcion"]) == ["SALDO ANTERIOR", "COMPRA EXITO", "ABONO NOMINA"]
+    assert list(resultado.df["sucursal"]) == ["", "MEDELLIN", ""]
+    assert list(resultado.df["dcto"]) == ["", "", ""]
+
+
+def test_tablas_rechaza_saldos_que_no_cuadran():
+    filas = [list(fila) for fila in FILAS]
+    filas[2][4] = "1.074.000,00"
+
+    resultado = BackendTablas().extraer(entrada(tabla_dibujada(filas)))
+
+    assert not resultado.aceptado
+    assert resultado.motivo == "saldo inconsistente en la fila 3"
+
+
+def test_tablas_usa_el_formato_de_la_entrada():
+    contenido = tabla_dibujada([["01/02", "SALDO ANTERIOR", "", "0", "10"], ["02/02", "COMPRA", "", "1,234", "1244"]])
+    miles_con_coma = FormatoNumerico(decimal=".", miles=",")
+
+    # Con el formato de Bancolombia "1,234" es 1,234 pesos: los saldos no cuadran.
+    assert BackendTablas().extraer(entrada(contenido)).motivo == "saldo inconsistente en la fila 2"
+    assert BackendTablas().extraer(entrada(contenido, formato=miles_con_coma)).aceptado
+
+
+def test_tablas_sin_tabla():
+    documento = fitz.open()
+    documento.new_page().insert_text((40, 80), "Sin movimientos este mes", fontsize=9)
+
+    resultado = BackendTablas().extraer(entrada(documento.tobytes()))
+
+    assert resultado.motivo == "no se encontró la tabla de movimientos"
+
+
+def test_tablas_banco_sin_perfil():
+    resultado = BackendTablas().extraer(entrada(tabla_dibujada(FILAS), banco="desconocido"))
+
+    assert resultado.motivo == "sin perfil de columnas para desconocido"
+
+
+def test_tablas_motor_desconocido():
+    resultado = BackendTablas(motor="ocr").extraer(entrada(tabla_dibujada(FILAS)))
+
+    assert resultado.motivo == "motor de tablas desconocido: ocr"
+
+
+@pytest.mark.parametrize("motor, disponible", [("camelot", "CAMELOT_AVAILABLE"), ("tabula", "TABULA_AVAILABLE")])
+def test_tablas_motor_no_instalado(monkeypatch, motor, disponible):
+    monkeypatch.setattr(backends_extraccion, disponible, False)
+
+    with pytest.raises(RuntimeError, match=f"{motor} no está instalado"):
+        BackendTablas(motor=motor).extraer(entrada(tabla_dibujada(FILAS)))
+
+
+def test_texto_nativo_sin_documento():
+    assert BackendTextoNativo().extraer(entrada()).motivo == "documento no disponible"
+
+
+def test_gemini_sin_paginas():
+    assert BackendGemini(procesador=None).extraer(entrada()).motivo == "páginas no disponibles"
@@ -0,0 +1,42 @@
+import pickle
+
+from cache_resultados import CacheResultados
+from procesador_gemini import ProcesadorGemini
+
+
+def test_guardar_y_obtener(tmp_path):
+    cache = CacheResultados(tmp_path)
+
+    cache.guardar("ab" * 32, {"transacciones": [{"valor": "1"}]})
+
+    assert cache.obtener("ab" * 32) == {"transacciones": [{"valor": "1"}]}
+    assert cache.obtener("cd" * 32) is None
+    assert cache.tamano_total() > 0
+
+
+def test_la_cache_se_puede_enviar_a_otro_proceso(tmp_path):
+    cache = CacheResultados(tmp_path)
+    cache.guardar("ab" * 32, [1, 2])
+
+    copia = pickle.loads(pickle.dumps(cache))
+
+    assert copia.obtener("ab" * 32) == [1, 2]
+    copia.guardar("cd" * 32, [3])
+    assert copia.tamano_total() == cache.tamano_total() + len(b"[3]")
+
+
+def test_procesador_con_valores_por_defecto_se_puede_enviar_a_otro_proceso(tmp_path):
+    # usar_cache=True y usar_procesos=True: el procesador viaja al pool de preparación.
+    procesador = ProcesadorGemini(
+        api_key="simulada",
+        password="",
+        carpeta=str(tmp_path),
+        max_workers=2,
+        directorio_cache=str(tmp_path / "cache"),
+    )
+    assert procesador.usar_cache and procesador.usar_procesos
+
+    copia = pickle.loads(pickle.dumps(procesador))
+
+    copia._cache.guardar("ab" * 32, {"ok": True})
+    assert procesador._cache.obtener("ab" * 32) == {"ok": True}
@@ -0,0 +1,151 @@
+import fitz
+import pytest
+
+from conftest import respuesta_por_contenido
+from modelo_simulado import ModeloSimulado
+from procesador_gemini import ProcesadorGemini
+
+
+CLAVE = "1234"
+
+
+def guardar(ruta, clave=None):
+    documento = fitz.open()
+    documento.new_page().insert_text((40, 60), "EXTRACTO PROTEGIDO", fontsize=11)
+    if clave:
+        documento.save(ruta, encryption=fitz.PDF_ENCRYPT_AES_256, user_pw=clave, owner_pw=clave + "-propietario")
+    else:
+        documento.save(ruta)
+    documento.close()
+    return ruta
+
+
+def procesador(carpeta, **opciones):
+    opciones.setdefault("usar_cache", False)
+    return ProcesadorGemini(
+        api_key="simulada", password=CLAVE, carpeta=str(carpeta), log_callback=lambda _: None, **opciones
+    )
+
+
+def texto(desbloqueado):
+    return desbloqueado.documento[0].get_text()
+
+
+def test_descifrado_en_memoria_no_escribe_el_contenido_en_claro(tmp_path):
+    pdf = guardar(tmp_path / "bancolombia.pdf", CLAVE)
+
+    desbloqueado = procesador(tmp_path, estrategias_desbloqueo=("pikepdf",)).desbloquear_documento(pdf)
+
+    assert desbloqueado.estrategia == "pikepdf"
+    assert desbloqueado.temporal is None
+    assert sorted(ruta.name for ruta in tmp_path.iterdir()) == ["bancolombia.pdf"]
+    assert "EXTRACTO PROTEGIDO" in texto(desbloqueado)
+    # El contenido descifrado abre sin contraseña.
+    assert not fitz.open(stream=desbloqueado.contenido_descifrado(), filetype="pdf").needs_pass
+    desbloqueado.cerrar()
+
+
+def test_descifrado_a_disco_borra_el_temporal_al_cerrar(tmp_path):
+    pdf = guardar(tmp_path / "bancolombia.pdf", CLAVE)
+
+    desbloqueado = procesador(
+        tmp_path, estrategias_desbloqueo=("pikepdf",), descifrado_en_memoria=False
+    ).desbloquear_documento(pdf)
+
+    assert desbloqueado.temporal == tmp_path / "bancolombia.temp.pdf"
+    assert desbloqueado.temporal.exists()
+    desbloqueado.cerrar()
+    assert not (tmp_path / "bancolombia.temp.pdf").exists()
+
+
+def test_procesar_un_pdf_cifrado_no_deja_copia_descifrada(tmp_path, monkeypatch):
+    guardar(tmp_path / "bancolombia.pdf", CLAVE)
+    extractor = procesador(
+        tmp_path,
+        estrategias_desbloqueo=("pikepdf",),
+        cliente_modelo=ModeloSimulado(respuesta=respuesta_por_contenido, latencia=0.0),
+        directorio_cache=str(tmp_path.parent / "cache"),
+        usar_cache=True,
+    )
+
+    def sin_disco(pdf_path):
+        raise AssertionError("no debe escribirse un .temp.pdf")
+
+    monkeypatch.setattr(extractor, "desbloquear_pdf", sin_disco)
+
+    assert extractor.procesar() is not None
+    assert list(extractor.estadisticas_desbloqueo["bancolombia"]) == ["pikepdf"]
+    assert not list(tmp_path.glob("*.temp.pdf"))
+
+
+# ----------------------------------------------------------------------
+# Orden de estrategias: directo, fitz, pikepdf
+# ----------------------------------------------------------------------
+@pytest.fixture
+def sin_pikepdf(monkeypatch):
+    """Falla la prueba si se llega a descifrar con pikepdf."""
+
+    def prohibido(self, pdf_path):
+        raise AssertionError("pikepdf no debía usarse")
+
+    monkeypatch.setattr(ProcesadorGemini, "desbloquear_pdf_en_memoria", prohibido)
+    monkeypatch.setattr(ProcesadorGemini, "desbloquear_pdf", prohibido)
+
+
+def test_pdf_sin_contrasena_se_abre_directo(tmp_path, sin_pikepdf):
+    pdf = guardar(tmp_path / "bancolombia.pdf")
+
+    desbloqueado = procesador(tmp_path).desbloquear_documento(pdf)
+
+    assert desbloqueado.estrategia == "directo"
+    assert desbloqueado.contenido_descifrado() == pdf.read_bytes()
+    desbloqueado.cerrar()
+
+
+def test_pymupdf_autentica_sin_pikepdf(tmp_path, sin_pikepdf):
+    pdf = guardar(tmp_path / "bancolombia.pdf", CLAVE)
+
+    desbloqueado = procesador(tmp_path).desbloquear_documento(pdf)
+
+    assert desbloqueado.estrategia == "fitz"
+    assert "EXTRACTO PROTEGIDO" in texto(desbloqueado)
+    assert not fitz.open(stream=desbloqueado.contenido_descifrado(), filetype="pdf").needs_pass
+    desbloqueado.cerrar()
+
+
+def test_pikepdf_es_el_ultimo_recurso(tmp_path):
+    pdf = guardar(tmp_path / "bancolombia.pdf", CLAVE)
+
+    # Sin la estrategia fitz, el PDF cifrado no se abre "directo" y pasa a pikepdf.
+    desbloqueado = procesador(tmp_path, estrategias_desbloqueo=("directo", "pikepdf")).desbloquear_documento(pdf)
+
+    assert desbloqueado.estrategia == "pikepdf"
+    desbloqueado.cerrar()
+
+
+def test_contrasena_incorrecta_agota_las_estrategias(tmp_path):
+    pdf = guardar(tmp_path / "bancolombia.pdf", "otra")
+
+    assert procesador(tmp_path).desbloquear_documento(pdf) is None
+
+
+def test_con_fitz_la_cache_no_reserializa_el_documento(tmp_path, sin_pikepdf, monkeypatch):
+    guardar(tmp_path / "bancolombia.pdf", CLAVE)
+    modelo = ModeloSimulado(respuesta=respuesta_por_contenido, latencia=0.0)
+
+    def sin_reserializar(self, *args, **kwargs):
+        raise AssertionError("la huella no debe exigir tobytes()")
+
+    monkeypatch.setattr(fitz.Document, "tobytes", sin_reserializar)
+    for _ in range(2):
+        extractor = procesador(
+            tmp_path,
+            backends=("gemini",),
+            cliente_modelo=modelo,
+            directorio_cache=str(tmp_path / "cache"),
+            usar_cache=True,
+        )
+        assert extractor.procesar() is not None
+
+    # La segunda ejecución sale de la caché con la huella del archivo cifrado.
+    assert modelo.solicitudes == 1
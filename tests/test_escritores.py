@@ -0,0 +1,267 @@
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+import pytest
+from openpyxl import load_workbook
+from openpyxl.worksheet._writer import ALL_TEMP_FILES
+
+import escritores
+from escritores import EscritorExcel, escribir_atomico, nombres_hojas
+
+
+def movimientos():
+    return pd.DataFrame(
+        {
+            "fecha": pd.to_datetime(["2024-01-15", None, "2024-02-01"]),
+            "descripcion": ["=SUMA(A1:A2)", "ABONO NOMINA", None],
+            "valor": [-10.5, 1500.25, np.nan],
+            "centavos": pd.array([-1050, 150025, None], dtype="Int64"),
+        }
+    )
+
+
+def celdas(ruta, hoja):
+    return list(load_workbook(ruta)[hoja].iter_rows(min_row=2))
+
+
+# ----------------------------------------------------------------------
+# Excel
+# ----------------------------------------------------------------------
+@pytest.mark.parametrize("motor", EscritorExcel.motores)
+def test_excel_escribe_celdas_tipadas(tmp_path, motor):
+    if motor == "xlsxwriter":
+        pytest.importorskip("xlsxwriter")
+
+    ruta = EscritorExcel(motor=motor).escribir({"bancolombia_enero": movimientos()}, tmp_path)
+
+    filas = celdas(ruta, "bancolombia_enero")
+    assert [celda.value for celda in filas[0]] == [datetime(2024, 1, 15), "=SUMA(A1:A2)", -10.5, -1050]
+    assert [celda.value for celda in filas[1]] == [None, "ABONO NOMINA", 1500.25, 150025]
+    assert [celda.value for celda in filas[2]] == [datetime(2024, 2, 1), None, None, None]
+    fecha, _, valor, centavos = filas[0]
+    assert (fecha.number_format, valor.number_format, centavos.number_format) == ("DD/MM/YYYY", "#,##0.00", "#,##0")
+
+
+@pytest.mark.parametrize("motor", EscritorExcel.motores)
+def test_excel_no_convierte_texto_en_formula(tmp_path, motor):
+    if motor == "xlsxwriter":
+        pytest.importorskip("xlsxwriter")
+
+    ruta = EscritorExcel(motor=motor).escribir({"hoja": movimientos()}, tmp_path)
+
+    celda = celdas(ruta, "hoja")[0][1]
+    assert celda.data_type == "s"
+    assert celda.value == "=SUMA(A1:A2)"
+
+
+def test_excel_bloques_pequenos_dan_las_mismas_filas(tmp_path):
+    df = pd.DataFrame({"valor": np.arange(25, dtype=np.float64)})
+
+    ruta = EscritorExcel(filas_por_bloque=4, motor="openpyxl").escribir({"hoja": df}, tmp_path)
+
+    assert [fila[0].value for fila in celdas(ruta, "hoja")] == list(range(25))
+
+
+def test_motor_desconocido():
+    with pytest.raises(ValueError):
+        EscritorExcel(motor="xlwt")
+
+
+def test_nombres_de_hoja_recortados_y_unicos():
+    largo = "bancolombia_extracto_de_ahorros_enero"
+
+    nombres = nombres_hojas([largo, largo + "_bis", "nu:2024/01", "Hoja", "hoja", ""])
+
+    assert nombres[0] == largo[:31]
+    assert nombres[1] == largo[:29] + "_2"
+    assert nombres[2] == "nu_2024_01"
+    assert nombres[3:] == ["Hoja", "hoja_2", "Hoja_3"]
+    assert all(len(nombre) <= 31 for nombre in nombres)
+
+
+def test_dos_hojas_con_el_mismo_prefijo_no_se_pisan(tmp_path):
+    largo = "x" * 40
+    ruta = EscritorExcel(motor="openpyxl").escribir({largo + "a": movimientos(), largo + "b": movimientos()}, tmp_path)
+
+    assert load_workbook(ruta).sheetnames == ["x" * 31, "x" * 29 + "_2"]
+
+
+# ----------------------------------------------------------------------
+# Escritura atómica
+# ----------------------------------------------------------------------
+def test_escribir_atomico_conserva_el_archivo_anterior_si_falla(tmp_path):
+    destino = tmp_path / "salida.txt"
+    destino.write_text("anterior")
+
+    def fallar(ruta):
+        ruta.write_text("a medias")
+        raise RuntimeError("disco lleno")
+
+    with pytest.raises(RuntimeError):
+        escribir_atomico(destino, fallar)
+
+    assert destino.read_text() == "anterior"
+    assert [ruta.name for ruta in tmp_path.iterdir()] == ["salida.txt"]
+
+
+# Una hoja *write-only* abandonada se cierra al recolectarse y avisa como excepción no lanzable.
+@pytest.mark.filterwarnings("error::pytest.PytestUnraisableExceptionWarning")
+@pytest.mark.parametrize("motor", EscritorExcel.motores)
+def test_excel_fallido_a_mitad_deja_el_libro_anterior(tmp_path, monkeypatch, motor):
+    if motor == "xlsxwriter":
+        pytest.importorskip("xlsxwriter")
+    escritor = EscritorExcel(motor=motor)
+    ruta = escritor.escribir({"anterior": movimientos()}, tmp_path)
+    original = escritores.EscritorExcel._filas
+
+    def filas_que_fallan(self, df, columnas):
+        yield next(original(self, df, columnas))
+        raise RuntimeError("fallo a mitad del libro")
+
+    monkeypatch.setattr(escritores.EscritorExcel, "_filas", filas_que_fallan)
+    temporales = list(ALL_TEMP_FILES)
+    with pytest.raises(RuntimeError):
+        escritor.escribir({"nueva": movimientos()}, tmp_path)
+
+    assert load_workbook(ruta).sheetnames == ["anterior"]
+    assert [ruta.name for ruta in tmp_path.iterdir()] == [escritores.NOMBRE_EXCEL]
+    # Los temporales de openpyxl tienen los movimientos en claro: no deben quedar.
+    assert ALL_TEMP_FILES == temporales
+
+
+# ----------------------------------------------------------------------
+# Tabla unificada, CSV y Parquet
+# ----------------------------------------------------------------------
+def hojas_de_varios_bancos():
+    bancolombia = movimientos().drop(columns="centavos")
+    bancolombia.attrs.update(origen="bancolombia_enero.pdf", banco="bancolombia", cuenta="bancolombia-1234")
+    nu = pd.DataFrame(
+        {
+            "fecha": pd.to_datetime(["2024-01-20", "2024-03-02"]),
+            "descripcion": ["TIENDA", "CINE"],
+            "valor": [300.0, 20.0],
+            "cuotas": ["1/3", "1/1"],
+        }
+    )
+    nu.attrs.update(origen="nu_marzo.pdf", banco="nu", cuenta="nu-99")
+    return {"bancolombia_enero": bancolombia, "nu_marzo": nu}
+
+
+def test_tabla_unificada_agrega_el_origen_de_cada_fila():
+    tabla = escritores.tabla_unificada(hojas_de_varios_bancos())
+
+    assert tabla.columns.tolist() == ["archivo", "banco", "cuenta", "fecha", "descripcion", "valor", "cuotas"]
+    assert tabla["archivo"].tolist() == ["bancolombia_enero.pdf"] * 3 + ["nu_marzo.pdf"] * 2
+    assert tabla["cuenta"].tolist() == ["bancolombia-1234"] * 3 + ["nu-99"] * 2
+    assert all(isinstance(tabla[columna].dtype, pd.CategoricalDtype) for columna in escritores.COLUMNAS_ORIGEN)
+    assert tabla["cuotas"].isna().tolist() == [True, True, True, False, False]
+
+
+def test_csv_con_origen_y_fechas_iso(tmp_path):
+    ruta = escritores.EscritorCSV().escribir(hojas_de_varios_bancos(), tmp_path)
+
+    csv = pd.read_csv(ruta, keep_default_na=False)
+    assert ruta.name == escritores.NOMBRE_CSV
+    assert csv.columns.tolist()[:3] == list(escritores.COLUMNAS_ORIGEN)
+    assert csv["fecha"].tolist() == ["2024-01-15", "", "2024-02-01", "2024-01-20", "2024-03-02"]
+    assert csv["banco"].tolist() == ["bancolombia"] * 3 + ["nu"] * 2
+
+
+def test_csv_fallido_deja_el_anterior(tmp_path, monkeypatch):
+    ruta = escritores.EscritorCSV().escribir(hojas_de_varios_bancos(), tmp_path)
+    anterior = ruta.read_bytes()
+
+    def fallar(self, ruta, **opciones):
+        ruta.write_text("archivo,banco\n")
+        raise OSError("disco lleno")
+
+    monkeypatch.setattr(pd.DataFrame, "to_csv", fallar)
+    with pytest.raises(OSError):
+        escritores.EscritorCSV().escribir({"otra": movimientos()}, tmp_path)
+
+    assert ruta.read_bytes() == anterior
+    assert [archivo.name for archivo in tmp_path.iterdir()] == [escritores.NOMBRE_CSV]
+
+
+def test_particiones_por_banco_y_mes():
+    tabla = escritores.tabla_unificada(hojas_de_varios_bancos())
+
+    rutas = {ruta: len(grupo) for ruta, grupo in escritores.particiones(tabla)}
+
+    assert rutas == {
+        "banco=bancolombia/mes=2024-01": 1,
+        "banco=bancolombia/mes=2024-02": 1,
+        "banco=bancolombia/mes=__HIVE_DEFAULT_PARTITION__": 1,
+        "banco=nu/mes=2024-01": 1,
+        "banco=nu/mes=2024-03": 1,
+    }
+
+
+def test_parquet_particionado_se_lee_por_mes(tmp_path):
+    pytest.importorskip("pyarrow")
+
+    raiz = escritores.EscritorParquet().escribir(hojas_de_varios_bancos(), tmp_path)
+
+    assert sorted(str(ruta.relative_to(raiz)) for ruta in raiz.rglob("*.parquet")) == [
+        "banco=bancolombia/mes=2024-01/part-0.parquet",
+        "banco=bancolombia/mes=2024-02/part-0.parquet",
+        "banco=bancolombia/mes=__HIVE_DEFAULT_PARTITION__/part-0.parquet",
+        "banco=nu/mes=2024-01/part-0.parquet",
+        "banco=nu/mes=2024-03/part-0.parquet",
+    ]
+    enero = pd.read_parquet(raiz, filters=[("mes", "==", "2024-01")])
+    assert sorted(enero["descripcion"].tolist()) == ["=SUMA(A1:A2)", "TIENDA"]
+    assert sorted(enero["archivo"].astype(str).tolist()) == ["bancolombia_enero.pdf", "nu_marzo.pdf"]
+    assert sorted(enero["banco"].astype(str).tolist()) == ["bancolombia", "nu"]
+    # La columna ausente en un banco conserva su tipo en todas las particiones.
+    assert enero["cuotas"].dropna().tolist() == ["1/3"]
+    pd.testing.assert_frame_equal(
+        escritores.leer_parquet(raiz, filtros=[("mes", "==", "2024-01")])[enero.columns].astype(str),
+        enero.astype(str),
+    )
+
+
+def test_parquet_filas_sin_fecha_en_la_particion_por_defecto(tmp_path):
+    pytest.importorskip("pyarrow")
+
+    raiz = escritores.EscritorParquet().escribir(hojas_de_varios_bancos(), tmp_path)
+
+    todas = escritores.leer_parquet(raiz)
+    sin_fecha = todas[todas["fecha"].isna()]
+    assert sin_fecha["descripcion"].tolist() == ["ABONO NOMINA"]
+    assert sin_fecha["mes"].isna().all()
+    assert len(todas) == 5
+
+
+def test_parquet_fallido_deja_el_dataset_anterior(tmp_path, monkeypatch):
+    pytest.importorskip("pyarrow")
+    raiz = escritores.EscritorParquet().escribir(hojas_de_varios_bancos(), tmp_path)
+    anteriores = sorted(ruta.relative_to(raiz) for ruta in raiz.rglob("*.parquet"))
+    original = escritores.pq.write_table
+    escritas = []
+
+    def fallar_en_la_segunda(tabla, destino, **opciones):
+        escritas.append(destino)
+        if len(escritas) == 2:
+            raise OSError("disco lleno")
+        original(tabla, destino, **opciones)
+
+    monkeypatch.setattr(escritores.pq, "write_table", fallar_en_la_segunda)
+    with pytest.raises(OSError):
+        escritores.EscritorParquet().escribir({"otra": movimientos()}, tmp_path)
+
+    assert sorted(ruta.relative_to(raiz) for ruta in raiz.rglob("*.parquet")) == anteriores
+    assert len(escritores.leer_parquet(raiz)) == 5
+    assert [ruta.name for ruta in tmp_path.iterdir()] == [escritores.NOMBRE_PARQUET]
+
+
+def test_reemplazar_directorio_sustituye_el_contenido(tmp_path):
+    destino = tmp_path / "dataset"
+    destino.mkdir()
+    (destino / "viejo.txt").write_text("viejo")
+
+    escritores.reemplazar_directorio(destino, lambda raiz: (raiz / "nuevo.txt").write_text("nuevo"))
+
+    assert [ruta.name for ruta in destino.iterdir()] == ["nuevo.txt"]
+    assert [ruta.name for ruta in tmp_path.iterdir()] == ["dataset"]
@@ -0,0 +1,88 @@
+import pytest
+
+from esquemas import (
+    CLAVE_TRANSACCIONES,
+    RespuestaInvalida,
+    columnas_banco,
+    configuracion_generacion,
+    validar_fila,
+    validar_transacciones,
+)
+
+
+FILA = {
+    "fecha": "01/02",
+    "descripcion": " COMPRA EXITO ",
+    "sucursal": "MEDELLIN",
+    "dcto": "",
+    "valor": "-10.000,00",
+    "saldo": "90.000,00",
+}
+
+
+def test_respuesta_con_envoltorio():
+    filas = validar_transacciones({CLAVE_TRANSACCIONES: [FILA]}, "bancolombia")
+
+    assert filas == [{**FILA, "descripcion": "COMPRA EXITO"}]
+    assert list(filas[0]) == list(columnas_banco("bancolombia"))
+
+
+def test_lista_sin_envoltorio():
+    assert validar_transacciones([FILA, FILA], "bancolombia") == validar_transacciones(
+        {CLAVE_TRANSACCIONES: [FILA, FILA]}, "bancolombia"
+    )
+
+
+def test_objeto_sin_transacciones_es_una_respuesta_vacia():
+    assert validar_transacciones({}, "bancolombia") == []
+
+
+def test_numeros_y_nulos_pasan_a_texto():
+    fila = validar_fila({"fecha": "01/02", "valor": -10000.5, "saldo": 90000, "dcto": None}, "bancolombia")
+
+    assert fila == {"fecha": "01/02", "descripcion": "", "sucursal": "", "dcto": "", "valor": "-10000.5", "saldo": "90000"}
+
+
+def test_claves_ajenas_al_banco_se_descartan():
+    fila = validar_fila({**FILA, "comentario": "inventado", "moneda": "COP"}, "bancolombia")
+
+    assert set(fila) == set(columnas_banco("bancolombia"))
+
+
+def test_columnas_del_banco():
+    fila = validar_fila({"tarjeta": "VISA 1234", "tasa_ea": "28,5%", "fecha": "01/02"}, "rappi")
+
+    assert list(fila) == list(columnas_banco("rappi"))
+    assert fila["tarjeta"] == "VISA 1234"
+    assert fila["tasa_ea"] == "28,5%"
+
+
+@pytest.mark.parametrize("fila", ["01/02 COMPRA", ["01/02", "COMPRA"], 5, None])
+def test_filas_que_no_son_objetos(fila):
+    with pytest.raises(RespuestaInvalida, match="transacción 2 no es un objeto"):
+        validar_transacciones([FILA, fila], "bancolombia")
+
+
+@pytest.mark.parametrize("valor", [True, ["-10"], {"monto": "-10"}])
+def test_tipos_no_admitidos_en_una_columna(valor):
+    with pytest.raises(RespuestaInvalida, match="'valor'"):
+        validar_fila({**FILA, "valor": valor}, "bancolombia")
+
+
+@pytest.mark.parametrize("datos", ["texto", 3, None])
+def test_respuesta_que_no_es_objeto_ni_lista(datos):
+    with pytest.raises(RespuestaInvalida):
+        validar_transacciones(datos, "bancolombia")
+
+
+def test_transacciones_que_no_son_lista():
+    with pytest.raises(RespuestaInvalida):
+        validar_transacciones({CLAVE_TRANSACCIONES: {"fecha": "01/02"}}, "bancolombia")
+
+
+def test_esquema_exige_todas_las_columnas_como_texto():
+    esquema = configuracion_generacion("nu")["response_schema"]
+    fila = esquema["properties"][CLAVE_TRANSACCIONES]["items"]
+
+    assert fila["required"] == list(columnas_banco("nu"))
+    assert {propiedad["type"] for propiedad in fila["properties"].values()} == {"string"}
@@ -0,0 +1,71 @@
+import json
+
+import pytest
+
+from flujo_json import ParserTransacciones, transacciones_completas
+from reintentos import RespuestaTruncada
+
+
+FILAS = [
+    {"fecha": "01/02", "descripcion": "COMPRA {TIENDA} [CENTRO]", "valor": "-12.500,00"},
+    {"fecha": "02/02", "descripcion": 'ABONO "NOMINA" \\ EMPRESA', "valor": "1.000.000,00"},
+    {"fecha": "03/02", "descripcion": "PAGO PSE}", "valor": "-50,00", "detalle": {"canal": "app"}},
+]
+RESPUESTA = json.dumps({"transacciones": FILAS}, ensure_ascii=False)
+
+
+def alimentar(parser, fragmentos):
+    filas = []
+    for fragmento in fragmentos:
+        filas.extend(parser.alimentar(fragmento))
+    return filas
+
+
+@pytest.mark.parametrize("corte", range(1, len(RESPUESTA)))
+def test_cualquier_corte_en_dos_fragmentos(corte):
+    parser = ParserTransacciones()
+
+    filas = alimentar(parser, [RESPUESTA[:corte], RESPUESTA[corte:]])
+
+    parser.terminar()
+    assert filas == FILAS
+    assert parser.filas == len(FILAS)
+
+
+def test_caracter_por_caracter():
+    parser = ParserTransacciones()
+    entregadas = []
+    for caracter in RESPUESTA:
+        entregadas.append(len(parser.alimentar(caracter)))
+
+    parser.terminar()
+    # Cada fila sale en el fragmento que cierra su objeto, no al final.
+    cierres = [posicion for posicion, cantidad in enumerate(entregadas) if cantidad]
+    assert len(cierres) == len(FILAS)
+    assert cierres[-1] < len(RESPUESTA) - 2
+
+
+def test_lista_suelta_con_cerca_de_codigo():
+    texto = "```json\n" + json.dumps(FILAS) + "\n```"
+
+    assert transacciones_completas([texto[:7], texto[7:40], texto[40:]]) == FILAS
+
+
+def test_respuesta_truncada_conserva_las_filas_cerradas():
+    corte = RESPUESTA.index('"02/02"') + 5
+    parser = ParserTransacciones()
+
+    filas = alimentar(parser, [RESPUESTA[:20], RESPUESTA[20:corte]])
+
+    assert filas == FILAS[:1]
+    with pytest.raises(RespuestaTruncada, match="1 transacción"):
+        parser.terminar()
+
+
+def test_texto_despues_del_json_se_ignora():
+    parser = ParserTransacciones()
+
+    filas = alimentar(parser, [RESPUESTA, '\n{"transacciones": [{"fecha": "extra"}]}'])
+
+    assert filas == FILAS
+    parser.terminar()
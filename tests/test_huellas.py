@@ -0,0 +1,130 @@
+import numpy as np
+import pandas as pd
+
+from huellas import IndiceHuellas, huellas_documento, huellas_transacciones, origen_documento, quitar_repetidas
+
+
+def movimientos(filas, columnas=("fecha", "descripcion", "valor", "saldo")):
+    return pd.DataFrame(filas, columns=list(columnas))
+
+
+def test_la_misma_fila_en_paginas_solapadas_se_descarta():
+    df = movimientos(
+        [
+            ("2024-02-01", "COMPRA EXITO", -10.0, 90.0),
+            ("2024-02-02", "ABONO NOMINA", 100.0, 190.0),
+            ("2024-02-02", "Abono  nómina", 100.0, 190.0),
+            ("2024-02-03", "COMPRA EXITO", -10.0, 180.0),
+        ]
+    )
+
+    resultado = quitar_repetidas(df, "bancolombia")
+
+    # La tercera fila es la segunda leída otra vez; la cuarta es otra compra (otro saldo).
+    assert resultado["saldo"].tolist() == [90.0, 190.0, 180.0]
+    assert resultado.index.tolist() == [0, 1, 2]
+
+
+def test_sin_repetidas_devuelve_el_mismo_dataframe():
+    df = movimientos([("2024-02-01", "COMPRA", -10.0, 90.0), ("2024-02-01", "COMPRA", -10.0, 80.0)])
+
+    assert quitar_repetidas(df, "bancolombia") is df
+
+
+def test_sin_saldo_se_comparan_las_demas_columnas():
+    columnas = ("fecha", "descripcion", "valor", "cuotas", "restante")
+    df = movimientos(
+        [
+            ("2024-02-01", "TIENDA", 300.0, "1/3", 200.0),
+            ("2024-02-01", "TIENDA", 300.0, "1/6", 250.0),
+            ("2024-02-01", "TIENDA", 300.0, "1/3", 200.0),
+        ],
+        columnas,
+    )
+
+    resultado = quitar_repetidas(df, "nu")
+
+    assert resultado["cuotas"].tolist() == ["1/3", "1/6"]
+
+
+def test_huella_ignora_formato_de_la_descripcion_y_depende_de_la_cuenta():
+    df = movimientos(
+        [("2024-02-01", "Pago  Almacén Éxito", -10.0, 0.0), ("2024-02-01", "PAGO ALMACEN EXITO", -10.0, 0.0)]
+    )
+
+    huellas = huellas_transacciones(df, "bancolombia", "bancolombia-1234")
+
+    assert huellas[0] == huellas[1]
+    assert huellas_transacciones(df, "bancolombia", "bancolombia-9999")[0] != huellas[0]
+
+
+def test_compras_identicas_en_un_documento_tienen_huellas_distintas():
+    df = movimientos([("2024-02-01", "CAFE", -5.0, 95.0), ("2024-02-01", "CAFE", -5.0, 90.0)])
+
+    huellas = huellas_documento(df, "bancolombia", "cuenta")
+
+    assert huellas[0] != huellas[1]
+
+
+def test_indice_detecta_filas_exportadas_desde_otro_archivo(tmp_path):
+    enero = movimientos([("2024-01-30", "CAFE", -5.0, 95.0), ("2024-01-31", "CINE", -20.0, 75.0)])
+    febrero = movimientos([("2024-01-31", "CINE", -20.0, 75.0), ("2024-02-01", "TAXI", -8.0, 67.0)])
+    origen_enero, origen_febrero = origen_documento("a" * 64), origen_documento("b" * 64)
+
+    indice = IndiceHuellas(tmp_path)
+    assert not indice.marcar("cuenta", huellas_documento(enero, "bancolombia", "cuenta"), origen_enero).any()
+    repetidas = indice.marcar("cuenta", huellas_documento(febrero, "bancolombia", "cuenta"), origen_febrero)
+    assert repetidas.tolist() == [True, False]
+    indice.confirmar()
+
+    # En otra ejecución el índice se lee del disco; volver a exportar enero no lo marca.
+    otro = IndiceHuellas(tmp_path)
+    assert not otro.marcar("cuenta", huellas_documento(enero, "bancolombia", "cuenta"), origen_enero).any()
+    assert otro.marcar("cuenta", huellas_documento(febrero, "bancolombia", "cuenta"), origen_febrero).tolist() == [
+        True,
+        False,
+    ]
+    assert not otro.marcar("otra cuenta", huellas_documento(febrero, "bancolombia", "cuenta"), origen_febrero).any()
+
+
+def test_descartar_no_guarda_las_huellas(tmp_path):
+    df = movimientos([("2024-01-30", "CAFE", -5.0, 95.0)])
+    huellas = huellas_documento(df, "bancolombia", "cuenta")
+
+    indice = IndiceHuellas(tmp_path)
+    indice.marcar("cuenta", huellas, origen_documento("a" * 64))
+    indice.descartar()
+    indice.confirmar()
+
+    assert list(tmp_path.iterdir()) == []
+    assert not IndiceHuellas(tmp_path).marcar("cuenta", huellas, origen_documento("b" * 64)).any()
+
+
+def test_indice_en_memoria(tmp_path):
+    huellas = np.array([1, 2, 3], dtype=np.uint64)
+    indice = IndiceHuellas(tmp_path / "no usado", persistente=False)
+
+    indice.marcar("cuenta", huellas, 10)
+    indice.confirmar()
+
+    assert indice.marcar("cuenta", huellas, 11).all()
+    assert not (tmp_path / "no usado").exists()
+
+
+def test_sin_saldo_en_la_fila_se_comparan_las_demas_columnas():
+    columnas = ("fecha", "descripcion", "sucursal", "dcto", "valor", "saldo")
+    df = movimientos(
+        [
+            ("2024-02-01", "COMPRA EXITO", "", "1001", -10.0, np.nan),
+            ("2024-02-01", "COMPRA EXITO", "", "1002", -10.0, np.nan),
+            ("2024-02-01", "COMPRA EXITO", "", "1002", -10.0, np.nan),
+            ("2024-02-02", "ABONO NOMINA", "", "2001", 100.0, 190.0),
+            ("2024-02-02", "ABONO NOMINA", "", "2002", 100.0, 190.0),
+        ],
+        columnas,
+    )
+
+    resultado = quitar_repetidas(df, "bancolombia")
+
+    # Las compras sin saldo se distinguen por el documento; con saldo manda el saldo.
+    assert resultado["dcto"].tolist() == ["1001", "1002", "2001"]
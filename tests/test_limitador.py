@@ -0,0 +1,115 @@
+import asyncio
+
+import pytest
+
+import limitador
+from limitador import LimitadorCuota
+from modelo_simulado import RelojSimulado
+
+
+@pytest.fixture
+def reloj(monkeypatch):
+    """Reloj simulado en el que ``asyncio.sleep`` del limitador solo avanza el tiempo."""
+
+    reloj = RelojSimulado()
+    dormir_real = asyncio.sleep
+
+    async def dormir(segundos):
+        reloj.dormir(segundos)
+        await dormir_real(0)
+
+    monkeypatch.setattr(limitador.asyncio, "sleep", dormir)
+    return reloj
+
+
+def test_solicitudes_dentro_de_la_cuota_no_esperan(reloj):
+    cuota = LimitadorCuota(rpm=3, reloj=reloj.ahora)
+
+    assert [cuota.adquirir() for _ in range(3)] == [0.0, 0.0, 0.0]
+    assert cuota.metricas()["solicitudes"] == 3
+    assert reloj.esperas == []
+
+
+def test_la_cubeta_de_solicitudes_se_repone_con_el_tiempo(reloj):
+    cuota = LimitadorCuota(rpm=2, reloj=reloj.ahora)
+    cuota.adquirir()
+    cuota.adquirir()
+
+    espera = asyncio.run(cuota.adquirir_async())
+
+    # Dos solicitudes por minuto: una ficha cada 30 segundos.
+    assert espera == pytest.approx(30.0)
+    assert reloj.ahora() == pytest.approx(30.0)
+    assert cuota.metricas()["espera_maxima"] == pytest.approx(30.0)
+
+
+def test_la_cubeta_de_tokens_espera_lo_que_falta(reloj):
+    cuota = LimitadorCuota(tpm=6000, reloj=reloj.ahora)
+    cuota.adquirir(6000)
+
+    espera = asyncio.run(cuota.adquirir_async(1500))
+
+    assert espera == pytest.approx(15.0)
+    assert cuota.metricas()["tokens"] == 7500
+
+
+def test_costo_mayor_que_la_capacidad_se_recorta(reloj):
+    cuota = LimitadorCuota(tpm=1000, reloj=reloj.ahora)
+
+    assert cuota.adquirir(5000) == 0.0
+    assert asyncio.run(cuota.adquirir_async(5000)) == pytest.approx(60.0)
+
+
+def test_menor_prioridad_se_atiende_primero(reloj, monkeypatch):
+    cuota = LimitadorCuota(rpm=1, reloj=reloj.ahora)
+    cuota.adquirir()
+    atendidas = []
+    ceder = asyncio.sleep
+
+    async def sin_avanzar(segundos):
+        # El tiempo solo avanza cuando la prueba lo indica.
+        await ceder(0)
+
+    monkeypatch.setattr(limitador.asyncio, "sleep", sin_avanzar)
+
+    async def pedir(nombre, prioridad):
+        await cuota.adquirir_async(prioridad=prioridad)
+        atendidas.append(nombre)
+
+    async def avanzar(segundos):
+        reloj.actual += segundos
+        for _ in range(5):
+            await ceder(0)
+
+    async def principal():
+        tareas = [asyncio.ensure_future(pedir("cuarenta paginas", 40))]
+        await avanzar(0)
+        tareas.append(asyncio.ensure_future(pedir("una pagina", 1)))
+        await avanzar(0)
+        assert cuota.en_cola == 2
+
+        await avanzar(60)
+        assert atendidas == ["una pagina"]
+        await avanzar(60)
+        await asyncio.gather(*tareas)
+
+    asyncio.run(principal())
+
+    assert atendidas == ["una pagina", "cuarenta paginas"]
+    assert cuota.metricas()["profundidad_maxima"] == 2
+
+
+def test_una_espera_cancelada_sale_de_la_cola(reloj):
+    cuota = LimitadorCuota(rpm=1, reloj=reloj.ahora)
+    cuota.adquirir()
+
+    async def principal():
+        tarea = asyncio.ensure_future(cuota.adquirir_async())
+        await asyncio.sleep(0)
+        tarea.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await tarea
+
+    asyncio.run(principal())
+
+    assert cuota.en_cola == 0
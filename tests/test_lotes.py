@@ -0,0 +1,70 @@
+from lotes import PERFIL_POR_PAGINA, Lote, PerfilLotes, describir_plan, planificar_lotes
+from procesador_gemini import ProcesadorGemini
+
+
+def tramos(lotes):
+    return [(lote.primera, lote.cantidad) for lote in lotes]
+
+
+def test_objetivo_de_tokens_de_salida():
+    # 1500 tokens de salida por página y objetivo de 6000: cuatro páginas por lote.
+    perfil = PerfilLotes(tokens_salida_por_pagina=1500, objetivo_tokens_salida=6000, max_paginas=100)
+
+    lotes = planificar_lotes([100] * 10, perfil)
+
+    assert tramos(lotes) == [(1, 4), (5, 4), (9, 2)]
+    assert [lote.tokens_salida for lote in lotes] == [6000, 6000, 3000]
+    assert [lote.tokens_entrada for lote in lotes] == [400, 400, 200]
+
+
+def test_tope_de_paginas_por_solicitud():
+    perfil = PerfilLotes(tokens_salida_por_pagina=1, objetivo_tokens_salida=10**6, max_paginas=3)
+
+    assert tramos(planificar_lotes([100] * 7, perfil)) == [(1, 3), (4, 3), (7, 1)]
+
+
+def test_tope_de_tokens_de_entrada():
+    perfil = PerfilLotes(tokens_salida_por_pagina=1, objetivo_tokens_salida=10**6, max_tokens_entrada=1000)
+
+    lotes = planificar_lotes([400, 500, 200, 900, 1500, 100], perfil)
+
+    # Una página que por sí sola supera el tope va sola en su lote.
+    assert tramos(lotes) == [(1, 2), (3, 1), (4, 1), (5, 1), (6, 1)]
+    assert [lote.tokens_entrada for lote in lotes] == [900, 200, 900, 1500, 100]
+
+
+def test_una_pagina_que_supera_el_objetivo_de_salida_va_sola():
+    perfil = PerfilLotes(tokens_salida_por_pagina=8000, objetivo_tokens_salida=6000)
+
+    assert tramos(planificar_lotes([100] * 3, perfil)) == [(1, 1), (2, 1), (3, 1)]
+
+
+def test_sin_paginas_no_hay_lotes():
+    assert planificar_lotes([], PerfilLotes()) == []
+
+
+def test_perfil_por_pagina():
+    lotes = planificar_lotes([0] * 3, PERFIL_POR_PAGINA)
+
+    assert tramos(lotes) == [(1, 1), (2, 1), (3, 1)]
+    assert [list(lote.indices) for lote in lotes] == [[0], [1], [2]]
+
+
+def test_perfil_por_pagina_sustituye_al_del_banco(tmp_path):
+    paginas = [{"mime_type": "image/png", "data": b"x"}] * 5
+    procesador = ProcesadorGemini(
+        api_key="simulada",
+        password="",
+        carpeta=str(tmp_path),
+        log_callback=lambda _: None,
+        usar_cache=False,
+        perfiles_lotes={"nu": PERFIL_POR_PAGINA},
+    )
+
+    assert len(procesador.planificar_lotes(paginas, "nu")) == 5
+    # Los bancos sin sustituto conservan su perfil: cinco páginas pequeñas en dos lotes.
+    assert tramos(procesador.planificar_lotes(paginas, "bancolombia")) == [(1, 3), (4, 2)]
+
+
+def test_describir_plan():
+    assert describir_plan([Lote(1, 3, 0, 0), Lote(4, 1, 0, 0)]) == "[1-3] [4]"
@@ -0,0 +1,111 @@
+import datetime as dt
+import os
+
+import pytest
+
+from manifiesto import ManifiestoProcesados, huella_archivo
+from tabla_transacciones import EncabezadoExtracto
+
+
+REGISTROS = [{"fecha": "01/02", "descripcion": "CAFE", "valor": "-5.000,00"}]
+ENCABEZADO = EncabezadoExtracto(fecha_corte=dt.date(2024, 2, 29), cuenta="1234")
+
+
+@pytest.fixture
+def carpeta(tmp_path):
+    carpeta = tmp_path / "extractos"
+    carpeta.mkdir()
+    for nombre, contenido in (("enero.pdf", b"%PDF enero"), ("febrero.pdf", b"%PDF febrero")):
+        (carpeta / nombre).write_bytes(contenido)
+    return carpeta
+
+
+def abrir(carpeta):
+    return ManifiestoProcesados(carpeta, directorio=carpeta.parent / "manifiestos")
+
+
+def pdfs(carpeta):
+    return sorted(carpeta.glob("*.pdf"))
+
+
+def exportar(carpeta):
+    manifiesto = abrir(carpeta)
+    pendientes, _ = manifiesto.clasificar(pdfs(carpeta))
+    for pdf in pendientes:
+        manifiesto.registrar(pdf, REGISTROS, ENCABEZADO)
+    manifiesto.confirmar()
+    return manifiesto
+
+
+def test_primera_ejecucion_extrae_todo(carpeta):
+    pendientes, vigentes = abrir(carpeta).clasificar(pdfs(carpeta))
+
+    assert pendientes == pdfs(carpeta)
+    assert vigentes == {}
+
+
+def test_archivos_sin_cambios_se_recuperan_con_su_encabezado(carpeta):
+    exportar(carpeta)
+
+    pendientes, vigentes = abrir(carpeta).clasificar(pdfs(carpeta))
+
+    assert pendientes == []
+    assert vigentes == {pdf: (REGISTROS, ENCABEZADO) for pdf in pdfs(carpeta)}
+
+
+def test_archivo_modificado_se_vuelve_a_extraer(carpeta):
+    exportar(carpeta)
+    (carpeta / "enero.pdf").write_bytes(b"%PDF enero corregido")
+
+    pendientes, vigentes = abrir(carpeta).clasificar(pdfs(carpeta))
+
+    assert pendientes == [carpeta / "enero.pdf"]
+    assert list(vigentes) == [carpeta / "febrero.pdf"]
+
+
+def test_mismo_contenido_con_otro_nombre_o_mtime_no_se_extrae(carpeta):
+    exportar(carpeta)
+    (carpeta / "enero.pdf").rename(carpeta / "2024-01.pdf")
+    os.utime(carpeta / "febrero.pdf", ns=(0, 0))
+
+    manifiesto = abrir(carpeta)
+    pendientes, vigentes = manifiesto.clasificar(pdfs(carpeta))
+    manifiesto.confirmar()
+
+    assert pendientes == []
+    assert set(vigentes) == set(pdfs(carpeta))
+    assert manifiesto.huella(carpeta / "2024-01.pdf") == huella_archivo(carpeta / "2024-01.pdf")
+    # La entrada del nombre anterior se olvida al confirmar.
+    assert len(abrir(carpeta)) == 2
+
+
+def test_sin_confirmar_no_se_guarda_nada(carpeta):
+    manifiesto = abrir(carpeta)
+    for pdf in manifiesto.clasificar(pdfs(carpeta))[0]:
+        manifiesto.registrar(pdf, REGISTROS, ENCABEZADO)
+    manifiesto.descartar()
+
+    assert abrir(carpeta).clasificar(pdfs(carpeta))[0] == pdfs(carpeta)
+
+
+def test_documento_sin_transacciones_sigue_pendiente(carpeta):
+    manifiesto = abrir(carpeta)
+    manifiesto.clasificar(pdfs(carpeta))
+    manifiesto.registrar(carpeta / "enero.pdf", [], ENCABEZADO)
+    manifiesto.registrar(carpeta / "febrero.pdf", REGISTROS)
+    manifiesto.confirmar()
+
+    pendientes, vigentes = abrir(carpeta).clasificar(pdfs(carpeta))
+
+    assert pendientes == [carpeta / "enero.pdf"]
+    assert vigentes == {carpeta / "febrero.pdf": (REGISTROS, EncabezadoExtracto())}
+
+
+def test_transacciones_guardadas_ilegibles_se_vuelven_a_extraer(carpeta):
+    manifiesto = exportar(carpeta)
+    huella = manifiesto.huella(carpeta / "enero.pdf")
+    (manifiesto.directorio / "registros" / f"{huella}.json").write_text("{no es json", encoding="utf-8")
+
+    pendientes, _ = abrir(carpeta).clasificar(pdfs(carpeta))
+
+    assert pendientes == [carpeta / "enero.pdf"]
@@ -0,0 +1,176 @@
+import io
+
+import fitz
+import pytest
+from PIL import Image, ImageChops
+
+import paginas
+from paginas import FuentePaginas, PerfilRender, bytes_de_carga
+
+
+def documento(paginas=3, tamano=10):
+    documento = fitz.open()
+    for numero in range(paginas):
+        documento.new_page().insert_text((40, 60), f"PAGINA {numero + 1}", fontsize=tamano)
+    return documento
+
+
+def imagen(contenido):
+    return Image.open(io.BytesIO(contenido["data"]))
+
+
+# ----------------------------------------------------------------------
+# Renderizado perezoso
+# ----------------------------------------------------------------------
+@pytest.fixture
+def renderizadas(monkeypatch):
+    """Índices de las páginas rasterizadas, en orden."""
+
+    indices = []
+    original = paginas.rasterizar_pagina
+
+    def contar(pagina, perfil):
+        indices.append(pagina.number)
+        return original(pagina, perfil)
+
+    monkeypatch.setattr(paginas, "rasterizar_pagina", contar)
+    return indices
+
+
+def test_len_y_dimensiones_no_renderizan(renderizadas):
+    fuente = FuentePaginas(documento(4), PerfilRender(dpi=144))
+
+    assert len(fuente) == 4
+    ancho, alto = fuente.dimensiones(0)
+    assert renderizadas == []
+
+    assert imagen(fuente[0]).size == (ancho, alto)
+
+
+def test_cada_acceso_renderiza_solo_esa_pagina(renderizadas):
+    fuente = FuentePaginas(documento(4), PerfilRender(dpi=72))
+
+    fuente[2]
+    fuente[-1]
+    fuente[0:2]
+
+    assert renderizadas == [2, 3, 0, 1]
+    with pytest.raises(IndexError):
+        fuente[4]
+
+
+def test_la_iteracion_renderiza_bajo_demanda(renderizadas):
+    iterador = iter(FuentePaginas(documento(3), PerfilRender(dpi=72)))
+
+    next(iterador)
+    assert renderizadas == [0]
+    list(iterador)
+    assert renderizadas == [0, 1, 2]
+
+
+def test_bytes_de_carga_cuenta_cada_pagina_una_vez():
+    fuente = FuentePaginas(documento(), PerfilRender(dpi=72))
+    primera_vez = [fuente[indice] for indice in range(len(fuente))]
+
+    # Una división o un reintento vuelve a renderizar las mismas páginas.
+    fuente[0]
+    list(fuente[1:])
+
+    assert fuente.bytes_generados == sum(len(pagina["data"]) for pagina in primera_vez)
+    assert bytes_de_carga(fuente) == bytes_de_carga(primera_vez)
+
+
+# ----------------------------------------------------------------------
+# Perfiles de render
+# ----------------------------------------------------------------------
+def test_dpi_fijo():
+    pagina = documento(1)[0]
+
+    assert paginas.elegir_dpi(pagina, PerfilRender(dpi=100)) == 100
+
+
+@pytest.mark.parametrize("tamano, esperado", [(8, 144), (12, 96), (16, 72), (4, 216), (40, 72)])
+def test_dpi_automatico_segun_el_texto_pequeno(tamano, esperado):
+    pagina = documento(1, tamano=tamano)[0]
+    perfil = PerfilRender(dpi=None, altura_texto_px=16, dpi_minimo=72, dpi_maximo=216)
+
+    # 16 px de altura para el texto: 16 * 72 / tamaño, acotado entre 72 y 216.
+    assert paginas.elegir_dpi(pagina, perfil) == esperado
+
+
+def test_dpi_automatico_sin_texto_usa_el_maximo():
+    pagina = fitz.open().new_page()
+
+    assert paginas.elegir_dpi(pagina, PerfilRender(dpi=None, dpi_maximo=200)) == 200
+
+
+def test_escala_de_grises_y_formato():
+    pagina = documento(1)[0]
+
+    contenido = paginas.renderizar_pagina(pagina, PerfilRender(dpi=72, escala_grises=True, formato="jpeg", calidad=60))
+
+    assert contenido["mime_type"] == "image/jpeg"
+    assert imagen(contenido).mode == "L"
+    assert imagen(contenido).size == (595, 842)
+
+
+def test_webp_sin_perdida_conserva_los_pixeles():
+    original = paginas.rasterizar_pagina(documento(1)[0], PerfilRender(dpi=72))
+
+    contenido = paginas.codificar_imagen(original, PerfilRender(dpi=72))
+
+    assert contenido["mime_type"] == "image/webp"
+    assert list(imagen(contenido).convert("RGB").getdata()) == list(original.getdata())
+
+
+@pytest.mark.parametrize("opciones", [{"formato": "gif"}, {"formato": "jpeg"}])
+def test_perfiles_invalidos(opciones):
+    with pytest.raises(ValueError):
+        PerfilRender(**opciones)
+
+
+def test_descripcion_del_perfil():
+    assert PerfilRender().descripcion == "144dpi-color-webp-lossless"
+    assert PerfilRender(dpi=None, escala_grises=True, formato="jpeg", calidad=70).descripcion == "auto16px-gris-jpeg-q70"
+
+
+# ----------------------------------------------------------------------
+# Pixmap -> PIL sin pasar por PNG
+# ----------------------------------------------------------------------
+@pytest.fixture
+def pagina_de_color():
+    pagina = fitz.open().new_page(width=40, height=30)
+    pagina.draw_rect(fitz.Rect(0, 0, 20, 30), color=(1, 0, 0), fill=(1, 0, 0))
+    pagina.draw_rect(fitz.Rect(20, 0, 40, 15), color=(0, 0.5, 1), fill=(0, 0.5, 1))
+    return pagina
+
+
+@pytest.mark.parametrize(
+    "espacio, alfa, modo",
+    [
+        (fitz.csRGB, False, "RGB"),
+        (fitz.csRGB, True, "RGBA"),
+        (fitz.csGRAY, False, "L"),
+        (fitz.csGRAY, True, "RGB"),
+        (fitz.csCMYK, False, "RGB"),
+        (fitz.csCMYK, True, "RGB"),
+    ],
+)
+def test_pixmap_a_imagen_coincide_con_png(pagina_de_color, espacio, alfa, modo):
+    pix = pagina_de_color.get_pixmap(colorspace=espacio, alpha=alfa)
+
+    resultado = paginas.pixmap_a_imagen(pix)
+
+    if espacio is fitz.csCMYK:
+        # PNG no admite CMYK: la referencia es la conversión a RGB de MuPDF.
+        pix = fitz.Pixmap(fitz.csRGB, pix)
+    referencia = paginas.pixmap_a_imagen_png(pix)
+    if referencia.mode != modo:
+        referencia = referencia.convert(modo)
+
+    assert resultado.mode == modo
+    assert resultado.size == (40, 30)
+    diferencia = ImageChops.difference(resultado, referencia).getextrema()
+    # Deshacer el alfa premultiplicado puede redondear distinto en un nivel.
+    tolerancia = 1 if alfa else 0
+    assert all(maximo <= tolerancia for _, maximo in (diferencia if modo != "L" else [diferencia]))
@@ -0,0 +1,37 @@
+import asyncio
+
+import pandas as pd
+import pytest
+
+from procesador_async import ProcesadorGeminiAsync
+from procesador_gemini import ProcesadorGemini
+
+
+def opciones(carpeta, tmp_path, modelo, nombre):
+    return dict(
+        api_key="simulada",
+        password="",
+        carpeta=str(carpeta),
+        log_callback=lambda _: None,
+        cliente_modelo=modelo,
+        directorio_cache=str(tmp_path / f"cache-{nombre}"),
+    )
+
+
+@pytest.mark.parametrize("usar_procesos", [True, False])
+def test_asincrono_con_varios_workers_da_las_mismas_hojas(carpeta_extractos, tmp_path, modelo, usar_procesos):
+    secuencial = ProcesadorGemini(**opciones(carpeta_extractos, tmp_path, modelo, "secuencial")).procesar()
+    esperadas = pd.read_excel(secuencial, sheet_name=None)
+
+    # Caché activada por defecto: con procesos el procesador viaja al pool de preparación.
+    procesador = ProcesadorGeminiAsync(
+        **opciones(carpeta_extractos, tmp_path, modelo, "asincrono"), max_workers=2, usar_procesos=usar_procesos
+    )
+    ruta = asyncio.run(procesador.procesar_async())
+
+    assert ruta is not None
+    hojas = pd.read_excel(ruta, sheet_name=None)
+    assert list(hojas) == list(esperadas) == [f"bancolombia_{numero}" for numero in range(4)]
+    for nombre, df in esperadas.items():
+        pd.testing.assert_frame_equal(hojas[nombre], df)
+    assert procesador.paginas_fallidas == {}
@@ -0,0 +1,315 @@
+import asyncio
+import json
+import time
+
+import pandas as pd
+import pytest
+
+from conftest import crear_extracto, respuesta_por_contenido
+from lotes import PERFIL_POR_PAGINA, PerfilLotes
+from modelo_simulado import MAX_TOKENS, SAFETY, ModeloSimulado, RespuestaSimulada
+from procesador_async import ProcesadorGeminiAsync
+from procesador_gemini import ProcesadorGemini
+
+
+def procesador(carpeta, tmp_path, modelo, **opciones):
+    return ProcesadorGemini(
+        api_key="simulada",
+        password="",
+        carpeta=str(carpeta),
+        log_callback=lambda _: None,
+        cliente_modelo=modelo,
+        directorio_cache=str(tmp_path / f"cache-{opciones.get('max_workers', 1)}"),
+        **opciones,
+    )
+
+
+def hojas(ruta):
+    assert ruta is not None
+    return pd.read_excel(ruta, sheet_name=None)
+
+
+@pytest.mark.parametrize("usar_procesos", [True, False])
+def test_concurrente_da_las_mismas_hojas_que_secuencial(carpeta_extractos, tmp_path, modelo, usar_procesos):
+    secuencial = hojas(procesador(carpeta_extractos, tmp_path, modelo).procesar())
+
+    concurrente = procesador(carpeta_extractos, tmp_path, modelo, max_workers=2, usar_procesos=usar_procesos)
+    resultado = hojas(concurrente.procesar())
+
+    assert list(resultado) == [f"bancolombia_{numero}" for numero in range(4)]
+    assert list(resultado) == list(secuencial)
+    for nombre, df in secuencial.items():
+        pd.testing.assert_frame_equal(resultado[nombre], df)
+    # Una fila por página: ninguna hoja recibió las páginas de otro documento.
+    assert [len(df) for df in resultado.values()] == [2, 1, 3, 2]
+    assert concurrente.paginas_fallidas == {}
+
+
+# ----------------------------------------------------------------------
+# Páginas en paralelo (sin PDF: blobs con el número de página)
+# ----------------------------------------------------------------------
+def pagina(numero):
+    return {"mime_type": "image/png", "data": f"pagina-{numero}".encode()}
+
+
+def numeros_de(contenido):
+    return [int(parte["data"].decode().split("-")[1]) for parte in contenido if isinstance(parte, dict)]
+
+
+def fila(numero, orden=1):
+    return {
+        "fecha": "01/02",
+        "descripcion": f"PAGINA {numero} FILA {orden}",
+        "sucursal": "",
+        "dcto": "",
+        "valor": "1",
+        "saldo": "1",
+    }
+
+
+def respuesta_por_pagina(fallidas=(), demoras=None):
+    """Dos filas por página; las páginas de ``fallidas`` las bloquean los filtros (error fatal)."""
+
+    def responder(contenido):
+        numeros = numeros_de(contenido)
+        if demoras:
+            time.sleep(max(demoras.get(numero, 0.0) for numero in numeros))
+        if any(numero in fallidas for numero in numeros):
+            return RespuestaSimulada("", SAFETY)
+        return json.dumps({"transacciones": [fila(numero, orden) for numero in numeros for orden in (1, 2)]})
+
+    return responder
+
+
+def procesador_paginas(tmp_path, respuesta, **opciones):
+    opciones.setdefault("usar_cache", False)
+    procesador = ProcesadorGemini(
+        api_key="simulada",
+        password="",
+        carpeta=str(tmp_path),
+        log_callback=lambda _: None,
+        cliente_modelo=ModeloSimulado(respuesta=respuesta, latencia=0.0),
+        directorio_cache=str(tmp_path / "cache"),
+        **opciones,
+    )
+    procesador.configurar_gemini()
+    return procesador
+
+
+def test_paginas_en_paralelo_se_reensamblan_en_orden(tmp_path):
+    # Las primeras páginas tardan más: terminan después que las últimas.
+    demoras = {1: 0.08, 2: 0.06, 3: 0.04, 4: 0.02}
+    procesador = procesador_paginas(tmp_path, respuesta_por_pagina(demoras=demoras), max_paginas_concurrentes=4)
+
+    df = procesador.extraer_por_pagina([pagina(numero) for numero in range(1, 7)], "bancolombia")
+
+    assert df["descripcion"].tolist() == [f"PAGINA {numero} FILA {orden}" for numero in range(1, 7) for orden in (1, 2)]
+    assert df.attrs["paginas_fallidas"] == []
+    assert procesador.cliente_modelo.concurrencia_maxima > 1
+
+
+def test_una_pagina_fallida_solo_descarta_sus_filas(tmp_path):
+    procesador = procesador_paginas(tmp_path, respuesta_por_pagina(fallidas={2, 5}), max_paginas_concurrentes=3)
+
+    df = procesador.extraer_por_pagina([pagina(numero) for numero in range(1, 7)], "bancolombia")
+
+    assert df.attrs["paginas_fallidas"] == [2, 5]
+    assert df["descripcion"].str.split().str[1].astype(int).unique().tolist() == [1, 3, 4, 6]
+    # El error es fatal: no se reintenta.
+    assert procesador.cliente_modelo.solicitudes == 6
+
+
+def test_sin_ninguna_pagina_valida_no_hay_tabla(tmp_path):
+    procesador = procesador_paginas(tmp_path, respuesta_por_pagina(fallidas={1, 2}))
+
+    assert procesador.extraer_por_pagina([pagina(1), pagina(2)], "bancolombia") is None
+
+
+# ----------------------------------------------------------------------
+# Reintento de páginas fallidas
+# ----------------------------------------------------------------------
+def test_reintentar_fallidos_solo_envia_las_paginas_pendientes(carpeta_extractos, tmp_path):
+    enviadas, fallar = [], {"solicitud": 2}
+
+    def responder(contenido):
+        paginas = [bytes(parte["data"]) for parte in contenido if isinstance(parte, dict)]
+        enviadas.append(paginas)
+        if len(enviadas) == fallar["solicitud"]:
+            return RespuestaSimulada("", SAFETY)
+        return respuesta_por_contenido(contenido)
+
+    procesador = ProcesadorGemini(
+        api_key="simulada",
+        password="",
+        carpeta=str(carpeta_extractos),
+        log_callback=lambda _: None,
+        cliente_modelo=ModeloSimulado(respuesta=responder, latencia=0.0),
+        directorio_cache=str(tmp_path / "cache"),
+        perfiles_lotes={"bancolombia": PERFIL_POR_PAGINA},
+        max_paginas_concurrentes=1,
+    )
+
+    primera = pd.read_excel(procesador.procesar(), sheet_name=None)
+    # La segunda solicitud es la página 2 del primer extracto.
+    assert procesador.paginas_fallidas == {"bancolombia_0.pdf": [2]}
+    assert len(primera["bancolombia_0"]) == 1
+    pendiente = enviadas[1]
+
+    enviadas.clear()
+    fallar["solicitud"] = None
+    segunda = pd.read_excel(procesador.reintentar_fallidos(), sheet_name=None)
+
+    assert enviadas == [pendiente]
+    assert procesador.paginas_fallidas == {}
+    assert [len(df) for df in segunda.values()] == [2, 1, 3, 2]
+    # La página 1 viene de la caché de páginas y conserva su fila original.
+    assert segunda["bancolombia_0"].iloc[0].equals(primera["bancolombia_0"].iloc[0])
+
+    # Ya no queda nada pendiente: otra ejecución sale de la caché de documentos.
+    procesador.procesar()
+    assert enviadas == [pendiente]
+
+
+def modelo_que_falla_la_segunda_solicitud():
+    """Modelo simulado cuya segunda solicitud se bloquea mientras ``fallar["activo"]``."""
+
+    fallar = {"activo": True}
+    modelo = ModeloSimulado(latencia=0.0)
+
+    def responder(contenido):
+        if fallar["activo"] and modelo.solicitudes == 2:
+            return RespuestaSimulada("", SAFETY)
+        return respuesta_por_contenido(contenido)
+
+    modelo.respuesta = responder
+    return modelo, fallar
+
+
+def test_reintentar_fallidos_sin_cache_no_reenvia_nada(carpeta_extractos, tmp_path):
+    modelo, fallar = modelo_que_falla_la_segunda_solicitud()
+    sin_cache = procesador(
+        carpeta_extractos,
+        tmp_path,
+        modelo,
+        usar_cache=False,
+        perfiles_lotes={"bancolombia": PERFIL_POR_PAGINA},
+        max_paginas_concurrentes=1,
+    )
+
+    assert sin_cache.procesar() is not None
+    assert sin_cache.paginas_fallidas == {"bancolombia_0.pdf": [2]}
+    assert modelo.solicitudes == 8
+
+    fallar["activo"] = False
+    assert sin_cache.reintentar_fallidos() is None
+    # Sin caché las siete páginas que sí respondieron se habrían vuelto a enviar.
+    assert modelo.solicitudes == 8
+    assert sin_cache.paginas_fallidas == {"bancolombia_0.pdf": [2]}
+
+
+def test_reintentar_fallidos_no_incluye_pdfs_nuevos(carpeta_extractos, tmp_path):
+    modelo, fallar = modelo_que_falla_la_segunda_solicitud()
+    con_cache = procesador(
+        carpeta_extractos,
+        tmp_path,
+        modelo,
+        perfiles_lotes={"bancolombia": PERFIL_POR_PAGINA},
+        max_paginas_concurrentes=1,
+    )
+    con_cache.procesar()
+    assert con_cache.paginas_fallidas == {"bancolombia_0.pdf": [2]}
+
+    crear_extracto(carpeta_extractos / "bancolombia_9.pdf", 2, marca="9")
+    fallar["activo"] = False
+    segunda = hojas(con_cache.reintentar_fallidos())
+
+    assert list(segunda) == [f"bancolombia_{numero}" for numero in range(4)]
+    # Solo la página pendiente llegó al modelo; el PDF nuevo espera a procesar().
+    assert modelo.solicitudes == 9
+
+
+def test_paginas_perezosas_dan_las_mismas_hojas(carpeta_extractos, tmp_path, modelo):
+    perezosas = hojas(procesador(carpeta_extractos, tmp_path, modelo, usar_cache=False).procesar())
+    materializadas = hojas(
+        procesador(carpeta_extractos, tmp_path, modelo, usar_cache=False, paginas_perezosas=False).procesar()
+    )
+
+    assert list(perezosas) == list(materializadas)
+    for nombre, df in materializadas.items():
+        pd.testing.assert_frame_equal(perezosas[nombre], df)
+
+
+# ----------------------------------------------------------------------
+# División de solicitudes truncadas
+# ----------------------------------------------------------------------
+def respuesta_truncada_si_hay_varias_paginas(motivo):
+    """Una página responde completa; varias se cortan por MAX_TOKENS o con el JSON sin cerrar."""
+
+    def responder(contenido):
+        numeros = numeros_de(contenido)
+        filas = [fila(numero, orden) for numero in numeros for orden in (1, 2)]
+        if len(numeros) == 1:
+            return json.dumps({"transacciones": filas})
+        # Las filas de la primera página llegan completas antes del corte.
+        cortado = json.dumps({"transacciones": filas})[: len(json.dumps(filas[:3])) + 20]
+        return RespuestaSimulada(cortado, MAX_TOKENS) if motivo == "max_tokens" else cortado
+
+    return responder
+
+
+@pytest.mark.parametrize("motivo", ["max_tokens", "json_truncado"])
+@pytest.mark.parametrize("streaming", [True, False])
+@pytest.mark.parametrize("asincrono", [False, True])
+def test_lote_truncado_se_divide_y_une_las_mitades_en_orden(tmp_path, motivo, streaming, asincrono):
+    clase = ProcesadorGeminiAsync if asincrono else ProcesadorGemini
+    modelo = ModeloSimulado(respuesta=respuesta_truncada_si_hay_varias_paginas(motivo), latencia=0.0)
+    procesador = clase(
+        api_key="simulada",
+        password="",
+        carpeta=str(tmp_path),
+        log_callback=lambda _: None,
+        cliente_modelo=modelo,
+        usar_cache=False,
+        streaming=streaming,
+        perfiles_lotes={"bancolombia": PerfilLotes(max_paginas=10, objetivo_tokens_salida=10**6)},
+    )
+    procesador.configurar_gemini()
+    paginas = [pagina(numero) for numero in range(1, 11)]
+
+    if asincrono:
+        df = asyncio.run(procesador.extraer_transacciones_async(paginas, "bancolombia"))
+    else:
+        df = procesador.extraer_transacciones(paginas, "bancolombia")
+
+    # Ni las filas completas de las respuestas cortadas ni las mitades se duplican.
+    assert df["descripcion"].tolist() == [f"PAGINA {numero} FILA {orden}" for numero in range(1, 11) for orden in (1, 2)]
+    assert df.attrs["paginas_fallidas"] == []
+    # Un árbol binario con diez hojas: nueve divisiones y diez páginas sueltas.
+    assert modelo.solicitudes == 19
+
+
+@pytest.mark.parametrize("streaming", [True, False])
+@pytest.mark.parametrize("asincrono", [False, True])
+def test_lote_bloqueado_no_se_reintenta_ni_se_divide(tmp_path, streaming, asincrono):
+    clase = ProcesadorGeminiAsync if asincrono else ProcesadorGemini
+    modelo = ModeloSimulado(respuesta=RespuestaSimulada("", SAFETY), latencia=0.0)
+    procesador = clase(
+        api_key="simulada",
+        password="",
+        carpeta=str(tmp_path),
+        log_callback=lambda _: None,
+        cliente_modelo=modelo,
+        usar_cache=False,
+        streaming=streaming,
+        perfiles_lotes={"bancolombia": PerfilLotes(max_paginas=10, objetivo_tokens_salida=10**6)},
+    )
+    procesador.configurar_gemini()
+    paginas = [pagina(numero) for numero in range(1, 5)]
+
+    if asincrono:
+        df = asyncio.run(procesador.extraer_transacciones_async(paginas, "bancolombia"))
+    else:
+        df = procesador.extraer_transacciones(paginas, "bancolombia")
+
+    assert df is None
+    assert modelo.solicitudes == 1
@@ -0,0 +1,210 @@
+import asyncio
+import enum
+import random
+from types import SimpleNamespace
+
+import pytest
+
+from modelo_simulado import MAX_TOKENS, SAFETY, ErrorSimulado, RelojSimulado, RespuestaSimulada
+from reintentos import (
+    DIVIDIR,
+    FATAL,
+    REINTENTABLE,
+    ErrorDividir,
+    ErrorFatal,
+    PoliticaReintentos,
+    RespuestaTruncada,
+    clasificar_error,
+    comprobar_finalizacion,
+    sugerencia_espera,
+)
+
+
+class ErrorHttp(RuntimeError):
+    def __init__(self, code, mensaje="error"):
+        super().__init__(mensaje)
+        self.code = code
+
+
+class AzarExtremo(random.Random):
+    """Siempre devuelve el extremo superior del intervalo."""
+
+    def uniform(self, a, b):
+        return b
+
+
+def politica(reloj=None, **opciones):
+    reloj = reloj or RelojSimulado()
+    opciones.setdefault("azar", random.Random(7))
+    return PoliticaReintentos(dormir=reloj.dormir, dormir_async=reloj.dormir_async, **opciones)
+
+
+@pytest.mark.parametrize("intento", range(1, 9))
+def test_jitter_dentro_del_tope_exponencial(intento):
+    reintentos = politica(espera_base=1.5, espera_maxima=30.0)
+    tope = min(30.0, 1.5 * 2 ** (intento - 1))
+
+    esperas = [reintentos.espera(intento) for _ in range(500)]
+
+    assert all(0.0 <= espera <= tope for espera in esperas)
+    # *Full jitter*: las esperas cubren el intervalo, no se agrupan en el tope.
+    assert min(esperas) < tope * 0.1 and max(esperas) > tope * 0.9
+
+
+def test_tope_de_espera_maxima():
+    reintentos = politica(azar=AzarExtremo(), espera_base=1.0, espera_maxima=8.0)
+
+    assert [reintentos.espera(intento) for intento in range(1, 7)] == [1.0, 2.0, 4.0, 8.0, 8.0, 8.0]
+
+
+def test_sugerencia_del_servidor_acotada():
+    reintentos = politica(azar=random.Random(0), espera_maxima=2.0, espera_maxima_sugerida=20.0)
+
+    assert sugerencia_espera(ErrorHttp(429, "Please retry in 12s")) == 12.0
+    assert reintentos.espera(1, ErrorHttp(429, "Please retry in 12s")) == 12.0
+    assert reintentos.espera(1, ErrorHttp(429, "Please retry in 300s")) == 20.0
+
+
+@pytest.mark.parametrize(
+    "error, clase",
+    [
+        (ErrorHttp(429), REINTENTABLE),
+        (ErrorHttp(503), REINTENTABLE),
+        (ConnectionError("reset"), REINTENTABLE),
+        (ErrorHttp(401), FATAL),
+        (ErrorHttp(403), FATAL),
+        (ErrorHttp(413), DIVIDIR),
+        (ErrorHttp(400, "request payload size exceeds the limit: too large"), DIVIDIR),
+    ],
+)
+def test_clasificacion(error, clase):
+    assert clasificar_error(error) == clase
+
+
+class FinishReason(enum.IntEnum):
+    """Como ``Candidate.FinishReason`` del SDK: entero con nombre."""
+
+    STOP = 1
+    MAX_TOKENS = 2
+    SAFETY = 3
+    RECITATION = 4
+    BLOCKLIST = 7
+    PROHIBITED_CONTENT = 8
+    SPII = 9
+
+
+@pytest.mark.parametrize(
+    "motivo, esperado",
+    [
+        (SAFETY, ErrorFatal),
+        (4, ErrorFatal),
+        (7, ErrorFatal),
+        (FinishReason.PROHIBITED_CONTENT, ErrorFatal),
+        (FinishReason.SPII, ErrorFatal),
+        (MAX_TOKENS, RespuestaTruncada),
+        (FinishReason.MAX_TOKENS, RespuestaTruncada),
+    ],
+)
+def test_motivo_de_finalizacion_decide_la_clase(motivo, esperado):
+    respuesta = RespuestaSimulada("", motivo)
+    # El mensaje del SDK solo trae el entero: no sirve para clasificar.
+    with pytest.raises(ValueError, match=rf"finish_reason\]\(.*\) is {int(motivo)}\."):
+        respuesta.text
+
+    with pytest.raises(esperado):
+        comprobar_finalizacion(respuesta)
+
+
+@pytest.mark.parametrize("motivo", [1, FinishReason.STOP, None])
+def test_respuesta_completa_no_lanza(motivo):
+    comprobar_finalizacion(SimpleNamespace(candidates=[SimpleNamespace(finish_reason=motivo)]))
+
+
+def test_solicitud_bloqueada():
+    respuesta = SimpleNamespace(prompt_feedback=SimpleNamespace(block_reason=1), candidates=[])
+
+    with pytest.raises(ErrorFatal, match="bloqueada"):
+        comprobar_finalizacion(respuesta)
+
+
+def test_respuesta_bloqueada_no_se_reintenta():
+    reloj = RelojSimulado()
+    reintentos = politica(reloj)
+    llamadas = []
+
+    def llamar():
+        llamadas.append(1)
+        respuesta = RespuestaSimulada("", SAFETY)
+        comprobar_finalizacion(respuesta)
+        return respuesta.text
+
+    with pytest.raises(ErrorFatal, match="SAFETY"):
+        reintentos.ejecutar(llamar)
+    assert len(llamadas) == 1
+    assert reloj.esperas == []
+
+
+@pytest.mark.parametrize("motivo, clase", [(FinishReason.SAFETY, FATAL), (FinishReason.MAX_TOKENS, DIVIDIR)])
+def test_excepciones_de_parada_del_sdk(motivo, clase):
+    tipos = pytest.importorskip("google.generativeai.types")
+
+    assert clasificar_error(tipos.StopCandidateException(SimpleNamespace(finish_reason=motivo))) == clase
+
+
+def test_reintenta_con_esperas_acotadas_hasta_tener_exito():
+    reloj = RelojSimulado()
+    reintentos = politica(reloj, max_intentos=4, espera_base=2.0, espera_maxima=5.0)
+    resultados = iter([ErrorSimulado("503"), ErrorSimulado("503"), ErrorSimulado("503"), "ok"])
+
+    def llamar():
+        resultado = next(resultados)
+        if isinstance(resultado, Exception):
+            raise resultado
+        return resultado
+
+    assert reintentos.ejecutar(llamar) == "ok"
+    assert len(reloj.esperas) == 3
+    assert all(0.0 <= espera <= tope for espera, tope in zip(reloj.esperas, [2.0, 4.0, 5.0]))
+
+
+def test_agota_los_intentos():
+    reloj = RelojSimulado()
+    reintentos = politica(reloj, max_intentos=3)
+    llamadas = []
+
+    def fallar():
+        llamadas.append(1)
+        raise ErrorSimulado("503")
+
+    with pytest.raises(RuntimeError, match="Se agotaron los 3 intentos"):
+        reintentos.ejecutar(fallar)
+    assert len(llamadas) == 3
+    assert len(reloj.esperas) == 2
+
+
+@pytest.mark.parametrize("error, esperado", [(ErrorHttp(401), ErrorFatal), (ErrorHttp(413), ErrorDividir)])
+def test_errores_no_reintentables_salen_sin_esperar(error, esperado):
+    reloj = RelojSimulado()
+    reintentos = politica(reloj)
+
+    def fallar():
+        raise error
+
+    with pytest.raises(esperado):
+        reintentos.ejecutar(fallar)
+    assert reloj.esperas == []
+
+
+def test_version_asincrona_usa_el_mismo_retroceso():
+    reloj = RelojSimulado()
+    reintentos = politica(reloj, azar=AzarExtremo(), espera_base=1.0, max_intentos=3)
+    intentos = []
+
+    async def llamar():
+        intentos.append(1)
+        if len(intentos) < 3:
+            raise ErrorSimulado("503")
+        return "ok"
+
+    assert asyncio.run(reintentos.ejecutar_async(llamar)) == "ok"
+    assert reloj.esperas == [1.0, 2.0]
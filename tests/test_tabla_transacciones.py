@@ -0,0 +1,183 @@
+import datetime as dt
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from tabla_transacciones import (
+    buscar_fecha_corte,
+    buscar_numero_cuenta,
+    construir_tabla,
+    corte_por_fechas,
+    corte_por_nombre,
+    interpretar_fecha,
+    tabla_desde_registros,
+)
+
+
+def bancolombia(**columnas):
+    base = {
+        "fecha": ["05/01", "28/12", "15/01"],
+        "descripcion": ["COMPRA EXITO", "ABONO NOMINA", "RETIRO"],
+        "sucursal": ["MEDELLIN", "", "MEDELLIN"],
+        "dcto": ["", "123", ""],
+        "valor": ["-10.000,00", "1.500.000,50", "-200.000,00"],
+        "saldo": ["90.000,00", "1.590.000,50", "1.390.000,50"],
+    }
+    base.update(columnas)
+    return base
+
+
+# ----------------------------------------------------------------------
+# Esquema tipado
+# ----------------------------------------------------------------------
+def test_tipos_de_las_columnas():
+    df = construir_tabla(bancolombia(), "bancolombia", corte=dt.date(2024, 1, 31))
+
+    assert df["fecha"].dtype == "datetime64[ns]"
+    assert df["valor"].dtype == np.float64
+    assert df["saldo"].dtype == np.float64
+    assert isinstance(df["sucursal"].dtype, pd.CategoricalDtype)
+    assert df["descripcion"].dtype == object
+    assert df["valor"].tolist() == [-10000.0, 1500000.5, -200000.0]
+    # La sucursal vacía es un faltante, no una categoría más.
+    assert df["sucursal"].cat.categories.tolist() == ["MEDELLIN"]
+    assert df["sucursal"].isna().tolist() == [False, True, False]
+    assert df.attrs["fechas_invalidas"] == []
+    assert df.attrs["montos_invalidos"] == []
+
+
+def test_montos_en_centavos():
+    df = construir_tabla(bancolombia(valor=["-10.000,01", "", "1,50"]), "bancolombia", centavos=True)
+
+    assert df["valor"].dtype == "Int64"
+    assert df["valor"].tolist() == [-1000001, pd.NA, 150]
+
+
+def test_columnas_ajenas_al_esquema_se_deducen_del_nombre():
+    df = construir_tabla(
+        {"fecha_pago": ["05/01/2024"], "tarjeta": ["VISA"], "saldo_total": ["1.000,00"], "nota": ["x"]},
+        "bancolombia",
+    )
+
+    assert df["fecha_pago"].tolist() == [pd.Timestamp("2024-01-05")]
+    assert isinstance(df["tarjeta"].dtype, pd.CategoricalDtype)
+    assert df["saldo_total"].tolist() == [1000.0]
+    assert df["nota"].tolist() == ["x"]
+
+
+def test_registros_con_claves_distintas():
+    df = tabla_desde_registros(
+        [{"fecha": "05/01", "valor": "1,00"}, {"fecha": "06/01", "descripcion": "CAFE"}],
+        "bancolombia",
+        anio=2024,
+    )
+
+    assert df.columns.tolist() == ["fecha", "valor", "descripcion"]
+    assert df["valor"].isna().tolist() == [False, True]
+    assert df["descripcion"].tolist() == ["", "CAFE"]
+
+
+# ----------------------------------------------------------------------
+# Fechas y año por la fecha de corte
+# ----------------------------------------------------------------------
+def test_diciembre_en_extracto_de_enero_es_del_anio_anterior():
+    df = construir_tabla(bancolombia(), "bancolombia", corte=dt.date(2024, 1, 31))
+
+    assert df["fecha"].tolist() == [pd.Timestamp("2024-01-05"), pd.Timestamp("2023-12-28"), pd.Timestamp("2024-01-15")]
+
+
+def test_sin_corte_se_usa_el_anio_sin_correcciones():
+    df = construir_tabla(bancolombia(), "bancolombia", anio=2024)
+
+    assert df["fecha"].dt.year.tolist() == [2024, 2024, 2024]
+
+
+@pytest.mark.parametrize(
+    "valor, esperado",
+    [
+        ("05/01", dt.date(2024, 1, 5)),
+        ("05 ene", dt.date(2024, 1, 5)),
+        ("5-DIC", dt.date(2023, 12, 5)),
+        ("05/01/23", dt.date(2023, 1, 5)),
+        ("2022-11-30", dt.date(2022, 11, 30)),
+        ("31/02", None),
+        ("05 XYZ", None),
+        ("", None),
+        (None, None),
+    ],
+)
+def test_interpretar_fecha(valor, esperado):
+    assert interpretar_fecha(valor, 2024, mes_corte=1) == esperado
+
+
+def test_fechas_invalidas_conservan_el_texto_original():
+    df = construir_tabla(
+        bancolombia(fecha=["05/01", "31/02", "PENDIENTE"]), "bancolombia", corte=dt.date(2024, 1, 31)
+    )
+
+    assert df.columns.tolist()[:2] == ["fecha", "fecha_original"]
+    assert df["fecha"].isna().tolist() == [False, True, True]
+    assert df["fecha_original"].tolist() == [None, "31/02", "PENDIENTE"]
+    # Filas numeradas desde 1, como en los avisos del procesador.
+    assert df.attrs["fechas_invalidas"] == [2, 3]
+
+
+def test_fechas_vacias_no_son_invalidas():
+    df = construir_tabla(bancolombia(fecha=["05/01", "", None]), "bancolombia", anio=2024)
+
+    assert "fecha_original" not in df
+    assert df.attrs["fechas_invalidas"] == []
+
+
+def test_corte_por_fechas_toma_la_mas_reciente_con_anio():
+    assert corte_por_fechas(["05/01", "28/12/2023", "2024-01-31", "31/02/2024"]) == dt.date(2024, 1, 31)
+    assert corte_por_fechas(["05/01", "06/01"]) is None
+
+
+# ----------------------------------------------------------------------
+# Encabezado y nombre del archivo
+# ----------------------------------------------------------------------
+@pytest.mark.parametrize(
+    "texto, esperado",
+    [
+        ("ESTADO DE CUENTA\nFecha de corte: 31/01/2024\nSaldo anterior", dt.date(2024, 1, 31)),
+        ("Desde 2023/12/01 hasta 2023/12/31", dt.date(2023, 12, 31)),
+        ("Periodo facturado del 1 de marzo de 2024 al 31 de marzo de 2024", dt.date(2024, 3, 31)),
+        ("Corte al 15 FEB 2024", dt.date(2024, 2, 15)),
+        ("Fecha de corte: 31/02/2024", None),
+        ("Sin fechas en el encabezado", None),
+    ],
+)
+def test_buscar_fecha_corte(texto, esperado):
+    assert buscar_fecha_corte(texto) == esperado
+
+
+@pytest.mark.parametrize(
+    "texto, esperado",
+    [
+        ("Cuenta de ahorros No. 123-456789-01", "8901"),
+        ("Número de cuenta: **** 1234", "1234"),
+        ("Tarjeta terminada en 5678", "5678"),
+        ("Tarjeta de crédito XXXX XXXX XXXX 4321", "4321"),
+        ("Estado de cuenta 2024", None),
+        ("Cuenta 1234", None),
+    ],
+)
+def test_buscar_numero_cuenta(texto, esperado):
+    assert buscar_numero_cuenta(texto) == esperado
+
+
+@pytest.mark.parametrize(
+    "nombre, esperado",
+    [
+        ("nu_2024_01", dt.date(2024, 1, 31)),
+        ("bancolombia-02-2024", dt.date(2024, 2, 29)),
+        ("rappi marzo 2024", dt.date(2024, 3, 31)),
+        ("Extracto_Diciembre_2023", dt.date(2023, 12, 31)),
+        ("extracto 2023", dt.date(2023, 12, 31)),
+        ("bancolombia_enero", None),
+    ],
+)
+def test_corte_por_nombre(nombre, esperado):
+    assert corte_por_nombre(nombre) == esperado
@@ -0,0 +1,111 @@
+import fitz
+import pytest
+
+import texto_nativo
+from texto_nativo import extraer_texto_nativo, perfil_texto, validar_registros
+from valores_monetarios import FORMATOS_BANCO, FormatoNumerico
+
+
+COLUMNAS_X = {"fecha": 40, "descripcion": 90, "valor": 330, "saldo": 440}
+
+
+def extracto(filas, encabezado=True):
+    documento = fitz.open()
+    pagina = documento.new_page()
+    y = 80
+    if encabezado:
+        for clave, x in COLUMNAS_X.items():
+            pagina.insert_text((x, y), clave.upper(), fontsize=9)
+        pagina.insert_text((220, y), "SUCURSAL", fontsize=9)
+    for fila in filas:
+        y += 16
+        for clave, x in COLUMNAS_X.items():
+            pagina.insert_text((x, y), fila[clave], fontsize=9)
+    return documento
+
+
+FILAS = [
+    {"fecha": "01/02", "descripcion": "SALDO ANTERIOR", "valor": "0,00", "saldo": "100.000,00"},
+    {"fecha": "02/02", "descripcion": "COMPRA EXITO", "valor": "-25.500,50", "saldo": "74.499,50"},
+    {"fecha": "03/02", "descripcion": "ABONO NOMINA", "valor": "1.000.000,00", "saldo": "1.074.499,50"},
+]
+
+
+def test_acepta_una_tabla_valida():
+    resultado = extraer_texto_nativo(extracto(FILAS), "bancolombia")
+
+    assert resultado.aceptado, resultado.motivo
+    assert [registro["descripcion"] for registro in resultado.registros] == [
+        "SALDO ANTERIOR",
+        "COMPRA EXITO",
+        "ABONO NOMINA",
+    ]
+    assert resultado.registros[1]["valor"] == "-25.500,50"
+
+
+def test_rechaza_saldos_que_no_cuadran():
+    filas = [dict(fila) for fila in FILAS]
+    filas[2]["saldo"] = "1.074.000,00"
+
+    resultado = extraer_texto_nativo(extracto(filas), "bancolombia")
+
+    assert not resultado.aceptado
+    assert resultado.motivo == "saldo inconsistente en la fila 3"
+
+
+def test_rechaza_filas_sin_encabezado():
+    resultado = extraer_texto_nativo(extracto(FILAS, encabezado=False), "bancolombia")
+
+    assert not resultado.aceptado
+    assert "sin asignar" in resultado.motivo
+
+
+def test_rechaza_un_pdf_sin_texto():
+    documento = fitz.open()
+    documento.new_page()
+
+    assert extraer_texto_nativo(documento, "bancolombia").motivo == "el PDF no tiene capa de texto"
+
+
+def test_valida_con_los_montos_de_la_tabla_final():
+    perfil = perfil_texto("bancolombia")
+    # Con el formato de Bancolombia "1,234" es 1,234 pesos: los saldos no cuadran.
+    registros = [
+        {"fecha": "01/02", "valor": "0", "saldo": "10"},
+        {"fecha": "02/02", "valor": "1,234", "saldo": "1244"},
+    ]
+
+    assert validar_registros(registros, perfil, FORMATOS_BANCO["bancolombia"]) == "saldo inconsistente en la fila 2"
+    assert validar_registros(registros, perfil, FormatoNumerico(decimal=".", miles=",")) == ""
+
+
+@pytest.mark.parametrize("monto", ["", "COMPRA", "1.2.3,4,5"])
+def test_rechaza_montos_ilegibles(monto):
+    registros = [{"fecha": "01/02", "valor": monto, "saldo": "10"}]
+
+    assert validar_registros(registros, perfil_texto("bancolombia")) == "fila 1 sin monto válido"
+
+
+def linea_encabezado(*textos):
+    """Palabras separadas 60 puntos, como las devuelve ``get_text("words")``."""
+
+    palabras = []
+    for numero, texto in enumerate(textos):
+        x = 40 + 60 * numero
+        palabras.append((x, 80, x + 6 * len(texto), 90, texto))
+    return palabras
+
+
+def test_alias_de_varias_palabras_antes_que_el_generico_de_otra_columna():
+    # "VALOR" es alias de la columna valor, declarada antes que valor_del_mes.
+    linea = linea_encabezado("FECHA", "MOVIMIENTO", "VALOR", "DEL", "MES", "VALOR", "RESTANTE")
+
+    encabezados = texto_nativo._buscar_encabezado(linea, perfil_texto("nu"))
+
+    assert [(clave, x0) for clave, x0, _ in encabezados] == [
+        ("fecha", 40),
+        ("descripcion", 100),
+        ("valor_del_mes", 160),
+        ("valor", 340),
+        ("restante", 400),
+    ]
@@ -0,0 +1,163 @@
+import math
+import random
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from valores_monetarios import (
+    FORMATOS_BANCO,
+    MontoIlegible,
+    FormatoNumerico,
+    MontoInvalido,
+    formato_banco,
+    interpretar_columnas,
+    interpretar_monto,
+    interpretar_montos,
+)
+
+
+CELDAS = [
+    "1.234,50",
+    "1,234.50",
+    "$ 1.234.567,89",
+    "US$1,234",
+    "1.234",
+    "1,234",
+    "12,5",
+    "0,01",
+    "(12,00)",
+    "( $ 7.000 )",
+    "-45.000",
+    "45.000-",
+    "+3",
+    "150.000 CR",
+    "150.000DB",
+    "2.500,00 cr",
+    "1\xa0234,00",
+    "1 234 567",
+    "123456789012345678",
+    "1.234.567.890.123.456,78",
+    "",
+    "   ",
+    "-",
+    "N/A",
+    "12,34,56",
+    "1.2.3",
+    "1.234,56.78",
+    "--5",
+    "(5)-",
+    "1.23456",
+    "12.34.567",
+    "COMPRA",
+    "5 CR DB",
+    "ab\x00c",
+    None,
+]
+
+
+def referencia(valores, formato):
+    """Interpretación celda a celda con :func:`interpretar_monto`."""
+
+    numeros, invalidos = [], []
+    for fila, valor in enumerate(valores):
+        try:
+            numeros.append(interpretar_monto(valor, formato))
+        except MontoIlegible:
+            numeros.append(math.nan)
+            invalidos.append(fila + 1)
+    return np.array(numeros, dtype=np.float64), invalidos
+
+
+def iguales(a, b):
+    """Mismos ``float64`` bit a bit (``NaN`` incluido)."""
+
+    return a.shape == b.shape and bool(np.all((a == b) | (np.isnan(a) & np.isnan(b))))
+
+
+def celdas_aleatorias(cantidad, semilla):
+    azar = random.Random(semilla)
+    simbolos = "0123456789" * 4 + ".,-()$ CRDB"
+    celdas = []
+    for _ in range(cantidad):
+        entero = azar.randrange(10 ** azar.randrange(1, 17))
+        centavos = azar.randrange(100)
+        forma = azar.randrange(5)
+        if forma == 0:
+            celdas.append(f"{entero:,}.{centavos:02d}")
+        elif forma == 1:
+            celdas.append(f"{entero:,}".replace(",", ".") + f",{centavos:02d}")
+        elif forma == 2:
+            celdas.append(f"({entero:,})".replace(",", ".") + azar.choice(["", " CR", "DB"]))
+        elif forma == 3:
+            celdas.append("".join(azar.choice(simbolos) for _ in range(azar.randrange(1, 12))))
+        else:
+            celdas.append(f"-${entero}")
+    return celdas
+
+
+@pytest.mark.parametrize("banco", sorted(FORMATOS_BANCO))
+def test_columnas_igual_que_celda_a_celda(banco):
+    formato = FORMATOS_BANCO[banco]
+    textos = [celda for celda in CELDAS if isinstance(celda, str)]
+    esperados, filas_invalidas = referencia(textos, formato)
+
+    convertidas, invalidos = interpretar_columnas({"valor": textos}, formato)
+
+    assert iguales(convertidas["valor"], esperados)
+    assert [invalido.fila for invalido in invalidos] == filas_invalidas
+    assert all(invalido.valor == textos[invalido.fila - 1] for invalido in invalidos)
+
+
+@pytest.mark.parametrize("semilla", range(5))
+def test_celdas_aleatorias_igual_que_celda_a_celda(semilla):
+    formato = FORMATOS_BANCO["bancolombia"]
+    textos = celdas_aleatorias(2000, semilla)
+    esperados, filas_invalidas = referencia(textos, formato)
+
+    convertidas, invalidos = interpretar_columnas({"valor": textos}, formato)
+
+    assert iguales(convertidas["valor"], esperados)
+    assert [invalido.fila for invalido in invalidos] == filas_invalidas
+
+
+def test_columnas_mixtas_y_numericas():
+    columnas = {
+        "valor": ["1.000,00", None, "(2,50)", "x"],
+        "saldo": pd.Series([1.5, 2.0, np.nan, 4.0]),
+        "capital": [1, "2.000", math.nan, "?"],
+    }
+
+    convertidas, invalidos = interpretar_columnas(columnas)
+
+    for columna, valores in columnas.items():
+        esperados, _ = referencia(list(valores), FORMATOS_BANCO["bancolombia"])
+        assert iguales(convertidas[columna], esperados)
+    # Ordenados por fila y, dentro de la fila, por columna.
+    assert invalidos == [MontoInvalido("valor", 4, "x"), MontoInvalido("capital", 4, "?")]
+
+
+def test_interpretar_montos_solo_toca_columnas_monetarias():
+    df = pd.DataFrame({"fecha": ["01/02", "02/02"], "valor": ["1.000", "-"], "saldo": ["5.000,5", "4.000"]})
+
+    resultado, invalidos = interpretar_montos(df)
+
+    assert invalidos == []
+    assert resultado["fecha"].tolist() == ["01/02", "02/02"]
+    assert iguales(resultado["valor"].to_numpy(), np.array([1000.0, np.nan]))
+    assert resultado["saldo"].tolist() == [5000.5, 4000.0]
+
+
+def test_signo_de_credito_por_banco():
+    assert interpretar_monto("100 CR", FORMATOS_BANCO["bancolombia"]) == 100.0
+    assert interpretar_monto("100 CR", FORMATOS_BANCO["nu"]) == -100.0
+    assert interpretar_monto("100 DB", FORMATOS_BANCO["nu"]) == 100.0
+
+
+def test_formato_banco_con_reemplazos():
+    propio = FormatoNumerico(decimal=".", miles=",")
+
+    assert formato_banco("nu") is FORMATOS_BANCO["nu"]
+    assert formato_banco("desconocido") is FORMATOS_BANCO["bancolombia"]
+    assert formato_banco("nu", {"nu": propio}) is propio
+    assert formato_banco("bancolombia", {"nu": propio}) is FORMATOS_BANCO["bancolombia"]
@@ -0,0 +1,295 @@
+"""Extracción determinista desde la capa de texto de PDFs digitales.
+
+Los extractos generados digitalmente (Bancolombia, Nu) traen texto real con
+posiciones.  Aquí se reconstruyen las filas de la tabla de movimientos a
+partir de las palabras de PyMuPDF: se localiza la fila de encabezados del
+banco, se derivan los límites de cada columna y se asignan las palabras de
+cada línea según su posición horizontal.
+
+El resultado solo se acepta si supera las comprobaciones de confianza
+(encabezado encontrado, fechas y montos válidos en todas las filas, ninguna
+línea con aspecto de movimiento sin asignar y, cuando hay saldo, continuidad
+de saldos).  En cualquier otro caso se devuelve el motivo del rechazo para
+que el llamador recurra al modelo de visión.
+"""
+
+from __future__ import annotations
+
+import math
+import re
+import unicodedata
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Sequence, Set, Tuple
+
+import fitz  # PyMuPDF
+
+from valores_monetarios import FormatoNumerico, MontoIlegible, formato_banco, interpretar_monto
+
+
+Palabra = Tuple[float, float, float, float, str]
+
+
+@dataclass(frozen=True)
+class PerfilTexto:
+    """Distribución de la tabla de movimientos de un banco."""
+
+    # (clave de salida, alias del encabezado en mayúsculas sin tildes)
+    columnas: Tuple[Tuple[str, Tuple[str, ...]], ...]
+    columna_monto: str
+    columna_saldo: Optional[str] = None
+    minimo_encabezados: int = 3
+
+
+_PERFILES_TEXTO: Dict[str, PerfilTexto] = {
+    "bancolombia": PerfilTexto(
+        columnas=(
+            ("fecha", ("FECHA",)),
+            ("descripcion", ("DESCRIPCION",)),
+            ("sucursal", ("SUCURSAL",)),
+            ("dcto", ("DCTO.", "DCTO", "DOCUMENTO")),
+            ("valor", ("VALOR",)),
+            ("saldo", ("SALDO",)),
+        ),
+        columna_monto="valor",
+        columna_saldo="saldo",
+        minimo_encabezados=4,
+    ),
+    "nu": PerfilTexto(
+        columnas=(
+            ("fecha", ("FECHA",)),
+            ("descripcion", ("DESCRIPCION", "MOVIMIENTO")),
+            ("valor", ("VALOR TOTAL", "VALOR")),
+            ("cuotas", ("CUOTAS", "CUOTA")),
+            ("valor_del_mes", ("VALOR DEL MES", "VALOR MES")),
+            ("interes_mes", ("INTERES DEL MES", "INTERES MES", "INTERESES")),
+            ("total_pagar", ("TOTAL A PAGAR", "TOTAL")),
+            ("restante", ("RESTANTE", "SALDO PENDIENTE")),
+        ),
+        columna_monto="valor",
+    ),
+    "rappi": PerfilTexto(
+        columnas=(
+            ("tarjeta", ("TARJETA",)),
+            ("fecha", ("FECHA",)),
+            ("descripcion", ("DESCRIPCION",)),
+            ("valor_transaccion", ("VALOR TRANSACCION", "VALOR")),
+            ("capital_facturado", ("CAPITAL FACTURADO",)),
+            ("cuotas", ("CUOTAS",)),
+            ("capital_pendiente", ("CAPITAL PENDIENTE",)),
+            ("tasa_mv", ("TASA MV", "M.V.")),
+            ("tasa_ea", ("TASA EA", "E.A.")),
+        ),
+        columna_monto="valor_transaccion",
+    ),
+}
+
+_PATRON_FECHA = re.compile(
+    r"^\d{1,2}([/\-. ])(\d{1,2}|[A-Z]{3})(\1\d{2,4})?$"
+)
+_PATRON_MONTO = re.compile(r"^\(?-?\$?\s?-?\d[\d.,]*\)?-?$")
+_TOLERANCIA_LINEA = 3.0  # puntos
+
+
+@dataclass
+class ResultadoTexto:
+    registros: List[Dict[str, str]] = field(default_factory=list)
+    motivo: str = ""
+
+    @property
+    def aceptado(self) -> bool:
+        return bool(self.registros) and not self.motivo
+
+
+def normalizar_texto(texto: str) -> str:
+    sin_tildes = unicodedata.normalize("NFKD", texto).encode("ascii", "ignore").decode()
+    return sin_tildes.upper().strip()
+
+
+def _monto(texto: str, formato: FormatoNumerico) -> Optional[float]:
+    """Monto tal como lo interpretará la tabla final; ``None`` si falta o es ilegible."""
+
+    try:
+        numero = interpretar_monto(texto, formato)
+    except MontoIlegible:
+        return None
+    return None if math.isnan(numero) else numero
+
+
+def _agrupar_lineas(palabras: Sequence[Palabra]) -> List[List[Palabra]]:
+    lineas: List[List[Palabra]] = []
+    for palabra in sorted(palabras, key=lambda p: ((p[1] + p[3]) / 2, p[0])):
+        centro = (palabra[1] + palabra[3]) / 2
+        if lineas:
+            ultima = lineas[-1]
+            centro_ultima = (ultima[0][1] + ultima[0][3]) / 2
+            if abs(centro - centro_ultima) <= _TOLERANCIA_LINEA:
+                ultima.append(palabra)
+                continue
+        lineas.append([palabra])
+    return [sorted(linea, key=lambda p: p[0]) for linea in lineas]
+
+
+def _buscar_encabezado(linea: List[Palabra], perfil: PerfilTexto) -> Optional[List[Tuple[str, float, float]]]:
+    """Devuelve ``(columna, x0, x1)`` por cada encabezado reconocido en la línea."""
+
+    textos = [normalizar_texto(p[4]) for p in linea]
+    usados = [False] * len(linea)
+    encontrados: List[Tuple[str, float, float]] = []
+
+    # Los alias de varias palabras de todas las columnas se buscan antes que
+    # los de una sola, para que "VALOR DEL MES" no ceda su "VALOR" al alias
+    # genérico de otra columna.  El orden es estable: a igual longitud manda
+    # el orden de las columnas del perfil.
+    variantes = sorted(
+        ((clave, variante.split()) for clave, alias in perfil.columnas for variante in alias),
+        key=lambda par: -len(par[1]),
+    )
+    asignadas: Set[str] = set()
+    for clave, tokens in variantes:
+        if clave in asignadas:
+            continue
+        for inicio in range(len(textos) - len(tokens) + 1):
+            tramo = range(inicio, inicio + len(tokens))
+            if any(usados[i] for i in tramo):
+                continue
+            if all(textos[i] == token for i, token in zip(tramo, tokens)):
+                for i in tramo:
+                    usados[i] = True
+                asignadas.add(clave)
+                encontrados.append((clave, linea[inicio][0], linea[inicio + len(tokens) - 1][2]))
+                break
+
+    if len(encontrados) < perfil.minimo_encabezados:
+        return None
+    return sorted(encontrados, key=lambda e: e[1])
+
+
+def _limites(encabezados: List[Tuple[str, float, float]]) -> List[Tuple[str, float]]:
+    """Límite derecho de cada columna: el punto medio del hueco con la siguiente."""
+
+    limites = []
+    for actual, siguiente in zip(encabezados, encabezados[1:]):
+        limites.append((actual[0], (actual[2] + siguiente[1]) / 2))
+    limites.append((encabezados[-1][0], float("inf")))
+    return limites
+
+
+def _asignar(linea: List[Palabra], limites: List[Tuple[str, float]]) -> Dict[str, str]:
+    celdas: Dict[str, List[str]] = {}
+    for palabra in linea:
+        centro = (palabra[0] + palabra[2]) / 2
+        for clave, limite in limites:
+            if centro < limite:
+                celdas.setdefault(clave, []).append(palabra[4])
+                break
+    return {clave: " ".join(valores) for clave, valores in celdas.items()}
+
+
+def _parece_movimiento(linea: List[Palabra]) -> bool:
+    textos = [p[4] for p in linea]
+    tiene_monto = any(_PATRON_MONTO.match(t) and any(c in t for c in ".,") for t in textos)
+    tiene_fecha = any(es_fecha(t) for t in textos[:3])
+    return tiene_monto and tiene_fecha
+
+
+def extraer_texto_nativo(
+    documento: fitz.Document, banco: str, formato: Optional[FormatoNumerico] = None
+) -> ResultadoTexto:
+    """Reconstruye los movimientos desde la capa de texto del documento.
+
+    ``formato`` es el formato numérico con que se validan los montos (por
+    defecto, el del banco).
+    """
+
+    perfil = perfil_texto(banco)
+    if perfil is None:
+        return ResultadoTexto(motivo=f"sin perfil de texto para {banco}")
+
+    claves = [clave for clave, _ in perfil.columnas]
+    registros: List[Dict[str, str]] = []
+    candidatas_sin_asignar = 0
+    hay_texto = False
+
+    for pagina in documento:
+        palabras = [tuple(p[:5]) for p in pagina.get_text("words")]
+        if not palabras:
+            continue
+        hay_texto = True
+
+        limites: Optional[List[Tuple[str, float]]] = None
+        for linea in _agrupar_lineas(palabras):
+            encabezados = _buscar_encabezado(linea, perfil)
+            if encabezados:
+                limites = _limites(encabezados)
+                continue
+            if limites is None:
+                if _parece_movimiento(linea):
+                    candidatas_sin_asignar += 1
+                continue
+
+            celdas = _asignar(linea, limites)
+            if es_fecha(celdas.get("fecha", "")):
+                registros.append({clave: celdas.get(clave, "") for clave in claves})
+            elif registros and celdas.get("descripcion") and not celdas.get(perfil.columna_monto):
+                # Descripción que continúa en la línea siguiente.
+                registros[-1]["descripcion"] = f"{registros[-1]['descripcion']} {celdas['descripcion']}".strip()
+            elif _parece_movimiento(linea):
+                candidatas_sin_asignar += 1
+
+    if not hay_texto:
+        return ResultadoTexto(motivo="el PDF no tiene capa de texto")
+    if candidatas_sin_asignar:
+        return ResultadoTexto(registros, f"{candidatas_sin_asignar} línea(s) con aspecto de movimiento sin asignar")
+    return ResultadoTexto(registros, validar_registros(registros, perfil, formato or formato_banco(banco)))
+
+
+def validar_registros(
+    registros: List[Dict[str, str]], perfil: PerfilTexto, formato: FormatoNumerico = FormatoNumerico()
+) -> str:
+    """Comprobaciones de confianza comunes a los extractores locales.
+
+    Los montos se leen con :func:`valores_monetarios.interpretar_monto` y el
+    ``formato`` del banco, igual que en la tabla final, así que la
+    continuidad de saldos se comprueba sobre los números que se exportan.
+    Devuelve el motivo del rechazo o una cadena vacía si las filas son fiables.
+    """
+
+    if not registros:
+        return "no se encontró la tabla de movimientos"
+
+    for numero, registro in enumerate(registros, start=1):
+        if not es_fecha(registro.get("fecha", "")):
+            return f"fila {numero} sin fecha válida"
+        if _monto(registro.get(perfil.columna_monto, ""), formato) is None:
+            return f"fila {numero} sin monto válido"
+
+    if perfil.columna_saldo:
+        saldos = [_monto(r.get(perfil.columna_saldo, ""), formato) for r in registros]
+        montos = [_monto(r[perfil.columna_monto], formato) for r in registros]
+        for indice in range(1, len(registros)):
+            anterior, actual, monto = saldos[indice - 1], saldos[indice], montos[indice]
+            if anterior is None or actual is None or monto is None:
+                continue
+            if abs(anterior + monto - actual) > 0.01:
+                return f"saldo inconsistente en la fila {indice + 1}"
+
+    return ""
+
+
+def perfil_texto(banco: str) -> Optional[PerfilTexto]:
+    return _PERFILES_TEXTO.get(banco)
+
+
+def es_fecha(texto: str) -> bool:
+    return bool(_PATRON_FECHA.match(normalizar_texto(texto)))
+
+
+__all__ = [
+    "PerfilTexto",
+    "ResultadoTexto",
+    "es_fecha",
+    "extraer_texto_nativo",
+    "normalizar_texto",
+    "perfil_texto",
+    "validar_registros",
+]